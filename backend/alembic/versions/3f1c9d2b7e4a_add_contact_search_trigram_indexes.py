@@ -0,0 +1,50 @@
+"""Add trigram indexes for contact search
+
+Revision ID: 3f1c9d2b7e4a
+Revises: a4b83b1ac556
+Create Date: 2026-10-18 10:12:40.118302
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c9d2b7e4a"
+down_revision: Union[str, Sequence[str], None] = "a4b83b1ac556"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm only exists on Postgres; other databases use the in-process index
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_contacts_name_trgm",
+        "contacts",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_contacts_phone_trgm",
+        "contacts",
+        ["phone"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"phone": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_contacts_phone_trgm", table_name="contacts")
+    op.drop_index("ix_contacts_name_trgm", table_name="contacts")
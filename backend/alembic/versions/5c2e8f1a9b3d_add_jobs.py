@@ -0,0 +1,45 @@
+"""Add background jobs
+
+Revision ID: 5c2e8f1a9b3d
+Revises: 9d4f2a6b8c1e
+Create Date: 2026-10-18 20:11:37.904215
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5c2e8f1a9b3d"
+down_revision: Union[str, Sequence[str], None] = "9d4f2a6b8c1e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String(length=32), nullable=False),
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("processed", sa.Integer(), nullable=False),
+        sa.Column("progress", sa.Float(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("createdAt", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("startedAt", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finishedAt", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updatedAt", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_jobs_finishedAt"), "jobs", ["finishedAt"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_jobs_finishedAt"), table_name="jobs")
+    op.drop_table("jobs")
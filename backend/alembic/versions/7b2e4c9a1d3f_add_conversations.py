@@ -0,0 +1,60 @@
+"""Add conversations and their messages
+
+Revision ID: 7b2e4c9a1d3f
+Revises: 3f1c9d2b7e4a
+Create Date: 2026-10-18 14:05:12.482913
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7b2e4c9a1d3f"
+down_revision: Union[str, Sequence[str], None] = "3f1c9d2b7e4a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "conversations",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.Column("summarizedUpTo", sa.Integer(), nullable=False),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "conversation_messages",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("conversationId", sa.String(length=36), nullable=False),
+        sa.Column("role", sa.String(length=16), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("tokens", sa.Integer(), nullable=False),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["conversationId"], ["conversations.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_conversation_messages_conversationId"),
+        "conversation_messages",
+        ["conversationId"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f("ix_conversation_messages_conversationId"),
+        table_name="conversation_messages",
+    )
+    op.drop_table("conversation_messages")
+    op.drop_table("conversations")
@@ -0,0 +1,45 @@
+"""Add the contact change log
+
+Revision ID: 9d4f2a6b8c1e
+Revises: e1a7b3c9d2f6
+Create Date: 2026-10-18 19:02:44.518630
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4f2a6b8c1e"
+down_revision: Union[str, Sequence[str], None] = "e1a7b3c9d2f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "contact_changes",
+        sa.Column(
+            "seq",
+            sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+            autoincrement=True,
+            nullable=False,
+        ),
+        sa.Column("contactId", sa.Integer(), nullable=False),
+        sa.Column("op", sa.String(length=8), nullable=False),
+        sa.Column("name", sa.String(length=128), nullable=True),
+        sa.Column("phone", sa.String(length=32), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=True),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("seq"),
+        sqlite_autoincrement=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("contact_changes")
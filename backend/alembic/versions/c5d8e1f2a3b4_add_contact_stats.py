@@ -0,0 +1,38 @@
+"""Add the contact count table
+
+Revision ID: c5d8e1f2a3b4
+Revises: 7b2e4c9a1d3f
+Create Date: 2026-10-18 16:40:27.116204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d8e1f2a3b4"
+down_revision: Union[str, Sequence[str], None] = "7b2e4c9a1d3f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "contact_stats",
+        sa.Column("slot", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("contacts", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("slot"),
+    )
+    # Start from the current count; later writes keep it up to date
+    op.execute(
+        "INSERT INTO contact_stats (slot, contacts) SELECT 0, COUNT(*) FROM contacts"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("contact_stats")
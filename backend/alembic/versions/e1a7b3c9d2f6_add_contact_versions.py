@@ -0,0 +1,45 @@
+"""Add contact versions, update times and the change count
+
+Revision ID: e1a7b3c9d2f6
+Revises: c5d8e1f2a3b4
+Create Date: 2026-10-18 18:12:45.308117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e1a7b3c9d2f6"
+down_revision: Union[str, Sequence[str], None] = "c5d8e1f2a3b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "contacts",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+    # SQLite cannot add a column with a non-constant default, so updatedAt
+    # starts out as the creation time and is made NOT NULL afterwards
+    op.add_column("contacts", sa.Column("updatedAt", sa.DateTime(), nullable=True))
+    op.execute('UPDATE contacts SET "updatedAt" = "createdAt"')
+    with op.batch_alter_table("contacts") as batch_op:
+        batch_op.alter_column("updatedAt", existing_type=sa.DateTime(), nullable=False)
+    op.add_column(
+        "contact_stats",
+        sa.Column("changes", sa.BigInteger(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("contact_stats", "changes")
+    with op.batch_alter_table("contacts") as batch_op:
+        batch_op.drop_column("updatedAt")
+        batch_op.drop_column("version")
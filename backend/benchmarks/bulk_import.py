@@ -0,0 +1,93 @@
+"""Row-by-row POST /api/contacts vs streaming POST /api/contacts/import.
+
+The per-row path is timed on a sample and reported as rows/s; the import
+streams a generated CSV body of ``--rows`` contacts.
+
+    python -m benchmarks.bulk_import --rows 500000 --per-row-sample 2000
+"""
+
+import argparse
+import asyncio
+import resource
+import time
+
+from benchmarks.common import contact_name, create_tables, emit
+
+# Numbers in this range do not collide with seed_contacts()
+PHONE_BASE = 600_000_000
+
+
+def phone(i: int) -> str:
+    return f"+48{PHONE_BASE + i}"
+
+
+async def csv_body(start: int, rows: int, batch: int = 10_000):
+    yield b"name,phone\n"
+    for offset in range(start, start + rows, batch):
+        lines = (
+            f"{contact_name(i)},{phone(i)}\n"
+            for i in range(offset, min(offset + batch, start + rows))
+        )
+        yield "".join(lines).encode()
+
+
+async def main(rows: int, per_row_sample: int, chunk_size: int):
+    import httpx
+
+    from src.db.db import get_async_engine
+    from src.main import create_base_app
+
+    create_tables()
+    app = create_base_app()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            start = time.perf_counter()
+            for i in range(per_row_sample):
+                response = await client.post(
+                    "/api/contacts", json={"name": contact_name(i), "phone": phone(i)}
+                )
+                response.raise_for_status()
+            per_row = time.perf_counter() - start
+
+            start = time.perf_counter()
+            response = await client.post(
+                f"/api/contacts/import?chunk_size={chunk_size}",
+                content=csv_body(per_row_sample, rows),
+                headers={"content-type": "text/csv"},
+            )
+            response.raise_for_status()
+            bulk = time.perf_counter() - start
+            report = response.json()
+    finally:
+        await get_async_engine().dispose()
+
+    emit(
+        {
+            "rows": rows,
+            "chunk_size": chunk_size,
+            "per_row": {
+                "rows": per_row_sample,
+                "seconds": per_row,
+                "rows_per_s": per_row_sample / per_row,
+            },
+            "import": {
+                "seconds": bulk,
+                "rows_per_s": rows / bulk,
+                "inserted": report["inserted"],
+                "failed": report["failed"],
+            },
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--per-row-sample", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.per_row_sample, args.chunk_size))
@@ -0,0 +1,266 @@
+"""Keeping a client in sync: re-listing vs following the change feed.
+
+Seeds ``--rows`` contacts. A client takes a change token, lists every
+contact, then for ``--rounds`` rounds of ``--writes`` writes (updates,
+creates, deletes and a batch, through the API) catches up twice: by listing
+everything again and by applying GET /contacts/changes since its token.
+Reports bytes and time per catch-up. Fails unless the copy kept with
+changes equals a fresh listing after every round.
+
+Then follows the SSE stream while contacts are updated, both by this
+process (which wakes its subscribers) and as if by another one (found by
+polling), and reports how long each change took to arrive. Fails unless
+every change arrives once, in order, and resuming from a Last-Event-ID
+picks up right after it.
+
+    python -m benchmarks.changes --rows 10000 --rounds 20 --writes 10
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.common import (
+    contact_name,
+    create_tables,
+    emit,
+    seed_contacts,
+    summarize,
+)
+
+PAGE_SIZE = 1000
+NEW_PHONE_BASE = 800_000_000
+
+
+async def list_all(client) -> tuple[dict, int]:
+    """Every contact by id, as a client listing them page by page sees them"""
+    contacts, sent, cursor = {}, 0, None
+    while True:
+        params = {"pagination": "keyset", "limit": PAGE_SIZE}
+        if cursor:
+            params["after"] = cursor
+        response = await client.get("/api/contacts", params=params)
+        sent += len(response.content)
+        page = response.json()
+        contacts.update((c["id"], c) for c in page["contacts"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return contacts, sent
+
+
+async def catch_up(client, contacts: dict, since: str) -> tuple[str, int, int]:
+    """Apply the changes after `since` to `contacts`; the next token, bytes, changes"""
+    sent = applied = 0
+    while True:
+        response = await client.get("/api/contacts/changes", params={"since": since})
+        sent += len(response.content)
+        page = response.json()
+        for change in page["changes"]:
+            if change["op"] == "delete":
+                contacts.pop(change["id"], None)
+            else:
+                contacts[change["id"]] = change["contact"]
+        applied += len(page["changes"])
+        since = page["next"]
+        if not page["has_more"]:
+            return since, sent, applied
+
+
+async def make_writes(
+    client, rng: random.Random, ids: list[int], count: int, start: int
+):
+    """`count` writes of every kind; keeps `ids` up to date"""
+    for i in range(start, start + count):
+        kind = i % 5
+        if kind in (0, 1):
+            contact_id = rng.choice(ids)
+            await client.put(
+                f"/api/contacts/{contact_id}",
+                json={
+                    "name": f"Renamed {i}",
+                    "phone": f"+48{500_000_000 + contact_id - 1}",
+                },
+            )
+        elif kind == 2:
+            created = await client.post(
+                "/api/contacts",
+                json={"name": contact_name(i), "phone": f"+48{NEW_PHONE_BASE + i}"},
+            )
+            ids.append(created.json()["id"])
+        elif kind == 3:
+            contact_id = ids.pop(rng.randrange(len(ids)))
+            await client.delete(f"/api/contacts/{contact_id}")
+        else:
+            deleted = ids.pop(rng.randrange(len(ids)))
+            result = await client.post(
+                "/api/contacts/batch",
+                json={
+                    "delete": [deleted],
+                    "create": [
+                        {
+                            "name": contact_name(i),
+                            "phone": f"+48{NEW_PHONE_BASE + 10**6 + i}",
+                        }
+                    ],
+                },
+            )
+            ids.append(result.json()["created"][0]["id"])
+
+
+async def follow(svc, received: list, stop, **params):
+    """
+    Collect (event, data, id, arrival time) from the SSE stream until
+    `stop(received)` says so
+    """
+    from src.api.contacts import stream_changes
+    from src.db.db import AsyncSessionLocal
+
+    params = {"since": None, "last_event_id": None, **params}
+    async with AsyncSessionLocal() as db:
+        response = await stream_changes(db=db, svc=svc, **params)
+    body = response.body_iterator
+    try:
+        async for chunk in body:
+            if chunk.startswith(":"):
+                continue
+            fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+            data = json.loads(fields["data"])
+            received.append((fields["event"], data, fields["id"], time.perf_counter()))
+            if stop(received):
+                return
+    finally:
+        await body.aclose()
+
+
+async def stream_latency(client, svc, ids: list[int], writes: int) -> tuple:
+    """Changes received over SSE while `writes` updates are made, and when each returned"""
+    received: list = []
+    task = asyncio.create_task(
+        follow(svc, received, lambda received: len(received) > writes)
+    )
+    while not received:
+        await asyncio.sleep(0.001)
+    made = []
+    for i, contact_id in enumerate(ids[:writes]):
+        count = len(received)
+        response = await client.get(f"/api/contacts/{contact_id}")
+        await client.put(
+            f"/api/contacts/{contact_id}",
+            json={"name": f"Streamed {i}", "phone": response.json()["phone"]},
+        )
+        made.append(time.perf_counter())
+        # One write at a time, so each arrival belongs to one write
+        while len(received) == count:
+            await asyncio.sleep(0.001)
+    await asyncio.wait_for(task, 10)
+    return received, made
+
+
+async def main(rows: int, rounds: int, writes: int, poll_interval: float, seed: int):
+    create_tables()
+    seed_contacts(rows)
+
+    import httpx
+
+    from src.db.db import get_async_engine
+    from src.main import create_base_app
+    from src.services.change_feed import ChangeWatcher
+    from src.services.contact_service import ContactService
+
+    rng = random.Random(seed)
+    ids = list(range(1, rows + 1))
+    report = {"rows": rows, "rounds": rounds, "writes_per_round": writes}
+    full = {"bytes": [], "seconds": []}
+    incremental = {"bytes": [], "seconds": [], "changes": []}
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=create_base_app()),
+            base_url="http://bench",
+        ) as client:
+            since = (await client.get("/api/contacts/changes")).json()["next"]
+            copy, _ = await list_all(client)
+            for r in range(rounds):
+                await make_writes(client, rng, ids, writes, r * writes)
+
+                start = time.perf_counter()
+                listed, sent = await list_all(client)
+                full["seconds"].append(time.perf_counter() - start)
+                full["bytes"].append(sent)
+
+                start = time.perf_counter()
+                since, sent, applied = await catch_up(client, copy, since)
+                incremental["seconds"].append(time.perf_counter() - start)
+                incremental["bytes"].append(sent)
+                incremental["changes"].append(applied)
+                assert copy == listed, f"round {r}: the synced copy drifted"
+
+            local, local_made = await stream_latency(
+                client, ContactService(), ids, writes
+            )
+            # A subscriber whose watcher the writes do not wake, as with
+            # writes made by another process
+            svc = ContactService(change_watcher=ChangeWatcher(poll_interval))
+            remote, remote_made = await stream_latency(client, svc, ids, writes)
+
+            # Reconnect with the id of a change in the middle of the stream
+            resume_at = len(remote) // 2
+            resumed: list = []
+            await asyncio.wait_for(
+                follow(
+                    svc,
+                    resumed,
+                    lambda received: len(received) == 2,
+                    last_event_id=remote[resume_at][2],
+                ),
+                10,
+            )
+    finally:
+        await get_async_engine().dispose()
+
+    def arrivals(received, made):
+        changes = [item for item in received if item[0] == "change"]
+        return [arrived - wrote for (*_, arrived), wrote in zip(changes, made)]
+
+    report["full_relist"] = {
+        "bytes_per_sync": sum(full["bytes"]) / rounds,
+        **summarize(full["seconds"]),
+    }
+    report["change_feed"] = {
+        "bytes_per_sync": sum(incremental["bytes"]) / rounds,
+        "changes_per_sync": sum(incremental["changes"]) / rounds,
+        **summarize(incremental["seconds"]),
+    }
+    report["stream"] = {
+        "local_write": summarize(arrivals(local, local_made)),
+        "other_process": {
+            "poll_interval_s": poll_interval,
+            **summarize(arrivals(remote, remote_made)),
+        },
+    }
+    emit(report)
+
+    for received in (local, remote):
+        assert received[0][0] == "ready", received[0]
+        seqs = [data["seq"] for event, data, *_ in received if event == "change"]
+        assert seqs == sorted(set(seqs)), "stream repeated or reordered changes"
+    assert resumed[0][0] == "ready" and resumed[1][0] == "change", resumed[:2]
+    assert resumed[1][1]["seq"] == remote[resume_at + 1][1]["seq"], "resume skipped"
+    assert (
+        report["change_feed"]["bytes_per_sync"]
+        < report["full_relist"]["bytes_per_sync"]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=10)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(
+        main(args.rows, args.rounds, args.writes, args.poll_interval, args.seed)
+    )
@@ -0,0 +1,98 @@
+"""Shared helpers for the benchmark scripts.
+
+Import this module before anything from ``src``: it points the app at a
+throwaway SQLite database unless ``DATABASE_URL`` is already set.
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+if not os.getenv("DATABASE_URL"):
+    _db_path = os.path.join(tempfile.mkdtemp(prefix="contacts-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+
+def create_tables():
+    """Create the schema on the benchmark database"""
+    from src.db.db import get_engine
+    from src.db.models.Contact import Base
+    from src.db.models.Conversation import ConversationModel  # noqa: F401
+    from src.db.models.Job import JobModel  # noqa: F401
+
+    Base.metadata.create_all(get_engine())
+
+
+FIRST_NAMES = (
+    "Jan Anna Piotr Maria Krzysztof Katarzyna Tomasz Agnieszka Michał Magdalena "
+    "Paweł Joanna Adam Ewa Łukasz Zofia John Emma Oliver Sophia Liam Olivia Noah Mia"
+).split()
+LAST_NAMES = (
+    "Kowalski Nowak Wiśniewski Wójcik Kowalczyk Kamiński Lewandowski Zieliński "
+    "Szymański Woźniak Dąbrowski Kozłowski Smith Johnson Williams Brown Jones Miller "
+    "Davis Wilson Taylor Clark"
+).split()
+
+
+def contact_name(i: int) -> str:
+    """Deterministic, varied synthetic name for the i-th seeded contact"""
+    first = FIRST_NAMES[i % len(FIRST_NAMES)]
+    last = LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    return f"{first} {last} {i}"
+
+
+def seed_contacts(total: int, batch_size: int = 50_000):
+    """Bulk insert ``total`` synthetic contacts with unique phone numbers"""
+    from sqlalchemy import insert
+
+    from src.db.db import get_engine
+    from src.db.models.Contact import ContactModel
+    from src.services.contact_service import count_contacts_statement
+
+    engine = get_engine()
+    with engine.begin() as conn:
+        for start in range(0, total, batch_size):
+            conn.execute(
+                insert(ContactModel),
+                [
+                    {"name": contact_name(i), "phone": f"+48{500_000_000 + i}"}
+                    for i in range(start, min(start + batch_size, total))
+                ],
+            )
+        # Written behind ContactService's back, so counted here
+        conn.execute(count_contacts_statement(engine.dialect.name, total, total))
+
+
+def summarize(samples: list[float]) -> dict:
+    """Latency summary in milliseconds"""
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+@contextmanager
+def stopwatch(samples: list[float]):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples.append(time.perf_counter() - start)
+
+
+def emit(report: dict):
+    json.dump(report, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
@@ -0,0 +1,105 @@
+"""Threadpool (sync Session) vs async (AsyncSession) handlers under concurrency.
+
+Both handlers load one contact by primary key. ``--db-latency-ms`` adds a
+simulated round-trip delay (time.sleep in the sync handler, asyncio.sleep in
+the async one) to show how the default 40-thread pool caps the sync path once
+the database is not on localhost. DB_POOL_SIZE/DB_MAX_OVERFLOW size the async
+pool; the sync pool keeps its defaults.
+
+    DB_POOL_SIZE=100 python -m benchmarks.concurrency --requests 5000 --concurrency 500
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import create_tables, emit, seed_contacts, summarize
+
+
+def build_app(latency: float):
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from src.db.db import SessionLocal, get_async_db
+    from src.db.models.Contact import ContactModel
+    from src.db.schemas import Contact
+
+    app = FastAPI()
+
+    # The session is opened inside the handler: with a yield dependency its
+    # teardown needs a second threadpool slot, and 40 handlers waiting on a
+    # pooled connection can starve it until the pool timeout fires.
+    @app.get("/sync/{contact_id}")
+    def read_sync(contact_id: int):
+        with SessionLocal() as db:
+            db.connection()
+            if latency:
+                time.sleep(latency)
+            return Contact.model_validate(db.get(ContactModel, contact_id))
+
+    @app.get("/async/{contact_id}")
+    async def read_async(contact_id: int, db: AsyncSession = Depends(get_async_db)):
+        # Hold the connection across the delay, like the sync handler does
+        await db.connection()
+        if latency:
+            await asyncio.sleep(latency)
+        return Contact.model_validate(await db.get(ContactModel, contact_id))
+
+    return app
+
+
+async def drive(app, path: str, requests: int, concurrency: int, rows: int) -> dict:
+    import httpx
+
+    samples: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(f"/{path}/{i % rows + 1}")
+                response.raise_for_status()
+                samples.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    return {"throughput_rps": requests / elapsed, **summarize(samples)}
+
+
+async def main(requests: int, concurrency: int, rows: int, latency_ms: float):
+    from src.db.db import get_async_engine
+
+    create_tables()
+    seed_contacts(rows)
+    app = build_app(latency_ms / 1000)
+
+    try:
+        emit(
+            {
+                "requests": requests,
+                "concurrency": concurrency,
+                "db_latency_ms": latency_ms,
+                "sync_threadpool": await drive(
+                    app, "sync", requests, concurrency, rows
+                ),
+                "async": await drive(app, "async", requests, concurrency, rows),
+            }
+        )
+    finally:
+        await get_async_engine().dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.rows, args.db_latency_ms))
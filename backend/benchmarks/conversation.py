@@ -0,0 +1,123 @@
+"""Multi-turn conversations: prompt size and tool executions per turn.
+
+Runs ``--turns`` turns of one conversation against a FakeGenaiClient. Every
+turn looks up the contact list and answers at length, as a long session
+with the assistant would. Each run is compared two ways:
+- unbounded: the whole history is resent and every tool call runs,
+- budgeted: the defaults, where older turns are folded into a summary and
+  repeated read-only tool calls are answered from the conversation's cache.
+
+Prompt tokens are estimated from the request contents (four characters per
+token, as the history budget counts them). Fails if the budgeted prompt
+outgrows the budget or the cache does not save tool executions.
+
+    python -m benchmarks.conversation --turns 30
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.common import create_tables, emit, seed_contacts
+
+ANSWER = "Here is what I found about your contacts. " * 20
+
+
+def prompt_tokens(request: dict) -> int:
+    from src.services.conversation_service import estimate_tokens
+
+    text = [str(request["config"].system_instruction or "")]
+    for content in request["contents"]:
+        for part in content.parts or []:
+            text.append(part.text or "")
+            if part.function_response:
+                text.append(str(part.function_response.response))
+    return estimate_tokens("".join(text))
+
+
+async def run(turns: int, token_budget: int, tool_cache_ttl: int) -> dict:
+    from src.model.fake import FakeGenaiClient
+    from src.model.scheduler import LlmScheduler
+    from src.services.chat_service import ChatService
+    from src.services.conversation_service import ConversationService
+
+    conversations = ConversationService(token_budget=token_budget)
+    scheduler = LlmScheduler()
+    conversation_id = await conversations.start()
+    per_turn = []
+    summaries = executed = 0
+    for turn in range(turns):
+        fake = FakeGenaiClient(
+            [[{"name": "get_contacts", "args": {"limit": 20}}], [ANSWER], ["summary"]]
+        )
+        svc = ChatService(
+            genai_client=fake,
+            cache_ttl=0,
+            scheduler=scheduler,
+            conversations=conversations,
+            tool_cache_ttl=tool_cache_ttl,
+        )
+        async for event, data in svc.stream_chat_response_with_mcp(
+            f"Turn {turn}: list my contacts", conversation_id
+        ):
+            if event == "tool_result" and not data["cached"]:
+                executed += 1
+        # The first two requests answer the turn, a third writes a summary
+        per_turn.append(max(prompt_tokens(request) for request in fake.requests[:2]))
+        summaries += len(fake.requests) > 2
+
+    return {
+        "first_turn_tokens": per_turn[0],
+        "last_turn_tokens": per_turn[-1],
+        "max_turn_tokens": max(per_turn),
+        "total_prompt_tokens": sum(per_turn),
+        "summaries": summaries,
+        "tool_executions": executed,
+    }
+
+
+async def main(turns: int):
+    create_tables()
+    seed_contacts(100)
+
+    from src.db.db import get_async_engine
+    from src.services.conversation_service import (
+        CHAT_HISTORY_TOKENS,
+        CHAT_SUMMARY_TOKENS,
+    )
+    from src.services.mpc_client import mcp_client_lifespan
+
+    try:
+        async with mcp_client_lifespan():
+            unbounded = await run(turns, token_budget=10**9, tool_cache_ttl=0)
+            budgeted = await run(
+                turns, token_budget=CHAT_HISTORY_TOKENS, tool_cache_ttl=300
+            )
+    finally:
+        await get_async_engine().dispose()
+
+    report = {
+        "turns": turns,
+        "history_tokens": CHAT_HISTORY_TOKENS,
+        "unbounded": unbounded,
+        "budgeted": budgeted,
+        "prompt_tokens_saved": 1
+        - budgeted["total_prompt_tokens"] / unbounded["total_prompt_tokens"],
+    }
+    emit(report)
+
+    # The fixed part of the prompt (system instruction, the turn's own tool
+    # result) is what a first turn costs; history may add at most the budget
+    # plus the summary on top of it
+    ceiling = budgeted["first_turn_tokens"] + CHAT_HISTORY_TOKENS + CHAT_SUMMARY_TOKENS
+    assert budgeted["max_turn_tokens"] <= ceiling, (budgeted, ceiling)
+    assert unbounded["tool_executions"] == turns, unbounded
+    assert budgeted["tool_executions"] == 1, budgeted
+    if unbounded["max_turn_tokens"] > ceiling:
+        assert budgeted["summaries"] > 0, budgeted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns))
@@ -0,0 +1,254 @@
+"""Duplicate detection: scan time, accuracy, and merging.
+
+Seeds ``--rows`` contacts plus a ``--duplicates`` fraction of planted
+duplicates of them, written around validation as old data would be:
+- reordered: the same words in another order and case, with another phone,
+- legacy_phone: the same name, the same number in a national format,
+- typo_legacy: a typo in the name, the number with an international prefix.
+Also plants ``--namesakes`` contacts who share one common name, too many
+to tell apart by name, which the scan must skip rather than cluster.
+
+Runs a scan through POST /contacts/duplicates/scan, timing single-contact
+reads while it runs, and reports its time, memory and how many of the
+planted pairs it found. Then merges a cluster through POST /contacts/merge,
+and asks the MCP find_duplicate_contacts tool. Fails unless recall and
+precision are at least 95%, no namesakes are clustered, the merge applies
+as a whole, and a merge naming a missing contact changes nothing.
+
+    python -m benchmarks.dedupe --rows 100000 --duplicates 0.01
+"""
+
+import argparse
+import asyncio
+import random
+import resource
+import time
+
+from benchmarks.common import (
+    contact_name,
+    create_tables,
+    emit,
+    seed_contacts,
+    stopwatch,
+    summarize,
+)
+
+KINDS = ("reordered", "legacy_phone", "typo_legacy")
+NEW_PHONE_BASE = 900_000_000
+NAMESAKE_PHONE_BASE = 600_000_000
+
+
+def original_phone(i: int) -> str:
+    return f"+48{500_000_000 + i}"
+
+
+def duplicate(i: int, kind: str, rng: random.Random) -> dict:
+    """A planted duplicate of the i-th seeded contact"""
+    name = contact_name(i)
+    digits = original_phone(i)[3:]
+    if kind == "reordered":
+        return {
+            "name": " ".join(reversed(name.split())).lower(),
+            "phone": f"+48{NEW_PHONE_BASE + i}",
+        }
+    if kind == "legacy_phone":
+        return {"name": name, "phone": f"{digits[:3]} {digits[3:6]} {digits[6:]}"}
+    first, last, number = name.split()
+    # A slip late in the surname, past the part the name blocks use
+    typo = last[:5] + rng.choice("aeiouy") + last[6:]
+    return {"name": f"{first} {typo} {number}", "phone": f"0048 {digits}"}
+
+
+def plant_duplicates(
+    rows: int, count: int, namesakes: int, seed: int
+) -> dict[int, tuple[int, str]]:
+    """
+    Insert `count` duplicates and the namesakes; returns the duplicates' ids
+    mapped to (original id, kind)
+    """
+    from sqlalchemy import insert
+
+    from src.db.db import get_engine
+    from src.db.models.Contact import ContactModel
+    from src.services.contact_service import count_contacts_statement
+
+    rng = random.Random(seed)
+    originals = rng.sample(range(rows), count)
+    planted = {}
+    engine = get_engine()
+    with engine.begin() as conn:
+        for n, i in enumerate(originals):
+            kind = KINDS[n % len(KINDS)]
+            contact_id = conn.execute(
+                insert(ContactModel)
+                .values(**duplicate(i, kind, rng))
+                .returning(ContactModel.id)
+            ).scalar_one()
+            # Seeded ids start at 1
+            planted[contact_id] = (i + 1, kind)
+        conn.execute(
+            insert(ContactModel),
+            [
+                {"name": "Jan Kowalski", "phone": f"+48{NAMESAKE_PHONE_BASE + i}"}
+                for i in range(namesakes)
+            ],
+        )
+        total = count + namesakes
+        conn.execute(count_contacts_statement(engine.dialect.name, total, total))
+    return planted
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main(rows: int, duplicates: float, namesakes: int, seed: int):
+    create_tables()
+    seed_contacts(rows)
+    planted = plant_duplicates(rows, int(rows * duplicates), namesakes, seed)
+
+    import httpx
+    from fastmcp import Client
+
+    from src.db.db import get_async_engine
+    from src.main import create_base_app
+    from src.mcp.server import get_mcp_server
+    from src.services.dedupe_service import DEDUPE_MAX_BLOCK, get_dedupe_service
+
+    report = {"rows": rows, "planted": len(planted), "namesakes": namesakes}
+    rng = random.Random(seed)
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=create_base_app()),
+            base_url="http://bench",
+            timeout=None,
+        ) as client:
+            rss_before = max_rss_mb()
+            start = time.perf_counter()
+            scan = await client.post("/api/contacts/duplicates/scan")
+            assert scan.status_code == 202, scan.text
+            reads: list[float] = []
+            while True:
+                with stopwatch(reads):
+                    await client.get(f"/api/contacts/{rng.randrange(rows) + 1}")
+                status = (await client.get("/api/contacts/duplicates?limit=1")).json()
+                if status["scan"]["status"] != "running":
+                    break
+                await asyncio.sleep(0.05)
+            elapsed = time.perf_counter() - start
+            assert status["scan"]["status"] == "done", status["scan"]
+
+            clusters, skip = [], 0
+            while skip is not None:
+                page, skip = await dedupe_page(client, skip)
+                clusters.extend(page)
+            report["scan"] = {
+                **{
+                    key: status["scan"][key]
+                    for key in ("scanned", "blocks", "oversized_blocks", "pairs")
+                },
+                "clusters": len(clusters),
+                "seconds": elapsed,
+                "rss_growth_mb": max_rss_mb() - rss_before,
+                "reads_during_scan": summarize(reads),
+            }
+
+            # Merge the first cluster into its lowest id, under the
+            # original's phone
+            cluster = clusters[0]["contacts"]
+            keep, *merged = cluster
+            before = (await client.get("/api/contacts/stats")).json()["total"]
+            missing = await client.post(
+                "/api/contacts/merge",
+                json={"keep": keep["id"], "merge": [merged[0]["id"], 10**9]},
+            )
+            unchanged = (await client.get(f"/api/contacts/{keep['id']}")).json()
+            result = await client.post(
+                "/api/contacts/merge",
+                json={
+                    "keep": keep["id"],
+                    "merge": [contact["id"] for contact in merged],
+                    "name": keep["name"],
+                },
+            )
+            after = (await client.get("/api/contacts/stats")).json()["total"]
+            gone = [
+                (await client.get(f"/api/contacts/{contact['id']}")).status_code
+                for contact in merged
+            ]
+            remaining = await dedupe_page(client, 0)
+
+        async with Client(get_mcp_server()) as mcp_client:
+            # The merge changed the contact book, so the tool scans again
+            tool = await mcp_client.call_tool_mcp("find_duplicate_contacts", {})
+            tool = tool.structuredContent
+        # Let a scan the tool started finish before the engine goes away
+        await get_dedupe_service().wait()
+    finally:
+        await get_async_engine().dispose()
+
+    found = {}
+    for cluster in clusters:
+        ids = {contact["id"] for contact in cluster["contacts"]}
+        for contact_id in ids:
+            found[contact_id] = ids
+    recall = {}
+    for kind in KINDS:
+        pairs = [(d, o) for d, (o, k) in planted.items() if k == kind]
+        hits = sum(original in found.get(dup, ()) for dup, original in pairs)
+        recall[kind] = hits / len(pairs)
+    # A cluster is right when it is exactly a planted pair
+    truth = {frozenset((dup, original)) for dup, (original, _) in planted.items()}
+    exact = sum(
+        frozenset(contact["id"] for contact in cluster["contacts"]) in truth
+        for cluster in clusters
+    )
+    report["recall"] = recall
+    report["precision"] = exact / len(clusters)
+    report["merge"] = {
+        "status": result.status_code,
+        "total_before": before,
+        "total_after": after,
+        "merged_contacts_status": gone,
+        "missing_status": missing.status_code,
+    }
+    report["mcp_tool"] = {
+        "success": tool["success"],
+        "message": tool.get("message"),
+        "clusters": len(tool.get("clusters") or []),
+    }
+    emit(report)
+
+    assert all(value >= 0.95 for value in recall.values()), recall
+    assert report["precision"] >= 0.95, report["precision"]
+    assert not any(
+        contact["name"] == "Jan Kowalski"
+        for cluster in clusters
+        for contact in cluster["contacts"]
+    ), "namesakes were clustered"
+    assert report["scan"]["oversized_blocks"] >= (namesakes > DEDUPE_MAX_BLOCK)
+    assert missing.status_code == 404 and unchanged["version"] == keep["version"]
+    assert result.status_code == 200 and result.json()["version"] == keep["version"] + 1
+    assert after == before - len(merged) and set(gone) == {404}, report["merge"]
+    assert keep["id"] not in {
+        contact["id"] for cluster in remaining[0] for contact in cluster["contacts"]
+    }
+    assert tool["success"] or "still running" in tool["message"], tool
+
+
+async def dedupe_page(client, skip: int) -> tuple[list, int | None]:
+    response = await client.get(
+        "/api/contacts/duplicates", params={"skip": skip, "limit": 100}
+    )
+    page = response.json()
+    return page["clusters"], page["next_skip"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--duplicates", type=float, default=0.01)
+    parser.add_argument("--namesakes", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.duplicates, args.namesakes, args.seed))
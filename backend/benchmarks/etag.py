@@ -0,0 +1,114 @@
+"""Conditional GETs on the contacts API: 200 vs 304 latency and bytes.
+
+Seeds ``--rows`` contacts, then polls a list page and single contacts the
+way a client refreshing its view does, first without and then with
+If-None-Match. Fails unless unchanged resources get an empty 304, and a
+write (update, create, import) makes the affected ETags stop matching.
+
+    python -m benchmarks.etag --rows 10000 --requests 500
+"""
+
+import argparse
+import asyncio
+import random
+
+from benchmarks.common import create_tables, emit, seed_contacts, stopwatch, summarize
+
+
+async def poll(client, paths: list[str], etags: dict | None) -> dict:
+    samples: list[float] = []
+    sent = 0
+    statuses: dict[int, int] = {}
+    for path in paths:
+        headers = {"If-None-Match": etags[path]} if etags else {}
+        with stopwatch(samples):
+            response = await client.get(path, headers=headers)
+        sent += len(response.content)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return {"statuses": statuses, "bytes": sent, **summarize(samples)}
+
+
+async def main(rows: int, requests: int, seed: int):
+    create_tables()
+    seed_contacts(rows)
+
+    import httpx
+
+    from src.db.db import get_async_engine
+    from src.main import create_base_app
+
+    rng = random.Random(seed)
+    list_path = "/api/contacts?limit=100"
+    paths = {
+        "list": [list_path] * requests,
+        "get": [f"/api/contacts/{rng.randrange(rows) + 1}" for _ in range(requests)],
+    }
+    report = {"rows": rows, "requests": requests}
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=create_base_app()),
+            base_url="http://bench",
+        ) as client:
+            etags = {}
+            for path in {p for group in paths.values() for p in group}:
+                etags[path] = (await client.get(path)).headers["ETag"]
+
+            for name, group in paths.items():
+                report[name] = {
+                    "unconditional": await poll(client, group, None),
+                    "if_none_match": await poll(client, group, etags),
+                }
+
+            # Writes retire exactly the ETags they should
+            contact_path = paths["get"][0]
+            contact = (await client.get(contact_path)).json()
+            updated = await client.put(
+                contact_path, json={"name": "Renamed", "phone": contact["phone"]}
+            )
+            after_update = await client.get(
+                contact_path, headers={"If-None-Match": etags[contact_path]}
+            )
+            other = next(p for p in paths["get"] if p != contact_path)
+            untouched = await client.get(other, headers={"If-None-Match": etags[other]})
+            list_after_update = await client.get(
+                list_path, headers={"If-None-Match": etags[list_path]}
+            )
+            created = await client.post(
+                "/api/contacts", json={"name": "New", "phone": "+48699000001"}
+            )
+            list_after_create = await client.get(
+                list_path, headers={"If-None-Match": list_after_update.headers["ETag"]}
+            )
+            imported = await client.post(
+                "/api/contacts/import",
+                content="name,phone\nImported,+48699000002\n",
+                headers={"Content-Type": "text/csv"},
+            )
+            list_after_import = await client.get(
+                list_path, headers={"If-None-Match": list_after_create.headers["ETag"]}
+            )
+    finally:
+        await get_async_engine().dispose()
+
+    emit(report)
+    for name in paths:
+        conditional = report[name]["if_none_match"]
+        assert conditional["statuses"] == {304: requests}, (name, conditional)
+        assert conditional["bytes"] == 0, name
+    assert updated.status_code == 200 and updated.headers["ETag"] != etags[contact_path]
+    assert after_update.status_code == 200, after_update.status_code
+    assert after_update.headers["ETag"] == updated.headers["ETag"]
+    assert after_update.json()["version"] == contact["version"] + 1
+    assert untouched.status_code == 304, untouched.status_code
+    assert list_after_update.status_code == 200
+    assert created.status_code == 200 and list_after_create.status_code == 200
+    assert imported.status_code == 200 and list_after_import.status_code == 200
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.requests, args.seed))
@@ -0,0 +1,117 @@
+"""Streaming export throughput and peak memory.
+
+Seeds ``--rows`` contacts, then streams GET /api/contacts/export through the
+ASGI app while a thread samples the process RSS. Resident memory should stay
+flat however many rows are exported.
+
+    python -m benchmarks.export --rows 5000000 --format csv
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+from benchmarks.common import create_tables, emit, seed_contacts
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE / 2**20
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def stop(self):
+        self._stop.set()
+        self.join()
+
+
+async def export(app, format: str) -> tuple[int, int]:
+    """Call the ASGI app directly; httpx's ASGITransport buffers the body."""
+    done = asyncio.Event()
+    totals = {"bytes": 0, "lines": 0}
+
+    async def receive():
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            totals["bytes"] += len(body)
+            totals["lines"] += body.count(b"\n")
+            if not message.get("more_body"):
+                done.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/contacts/export",
+        "raw_path": b"/api/contacts/export",
+        "root_path": "",
+        "query_string": f"format={format}".encode(),
+        "headers": [],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return totals["bytes"], totals["lines"]
+
+
+async def main(rows: int, format: str):
+    from src.db.db import get_async_engine
+    from src.main import create_base_app
+
+    create_tables()
+    seed_contacts(rows)
+    app = create_base_app()
+
+    baseline = rss_mb()
+    sampler = RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        exported_bytes, exported_lines = await export(app, format)
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+        await get_async_engine().dispose()
+
+    emit(
+        {
+            "rows": rows,
+            "format": format,
+            "seconds": elapsed,
+            "rows_per_s": rows / elapsed,
+            "bytes": exported_bytes,
+            "lines": exported_lines,
+            "rss_before_mb": baseline,
+            "peak_rss_mb": sampler.peak,
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--format", choices=("csv", "ndjson", "vcf"), default="csv")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.format))
@@ -0,0 +1,232 @@
+"""Background jobs: imports, exports and reindexing off the request path.
+
+Seeds ``--rows`` contacts, then imports ``--import-rows`` more from CSV in
+the request (POST /contacts/import) and as a job (?background=true), timing
+both responses and single-contact reads while the job runs. Exports as a
+job and compares the download with GET /contacts/export, rebuilds the
+search index as a job while a contact is renamed, and follows a job
+through the MCP tools.
+
+Then checks the job service itself: no more than JOB_WORKERS jobs run at
+once, a full queue turns jobs away, and a job whose process stopped is
+reported as failed. Fails unless every job succeeds with the same outcome
+as the request it replaces and reports progress on the way.
+
+    python -m benchmarks.jobs --rows 100000 --import-rows 50000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import (
+    contact_name,
+    create_tables,
+    emit,
+    seed_contacts,
+    stopwatch,
+    summarize,
+)
+
+IMPORT_PHONE_BASE = 700_000_000
+
+
+def import_body(start: int, count: int) -> bytes:
+    lines = ["name,phone"]
+    for i in range(start, start + count):
+        lines.append(f"{contact_name(i)},+48{IMPORT_PHONE_BASE + i}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def follow(client, job: dict, rng: random.Random, rows: int) -> tuple:
+    """Poll a job until it finishes; the job, progress seen, and read latencies"""
+    progress, reads = [], []
+    while job["status"] in ("queued", "running"):
+        with stopwatch(reads):
+            await client.get(f"/api/contacts/{rng.randrange(rows) + 1}")
+        job = (await client.get(f"/api/jobs/{job['id']}")).json()
+        if job["progress"] is not None:
+            progress.append(job["progress"])
+        await asyncio.sleep(0.02)
+    return job, progress, reads
+
+
+async def pool_checks(workers: int) -> dict:
+    """Concurrency bound, queue bound and stale job detection"""
+    from datetime import datetime, timedelta, timezone
+
+    from src.db.schemas import Job
+    from src.services.job_service import (
+        JOB_LOST,
+        DatabaseJobStore,
+        JobQueueFullError,
+        JobService,
+        MemoryJobStore,
+    )
+
+    jobs = JobService(MemoryJobStore(), workers=workers, queue_size=workers * 3)
+    running = peak = 0
+
+    async def work(ctx):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        for step in range(5):
+            ctx.progress(step + 1, 5)
+            await asyncio.sleep(0.02)
+        running -= 1
+        return {"ok": True}
+
+    submitted = [await jobs.submit("sleep", work) for _ in range(workers * 3)]
+    try:
+        await jobs.submit("sleep", work)
+        rejected = False
+    except JobQueueFullError:
+        rejected = True
+    finished = [await jobs.wait(job.id) for job in submitted]
+
+    # A job left running by a process that went away
+    store = DatabaseJobStore()
+    long_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    orphan = Job(
+        id="orphan",
+        kind="sleep",
+        status="running",
+        createdAt=long_ago,
+        updatedAt=long_ago,
+    )
+    await store.save(orphan)
+    lost = await JobService(store).get("orphan")
+    return {
+        "workers": workers,
+        "peak_running": peak,
+        "queue_full_rejected": rejected,
+        "statuses": sorted({job.status for job in finished}),
+        "orphan": {"status": lost.status, "lost": lost.error == JOB_LOST},
+    }
+
+
+async def main(rows: int, import_rows: int, seed: int):
+    create_tables()
+    seed_contacts(rows)
+
+    import httpx
+    from fastmcp import Client
+
+    from src.db.db import get_async_engine
+    from src.main import create_base_app
+    from src.mcp.server import get_mcp_server
+    from src.services.job_service import JOB_WORKERS
+
+    rng = random.Random(seed)
+    report = {"rows": rows, "import_rows": import_rows}
+    csv = {"Content-Type": "text/csv"}
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=create_base_app()),
+            base_url="http://bench",
+            timeout=None,
+        ) as client:
+            start = time.perf_counter()
+            inline = await client.post(
+                "/api/contacts/import", content=import_body(0, import_rows), headers=csv
+            )
+            inline_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            accepted = await client.post(
+                "/api/contacts/import?background=true",
+                content=import_body(import_rows, import_rows),
+                headers=csv,
+            )
+            accepted_seconds = time.perf_counter() - start
+            assert accepted.status_code == 202, accepted.text
+            imported, import_progress, reads = await follow(
+                client, accepted.json(), rng, rows
+            )
+            job_seconds = time.perf_counter() - start
+            report["import"] = {
+                "in_request_s": inline_seconds,
+                "job_accepted_s": accepted_seconds,
+                "job_finished_s": job_seconds,
+                "progress_samples": len(import_progress),
+                "reads_during_job": summarize(reads),
+            }
+
+            exported, export_progress, _ = await follow(
+                client,
+                (await client.post("/api/contacts/export?format=ndjson")).json(),
+                rng,
+                rows,
+            )
+            download = await client.get(f"/api/jobs/{exported['id']}/download")
+            streamed = await client.get("/api/contacts/export?format=ndjson")
+            report["export"] = {
+                "result": exported["result"],
+                "progress_samples": len(export_progress),
+                "matches_stream": download.content == streamed.content,
+            }
+
+            query = contact_name(rows // 2)
+            before = await client.get("/api/contacts/stats", params={"q": query})
+            started = (await client.post("/api/contacts/reindex")).json()
+            # Written while the index is rebuilt, so the rebuild reads it stale
+            renamed = (await client.get("/api/contacts/1")).json()
+            await client.put(
+                "/api/contacts/1", json={"name": "Zyxwvut", "phone": renamed["phone"]}
+            )
+            reindexed, _, _ = await follow(client, started, rng, rows)
+            after = await client.get("/api/contacts/stats", params={"q": query})
+            found = await client.get("/api/contacts/stats", params={"q": "Zyxwvut"})
+            report["reindex"] = {
+                "result": reindexed["result"],
+                "matches_before": before.json()["matches"],
+                "matches_after": after.json()["matches"],
+                "renamed_during_rebuild_found": found.json()["matches"],
+            }
+            missing = await client.get("/api/jobs/missing")
+
+        async with Client(get_mcp_server()) as mcp_client:
+            started = await mcp_client.call_tool_mcp(
+                "export_contacts", {"format": "vcf"}
+            )
+            job = started.structuredContent["job"]
+            while job["status"] in ("queued", "running"):
+                await asyncio.sleep(0.05)
+                status = await mcp_client.call_tool_mcp(
+                    "get_job_status", {"job_id": job["id"]}
+                )
+                job = status.structuredContent["job"]
+            report["mcp"] = {"status": job["status"], "result": job["result"]}
+
+        report["pool"] = await pool_checks(JOB_WORKERS)
+    finally:
+        await get_async_engine().dispose()
+
+    emit(report)
+    assert inline.status_code == 200, inline.text
+    assert imported["status"] == "succeeded", imported
+    assert imported["result"]["inserted"] == inline.json()["inserted"] == import_rows
+    assert report["import"]["progress_samples"] > 0, "the import reported no progress"
+    assert exported["status"] == "succeeded", exported
+    assert exported["result"]["contacts"] == rows + 2 * import_rows
+    assert report["export"]["matches_stream"], "the export differs from the stream"
+    assert reindexed["status"] == "succeeded", reindexed
+    assert report["reindex"]["matches_after"] == report["reindex"]["matches_before"]
+    assert report["reindex"]["renamed_during_rebuild_found"] == 1, report["reindex"]
+    assert missing.status_code == 404
+    assert report["mcp"]["status"] == "succeeded", report["mcp"]
+    pool = report["pool"]
+    assert pool["peak_running"] == pool["workers"], pool
+    assert pool["queue_full_rejected"] and pool["statuses"] == ["succeeded"], pool
+    assert pool["orphan"] == {"status": "failed", "lost": True}, pool
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--import-rows", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.import_rows, args.seed))
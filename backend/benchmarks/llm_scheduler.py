@@ -0,0 +1,136 @@
+"""LLM scheduler against a FakeGenaiClient that injects latency and errors.
+
+Checks, and fails on, each behaviour of src/model/scheduler.py:
+- a burst never has more than the cap of model calls in flight,
+- identical concurrent prompts are answered by one model call,
+- 429/503 responses are retried, other errors are not,
+- a streamed round is retried when it fails before its first chunk,
+- requests that cannot get a slot in time get 429 with Retry-After.
+
+    python -m benchmarks.llm_scheduler --burst 64 --cap 4
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import create_tables, emit
+
+
+def api_error(code: int):
+    from google.genai import errors
+
+    return errors.APIError(code, {"error": {"code": code, "message": "injected"}})
+
+
+async def main(burst: int, cap: int, delay: float):
+    import httpx
+    from fastapi import FastAPI
+
+    from src.api.chat import router as chat_router
+    from src.db.db import get_async_engine
+    from src.model.fake import FakeGenaiClient
+    from src.model.scheduler import LlmScheduler
+    from src.services.chat_service import ChatService, get_chat_service
+    from src.services.mpc_client import mcp_client_lifespan
+
+    create_tables()
+
+    def service(fake, **scheduler) -> ChatService:
+        scheduler = LlmScheduler(**{"base_delay": 0.01, **scheduler})
+        return ChatService(genai_client=fake, cache_ttl=0, scheduler=scheduler)
+
+    report = {"burst": burst, "cap": cap, "delay_s": delay}
+    try:
+        async with mcp_client_lifespan():
+            # Burst of distinct prompts: the cap holds and everything is answered
+            fake = FakeGenaiClient(delay=delay)
+            svc = service(fake, max_concurrency=cap, queue_timeout=60)
+            start = time.perf_counter()
+            answers = await asyncio.gather(
+                *(svc.get_chat_response_with_mcp(f"prompt {i}") for i in range(burst))
+            )
+            report["burst_result"] = {
+                "elapsed_s": time.perf_counter() - start,
+                "model_calls": len(fake.requests),
+                "max_in_flight": fake.max_in_flight,
+            }
+            assert fake.max_in_flight <= cap, report["burst_result"]
+            assert answers == [f"prompt {i}" for i in range(burst)]
+
+            # The same prompt many times over: one model call
+            fake = FakeGenaiClient(delay=delay)
+            svc = service(fake, max_concurrency=cap)
+            answers = await asyncio.gather(
+                *(svc.get_chat_response_with_mcp("Who is Anna?") for _ in range(burst))
+            )
+            report["coalesced"] = {"requests": burst, "model_calls": len(fake.requests)}
+            assert len(fake.requests) == 1 and set(answers) == {"Who is Anna?"}
+
+            # Transient errors are retried, a bad request is not
+            fake = FakeGenaiClient([api_error(503), api_error(429), ["recovered"]])
+            assert await service(fake).get_chat_response_with_mcp("x") == "recovered"
+            retried = len(fake.requests)
+            fake = FakeGenaiClient([api_error(400), ["unreachable"]])
+            try:
+                await service(fake).get_chat_response_with_mcp("x")
+                raise AssertionError("a 400 was retried")
+            except Exception as e:
+                assert getattr(e, "code", None) == 400, e
+            report["retries"] = {
+                "transient_calls": retried,
+                "bad_request_calls": len(fake.requests),
+            }
+            assert retried == 3 and len(fake.requests) == 1, report["retries"]
+
+            fake = FakeGenaiClient([api_error(503), ["streamed"]])
+            events = [
+                event
+                async for event in service(fake).stream_chat_response_with_mcp("x")
+            ]
+            assert events[-1] == ("message", {"content": "streamed"}), events
+
+            # Deadlines: one slot, slow model, a queue timeout shorter than a call
+            fake = FakeGenaiClient(delay=max(delay, 0.2))
+            tight = service(fake, max_concurrency=1, queue_timeout=0.1)
+            app = FastAPI()
+            app.include_router(chat_router, prefix="/api")
+            app.dependency_overrides[get_chat_service] = lambda: tight
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://bench"
+            ) as client:
+                responses = await asyncio.gather(
+                    *(
+                        client.post("/api/chat", json={"content": f"q{i}"})
+                        for i in range(8)
+                    ),
+                    client.post("/api/chat/stream", json={"content": "streamed q"}),
+                )
+            statuses = [response.status_code for response in responses]
+            report["deadline"] = {
+                "statuses": statuses,
+                "retry_after": sorted(
+                    {
+                        r.headers.get("Retry-After")
+                        for r in responses
+                        if r.status_code == 429
+                    }
+                ),
+            }
+            assert set(statuses) == {200, 429}, statuses
+            assert all(
+                r.headers.get("Retry-After") for r in responses if r.status_code == 429
+            )
+    finally:
+        await get_async_engine().dispose()
+
+    emit(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--burst", type=int, default=64)
+    parser.add_argument("--cap", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.burst, args.cap, args.delay))
@@ -0,0 +1,423 @@
+"""Load suite: contacts API, every MCP tool and the chat endpoints.
+
+Seeds ``--rows`` contacts (10k by default; 10M works, give it time), then
+drives each scenario in-process at ``--concurrency`` concurrent callers and
+reports throughput, p50/p95/p99 latency and errors per scenario. Gemini is
+replaced by FakeGenaiClient, scripted to call one tool and then answer, so
+chat numbers are the app's own overhead. Writes use their own phone range
+and a full run deletes what it wrote, so a DATABASE_URL seeded by an earlier
+run is reused as is. For Postgres, run ``alembic upgrade head`` first.
+
+Save reports with ``--output`` and diff them across commits.
+
+    python -m benchmarks.load --rows 10000 --requests 2000 --concurrency 32
+    python -m benchmarks.load --only api.get mcp.search_contacts --output a.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+
+from benchmarks.common import (
+    contact_name,
+    create_tables,
+    emit,
+    seed_contacts,
+    summarize,
+)
+
+WRITE_PHONE_BASE = 600_000_000
+PAGE_SIZE = 50
+SEARCHES = ("kowalski", "anna now", "kowalsky", "Wiśniewska", "601", "+48 500 012")
+# Model turns for one chat request: look something up, then answer
+CHAT_TURNS = (
+    [{"name": "search_contacts", "args": {"query": "kowalski", "limit": 5}}],
+    ["Here are the Kowalskis I found."],
+)
+
+
+def seed_phone(i: int) -> str:
+    """Phone of the i-th seeded contact (see benchmarks.common.seed_contacts)"""
+    return f"+48{500_000_000 + i}"
+
+
+def write_phone(i: int) -> str:
+    return f"+48{WRITE_PHONE_BASE + i}"
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def drive(call, requests: int, concurrency: int) -> dict:
+    """
+    Run ``call(i)`` for i in range(requests), at most ``concurrency`` at a
+    time. A call fails by raising or returning False.
+    """
+    samples: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            if ok is False:
+                errors += 1
+            else:
+                samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    report = {"requests": requests, "errors": errors, "throughput_rps": 0.0}
+    if samples:
+        report.update(throughput_rps=len(samples) / elapsed, **summarize(samples))
+    return report
+
+
+def api_scenarios(client, rows: int, requests: int, rng: random.Random) -> dict:
+    """
+    Name -> (call, setup). Scenarios run in this order; update and delete
+    create their own contacts first when the create scenario was not run.
+    """
+    created: dict[int, int] = {}
+    cursors: list[str] = []
+
+    def rid() -> int:
+        return rng.randrange(rows) + 1
+
+    async def create(i: int):
+        response = await client.post(
+            "/api/contacts",
+            json={"name": contact_name(rows + i), "phone": write_phone(i)},
+        )
+        if response.status_code != 200:
+            return False
+        created[i] = response.json()["id"]
+
+    async def get(i: int):
+        return (await client.get(f"/api/contacts/{rid()}")).status_code == 200
+
+    async def list_offset(i: int):
+        skip = rng.randrange(max(rows - PAGE_SIZE, 1))
+        response = await client.get(
+            "/api/contacts", params={"skip": skip, "limit": PAGE_SIZE}
+        )
+        return response.status_code == 200
+
+    async def list_keyset(i: int):
+        params = {"pagination": "keyset", "limit": PAGE_SIZE}
+        if cursors:
+            params["after"] = cursors[i % len(cursors)]
+        response = await client.get("/api/contacts", params=params)
+        return response.status_code == 200
+
+    async def update(i: int):
+        response = await client.put(
+            f"/api/contacts/{created[i]}",
+            json={"name": f"{contact_name(rows + i)} Jr", "phone": write_phone(i)},
+        )
+        return response.status_code == 200
+
+    async def delete(i: int):
+        response = await client.delete(f"/api/contacts/{created[i]}")
+        return response.status_code == 200
+
+    async def stats(i: int):
+        response = await client.get(
+            "/api/contacts/stats", params={"q": SEARCHES[i % len(SEARCHES)]}
+        )
+        return response.status_code == 200
+
+    async def chat(i: int):
+        response = await client.post("/api/chat", json={"content": f"hello {i}"})
+        return response.status_code == 200
+
+    async def chat_stream(i: int):
+        response = await client.post(
+            "/api/chat/stream", json={"content": "Find the Kowalskis"}
+        )
+        return response.status_code == 200 and "event: message" in response.text
+
+    async def ensure_created():
+        for i in range(requests):
+            if i not in created:
+                await create(i)
+
+    async def collect_cursors():
+        # Keyset pages cost the same at any depth, so the first ones will do
+        after = None
+        for _ in range(min(100, rows // PAGE_SIZE)):
+            params = {"pagination": "keyset", "limit": PAGE_SIZE}
+            if after:
+                params["after"] = after
+            after = (await client.get("/api/contacts", params=params)).json()[
+                "next_cursor"
+            ]
+            if not after:
+                break
+            cursors.append(after)
+
+    return {
+        "api.create": (create, None),
+        "api.get": (get, None),
+        "api.list_offset": (list_offset, None),
+        "api.list_keyset": (list_keyset, collect_cursors),
+        "api.update": (update, ensure_created),
+        "api.delete": (delete, ensure_created),
+        "api.stats": (stats, None),
+        "chat": (chat, None),
+        "chat.stream": (chat_stream, None),
+    }
+
+
+def mcp_scenarios(client, rows: int, requests: int, rng: random.Random) -> dict:
+    """One scenario per MCP tool, named mcp.<tool>, in the same form as above"""
+    # Tool writes use the phones after the API scenarios' range
+    offset = requests
+    batch = 10
+    created: dict[int, int] = {}
+    created_batches: dict[int, list[int]] = {}
+
+    def rid() -> int:
+        return rng.randrange(rows) + 1
+
+    async def call(name: str, args: dict):
+        result = await client.call_tool_mcp(name, args)
+        if result.isError:
+            return False
+        return (result.structuredContent or {}).get("success", True)
+
+    async def create_contact(i: int):
+        result = await client.call_tool_mcp(
+            "create_contact",
+            {"name": contact_name(rows + offset + i), "phone": write_phone(offset + i)},
+        )
+        contact = (result.structuredContent or {}).get("contact")
+        if result.isError or not contact:
+            return False
+        created[i] = contact["id"]
+
+    async def update_contact(i: int):
+        return await call(
+            "update_contact",
+            {
+                "contact_id": created[i],
+                "name": f"{contact_name(rows + offset + i)} Jr",
+                "phone": write_phone(offset + i),
+            },
+        )
+
+    def batch_contacts(i: int) -> list[tuple[int, str, str]]:
+        start = offset * 2 + i * batch
+        return [
+            (j, contact_name(rows + j), write_phone(j))
+            for j in range(start, start + batch)
+        ]
+
+    async def create_contacts(i: int):
+        result = await client.call_tool_mcp(
+            "create_contacts",
+            {
+                "contacts": [
+                    {"name": name, "phone": phone}
+                    for _, name, phone in batch_contacts(i)
+                ]
+            },
+        )
+        content = result.structuredContent or {}
+        if result.isError or not content.get("success"):
+            return False
+        created_batches[i] = [item["id"] for item in content["results"]]
+
+    async def update_contacts(i: int):
+        return await call(
+            "update_contacts",
+            {
+                "contacts": [
+                    {"id": contact_id, "name": f"{name} Jr", "phone": phone}
+                    for contact_id, (_, name, phone) in zip(
+                        created_batches[i], batch_contacts(i)
+                    )
+                ]
+            },
+        )
+
+    async def ensure_created():
+        for i in range(requests):
+            if i not in created:
+                await create_contact(i)
+
+    async def ensure_created_batches():
+        for i in range(requests):
+            if i not in created_batches:
+                await create_contacts(i)
+
+    return {
+        "mcp.get_contacts": (
+            lambda i: call("get_contacts", {"limit": PAGE_SIZE}),
+            None,
+        ),
+        "mcp.get_contact_by_id": (
+            lambda i: call("get_contact_by_id", {"contact_id": rid()}),
+            None,
+        ),
+        "mcp.get_contact_by_phone_number": (
+            lambda i: call(
+                "get_contact_by_phone_number", {"phone": seed_phone(rid() - 1)}
+            ),
+            None,
+        ),
+        "mcp.get_contacts_by_ids": (
+            lambda i: call(
+                "get_contacts_by_ids",
+                {"contact_ids": [rid() for _ in range(batch)]},
+            ),
+            None,
+        ),
+        "mcp.search_contacts": (
+            lambda i: call("search_contacts", {"query": SEARCHES[i % len(SEARCHES)]}),
+            None,
+        ),
+        "mcp.count_contacts": (
+            lambda i: call("count_contacts", {"query": SEARCHES[i % len(SEARCHES)]}),
+            None,
+        ),
+        "mcp.format_phone_number_tool": (
+            lambda i: call("format_phone_number_tool", {"phone": "600 100 200"}),
+            None,
+        ),
+        "mcp.create_contact": (create_contact, None),
+        "mcp.update_contact": (update_contact, ensure_created),
+        "mcp.delete_contact": (
+            lambda i: call("delete_contact", {"contact_id": created[i]}),
+            ensure_created,
+        ),
+        "mcp.create_contacts": (create_contacts, None),
+        "mcp.update_contacts": (update_contacts, ensure_created_batches),
+        "mcp.delete_contacts": (
+            lambda i: call("delete_contacts", {"contact_ids": created_batches[i]}),
+            ensure_created_batches,
+        ),
+    }
+
+
+def fake_chat_service():
+    from src.model.fake import FakeGenaiClient
+    from src.services.chat_service import ChatService
+
+    # A fresh script per request; the answer cache is off so every request
+    # goes through the model and the tool
+    return ChatService(genai_client=FakeGenaiClient(CHAT_TURNS), cache_ttl=0)
+
+
+async def main(
+    rows: int,
+    requests: int,
+    concurrency: int,
+    only: list[str] | None,
+    output: str | None,
+    seed: int,
+):
+    create_tables()
+
+    import httpx
+    from fastmcp import Client
+    from sqlalchemy import func, select
+
+    from src.db.db import SessionLocal, get_async_engine
+    from src.db.models.Contact import ContactModel
+    from src.main import create_base_app
+    from src.mcp.server import get_mcp_server
+    from src.services.chat_service import get_chat_service
+    from src.services.mpc_client import mcp_client_lifespan
+
+    with SessionLocal() as db:
+        existing = db.scalar(select(func.count()).select_from(ContactModel))
+    if not existing:
+        seed_contacts(rows)
+    elif existing < rows:
+        raise SystemExit(f"The database holds {existing} contacts, not {rows}")
+
+    app = create_base_app()
+    app.dependency_overrides[get_chat_service] = fake_chat_service
+    rng = random.Random(seed)
+    report = {
+        "commit": git_commit(),
+        "database": get_async_engine().dialect.name,
+        "rows": rows,
+        "requests": requests,
+        "concurrency": concurrency,
+        "seed": seed,
+        "scenarios": {},
+    }
+
+    try:
+        async with (
+            mcp_client_lifespan(),
+            httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://bench"
+            ) as http,
+            Client(get_mcp_server()) as tools,
+        ):
+            scenarios = {
+                **api_scenarios(http, rows, requests, rng),
+                **mcp_scenarios(tools, rows, requests, rng),
+            }
+            listed = {tool.name for tool in await tools.list_tools()}
+            report["unbenchmarked_tools"] = sorted(
+                listed - {name.removeprefix("mcp.") for name in scenarios}
+            )
+
+            for name, (call, setup) in scenarios.items():
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                if setup:
+                    await setup()
+                report["scenarios"][name] = await drive(call, requests, concurrency)
+    finally:
+        await get_async_engine().dispose()
+
+    emit(report)
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--only", nargs="*", help="Scenario name prefixes, e.g. api.get mcp."
+    )
+    parser.add_argument("--output", help="Also write the report to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.rows,
+            args.requests,
+            args.concurrency,
+            args.only,
+            args.output,
+            args.seed,
+        )
+    )
@@ -0,0 +1,91 @@
+"""Per-turn MCP overhead: loopback HTTP vs in-process transport.
+
+A chat turn lists the tools and calls at least one of them, so that is what
+each sample measures. Run from the ``backend`` directory:
+
+    python -m benchmarks.mcp_transport --turns 200
+"""
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+
+from benchmarks.common import create_tables, emit, stopwatch, summarize
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _turn(client):
+    await client.list_tools()
+    await client.call_tool("get_contacts", {})
+
+
+async def _per_request_session(client, turns: int) -> dict:
+    samples: list[float] = []
+    for _ in range(turns):
+        with stopwatch(samples):
+            async with client:
+                await _turn(client)
+    return summarize(samples)
+
+
+async def _shared_session(client, turns: int) -> dict:
+    samples: list[float] = []
+    async with client:
+        for _ in range(turns):
+            with stopwatch(samples):
+                async with client:
+                    await _turn(client)
+    return summarize(samples)
+
+
+async def main(turns: int):
+    create_tables()
+
+    from src.main import app
+    from src.services import mpc_client
+
+    port = _free_port()
+    server = _serve(app, port)
+    mpc_client.MCP_SERVER_URL = f"http://127.0.0.1:{port}/api/llm/mcp"
+    try:
+        emit(
+            {
+                "turns": turns,
+                "http_per_request": await _per_request_session(
+                    mpc_client.create_mcp_client("http"), turns
+                ),
+                "memory_per_request": await _per_request_session(
+                    mpc_client.create_mcp_client("memory"), turns
+                ),
+                "memory_shared": await _shared_session(
+                    mpc_client.create_mcp_client("memory"), turns
+                ),
+            }
+        )
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=100)
+    asyncio.run(main(parser.parse_args().turns))
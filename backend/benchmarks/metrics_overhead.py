@@ -0,0 +1,136 @@
+"""Cost of the metrics instrumentation on the hot paths.
+
+Times the same requests through a bare app and one wrapped in
+MetricsMiddleware, the same SQL before and after the engine hooks are
+installed, and an MCP tool call with and without ToolMetricsMiddleware.
+The script fails if any of them adds more than the budget per operation:
+``--budget-us`` or ``--budget-pct`` of the bare time, whichever is larger,
+so run-to-run noise on slow paths (an MCP call is milliseconds) does not
+fail it.
+
+    python -m benchmarks.metrics_overhead --requests 2000 --budget-us 100
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import create_tables, emit, seed_contacts
+
+
+async def per_call(fn, calls: int) -> float:
+    """Mean seconds per call"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        await fn()
+    return (time.perf_counter() - start) / calls
+
+
+async def compare(bare, instrumented, calls: int, rounds: int = 5) -> dict:
+    """Interleave rounds so drift affects both sides alike; keep the best of each"""
+    await per_call(bare, calls // 10 or 1)
+    await per_call(instrumented, calls // 10 or 1)
+    bare_s, instrumented_s = [], []
+    for _ in range(rounds):
+        bare_s.append(await per_call(bare, calls))
+        instrumented_s.append(await per_call(instrumented, calls))
+    return {
+        "bare_us": min(bare_s) * 1e6,
+        "instrumented_us": min(instrumented_s) * 1e6,
+        "overhead_us": (min(instrumented_s) - min(bare_s)) * 1e6,
+        "bare_median_us": statistics.median(bare_s) * 1e6,
+        "instrumented_median_us": statistics.median(instrumented_s) * 1e6,
+    }
+
+
+async def main(requests: int, budget_us: float, budget_pct: float):
+    create_tables()
+    seed_contacts(100)
+
+    import httpx
+    from fastapi import FastAPI
+    from fastmcp import Client, FastMCP
+    from sqlalchemy import select
+
+    from src.api.contacts import router as contacts_router
+    from src.db.db import AsyncSessionLocal, get_async_engine
+    from src.db.models.Contact import ContactModel
+    from src.mcp.tools.contact import register_contact_tools
+    from src.services.metrics import (
+        MetricsMiddleware,
+        ToolMetricsMiddleware,
+        instrument_engine,
+    )
+
+    report = {"requests": requests, "budget_us": budget_us, "budget_pct": budget_pct}
+    try:
+        # HTTP: a cached read, so the middleware is most of what differs
+        app = FastAPI()
+        app.include_router(contacts_router, prefix="/api")
+        transports = {
+            "bare": httpx.ASGITransport(app=app),
+            "instrumented": httpx.ASGITransport(app=MetricsMiddleware(app)),
+        }
+        clients = {
+            name: httpx.AsyncClient(transport=transport, base_url="http://bench")
+            for name, transport in transports.items()
+        }
+        try:
+            report["http"] = await compare(
+                lambda: clients["bare"].get("/api/contacts/1"),
+                lambda: clients["instrumented"].get("/api/contacts/1"),
+                requests,
+            )
+        finally:
+            for client in clients.values():
+                await client.aclose()
+
+        # SQL: the engine hooks cannot be removed, so bare runs come first
+        async with AsyncSessionLocal() as db:
+            query = select(ContactModel).where(ContactModel.id == 1)
+
+            async def read():
+                await db.scalar(query)
+
+            await per_call(read, requests // 10)
+            bare = [await per_call(read, requests) for _ in range(5)]
+            instrument_engine(get_async_engine().sync_engine, "benchmark")
+            instrumented = [await per_call(read, requests) for _ in range(5)]
+        report["sql"] = {
+            "bare_us": min(bare) * 1e6,
+            "instrumented_us": min(instrumented) * 1e6,
+            "overhead_us": (min(instrumented) - min(bare)) * 1e6,
+        }
+
+        # MCP: the same tools on two servers, one with the timing middleware
+        servers = {"bare": FastMCP("bare"), "instrumented": FastMCP("instrumented")}
+        servers["instrumented"].add_middleware(ToolMetricsMiddleware())
+        for server in servers.values():
+            register_contact_tools(server)
+        async with (
+            Client(servers["bare"]) as bare,
+            Client(servers["instrumented"]) as instrumented,
+        ):
+            report["mcp"] = await compare(
+                lambda: bare.call_tool("get_contact_by_id", {"contact_id": 1}),
+                lambda: instrumented.call_tool("get_contact_by_id", {"contact_id": 1}),
+                requests // 4 or 1,
+            )
+    finally:
+        await get_async_engine().dispose()
+
+    emit(report)
+    for path in ("http", "sql", "mcp"):
+        result = report[path]
+        budget = max(budget_us, result["bare_us"] * budget_pct / 100)
+        assert result["overhead_us"] <= budget, (path, result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--budget-us", type=float, default=100.0)
+    parser.add_argument("--budget-pct", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.budget_us, args.budget_pct))
@@ -0,0 +1,62 @@
+"""Offset vs keyset pagination latency across page depth.
+
+Seeds ``--rows`` contacts and, at several depths into the table, times
+``--pages`` reads of a ``--limit`` page with OFFSET and with a keyset
+cursor, through a cache that keeps nothing.
+
+    python -m benchmarks.pagination --rows 2000000 --pages 20
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.common import create_tables, emit, seed_contacts, stopwatch, summarize
+
+DEPTHS = (0.0, 0.1, 0.25, 0.5, 0.75, 0.99)
+
+
+async def main(rows: int, limit: int, pages: int):
+    create_tables()
+    seed_contacts(rows)
+
+    from src.db.db import AsyncSessionLocal, get_async_engine
+    from src.services.cache import MemoryCache
+    from src.services.contact_service import ContactService
+    from src.utils.cursor import encode_cursor
+
+    # A cache that keeps nothing, so every page goes to the database
+    svc = ContactService(cache=MemoryCache(max_entries=0))
+    results = []
+    try:
+        async with AsyncSessionLocal() as db:
+            for depth in DEPTHS:
+                skip = int(rows * depth)
+                offset_samples: list[float] = []
+                keyset_samples: list[float] = []
+                for _ in range(pages):
+                    with stopwatch(offset_samples):
+                        await svc.get_contacts(db, skip=skip, limit=limit)
+                    # IDs are sequential from 1, so the row at ``skip`` has ID skip + 1
+                    after = encode_cursor(skip) if skip else None
+                    with stopwatch(keyset_samples):
+                        await svc.get_contacts_page(db, after=after, limit=limit)
+                results.append(
+                    {
+                        "skip": skip,
+                        "offset": summarize(offset_samples),
+                        "keyset": summarize(keyset_samples),
+                    }
+                )
+    finally:
+        await get_async_engine().dispose()
+
+    emit({"rows": rows, "limit": limit, "depths": results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.limit, args.pages))
@@ -0,0 +1,92 @@
+"""Phone normalization: uncached calls, cached calls and large batches.
+
+The batch is formatted in one loop, then by format_phone_numbers from a
+cold cache. The speedup is reported only when that took the process pool;
+``batch.path`` says which path ran.
+
+    python -m benchmarks.phone --calls 20000 --batch 1000000
+"""
+
+import argparse
+import time
+
+from benchmarks.common import emit, stopwatch, summarize
+
+
+def raw_phone(i: int) -> str:
+    """Unique Polish mobile numbers in a few common spellings."""
+    digits = str(500_000_000 + i)
+    spellings = (
+        digits,
+        f"+48 {digits[:3]} {digits[3:6]} {digits[6:]}",
+        f"0048-{digits}",
+        f"({digits[:3]}) {digits[3:]}",
+    )
+    return spellings[i % len(spellings)]
+
+
+def main(calls: int, batch: int):
+    from src.utils import phone
+
+    phones = [raw_phone(i) for i in range(calls)]
+
+    uncached: list[float] = []
+    for number in phones:
+        with stopwatch(uncached):
+            phone._format_phone_number(number, "PL")
+
+    phone._format_phone_number_cached.cache_clear()
+    for number in phones:
+        phone.format_phone_number(number)
+    cached: list[float] = []
+    for number in phones:
+        with stopwatch(cached):
+            phone.format_phone_number(number)
+
+    numbers = [raw_phone(i) for i in range(batch)]
+    start = time.perf_counter()
+    sequential = phone._format_chunk(numbers, "PL")
+    sequential_s = time.perf_counter() - start
+
+    # The same test format_phone_numbers makes; smaller batches, or a single
+    # worker, go through the in-process cache instead of the pool
+    pooled = (
+        len(set(numbers)) >= phone.PARALLEL_BATCH_SIZE and phone.PHONE_POOL_WORKERS > 1
+    )
+    if pooled:
+        # Start the workers outside the timed run, on numbers not timed
+        workers = phone.PHONE_POOL_WORKERS
+        spare = [[raw_phone(batch + i)] for i in range(workers)]
+        list(phone._get_pool().map(phone._format_chunk, spare, ["PL"] * workers))
+    # Nothing the timed run formats may be cached already
+    phone._format_phone_number_cached.cache_clear()
+    start = time.perf_counter()
+    parallel = phone.format_phone_numbers(numbers)
+    parallel_s = time.perf_counter() - start
+    phone.shutdown_phone_pool()
+    assert parallel == sequential
+
+    report = {
+        "numbers": batch,
+        "workers": phone.PHONE_POOL_WORKERS,
+        "path": "pool" if pooled else "in_process",
+        "sequential_s": sequential_s,
+        "format_phone_numbers_s": parallel_s,
+    }
+    if pooled:
+        report["speedup"] = sequential_s / parallel_s
+    emit(
+        {
+            "uncached_call": summarize(uncached),
+            "cached_call": summarize(cached),
+            "batch": report,
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=1_000_000)
+    args = parser.parse_args()
+    main(args.calls, args.batch)
@@ -0,0 +1,190 @@
+"""Read replicas: which engine the contact reads run on, and what they see.
+
+Seeds ``--rows`` contacts into a SQLite primary and copies it to a replica
+file. SQLite stands in for replication, which here happens only when the
+benchmark copies the primary over again. A second replica URL points
+nowhere. Each phase makes ``--reads`` reads (contacts by id, list pages,
+search counts) through the API and counts the SELECTs of each engine from
+db_query_duration_seconds, where the router's own checks, a SELECT on each
+engine every ``--max-lag``/5 seconds, add a few to the other engine:
+
+- caught up: the reads run on the replica, and none fail on the broken one;
+- own write: after a rename through the API, this process reads from the
+  primary, and sees the new name, until the replica has it;
+- lagging: after another worker's write, once the replica has been behind
+  for ``--max-lag`` seconds, reads go to the primary and
+  db_replica_lag_seconds shows it;
+- replicated: with the primary copied over again, reads return to the
+  replica.
+
+Fails if the reads go elsewhere, or read a stale name, in any phase.
+
+    python -m benchmarks.replicas --rows 20000 --reads 2000 --max-lag 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import time
+
+from benchmarks.common import create_tables, emit, seed_contacts
+
+
+def sqlite_path(url: str) -> str:
+    return url.removeprefix("sqlite:///")
+
+
+def replicate(primary: str, replica: str) -> None:
+    """Copy the primary database over the replica"""
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+
+
+def selects() -> dict:
+    """SELECTs each engine has run so far"""
+    from prometheus_client import REGISTRY
+
+    return {
+        engine: REGISTRY.get_sample_value(
+            "db_query_duration_seconds_count",
+            {"engine": engine, "statement": "SELECT"},
+        )
+        or 0
+        for engine in ("primary", "replica1", "replica2")
+    }
+
+
+def replica_lag() -> dict:
+    from prometheus_client import REGISTRY
+
+    return {
+        engine: REGISTRY.get_sample_value("db_replica_lag_seconds", {"engine": engine})
+        for engine in ("replica1", "replica2")
+    }
+
+
+async def read(client, rows: int, reads: int, rng: random.Random) -> dict:
+    """SELECTs per engine made by `reads` contact reads"""
+    before = selects()
+    for _ in range(reads):
+        pick = rng.random()
+        if pick < 0.6:
+            path = f"/api/contacts/{rng.randrange(rows) + 1}"
+        elif pick < 0.9:
+            path = f"/api/contacts?skip={rng.randrange(rows)}&limit=20"
+        else:
+            path = f"/api/contacts/stats?q=Kowalski {rng.randrange(rows)}"
+        response = await client.get(path)
+        assert response.status_code == 200, response.text
+    return {engine: count - before[engine] for engine, count in selects().items()}
+
+
+async def name_of(client, contact_id: int) -> str:
+    return (await client.get(f"/api/contacts/{contact_id}")).json()["name"]
+
+
+async def run(rows: int, reads: int, max_lag: float, primary: str, replica: str):
+    import httpx
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from src.db.db import get_async_engine, get_replica_router
+    from src.db.schemas import ContactUpdate
+    from src.main import create_base_app
+    from src.services.contact_service import get_contact_service
+
+    rng = random.Random(0)
+    router = get_replica_router()
+    transport = httpx.ASGITransport(app=create_base_app())
+    report = {}
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://app"
+        ) as client:
+            await router.check()
+            report["caught_up"] = await read(client, rows, reads, rng)
+
+            contact = (await client.get("/api/contacts/1")).json()
+            response = await client.put(
+                "/api/contacts/1", json={"name": "Own Write", "phone": contact["phone"]}
+            )
+            assert response.status_code == 200, response.text
+            await router.check()
+            report["own_write"] = await read(client, rows, reads, rng)
+            report["own_write"]["name_read"] = await name_of(client, 1)
+
+            replicate(primary, replica)
+            await router.check()
+            report["replicated"] = await read(client, rows, reads, rng)
+
+            # Another worker's write: this process's router does not see it
+            other = (await client.get("/api/contacts/2")).json()
+            async with AsyncSession(get_async_engine(), expire_on_commit=False) as db:
+                await get_contact_service().update_contact_by_id(
+                    db, 2, ContactUpdate(name="Other Write", phone=other["phone"])
+                )
+            await asyncio.sleep(max_lag)
+            await router.check()
+            report["lagging"] = await read(client, rows, reads, rng)
+            report["lagging"]["name_read"] = await name_of(client, 2)
+            report["lag_s"] = replica_lag()
+
+            replicate(primary, replica)
+            await router.check()
+            report["caught_up_again"] = await read(client, rows, reads, rng)
+            report["caught_up_again"]["name_read"] = await name_of(client, 2)
+    finally:
+        from src.db.db import dispose_engines
+
+        await dispose_engines()
+    return report
+
+
+def main(rows: int, reads: int, max_lag: float):
+    primary = sqlite_path(os.environ["DATABASE_URL"])
+    assert primary != os.environ["DATABASE_URL"], "needs a SQLite DATABASE_URL"
+    replica = os.path.join(os.path.dirname(os.path.abspath(primary)), "replica.db")
+    os.environ["DATABASE_REPLICA_URLS"] = (
+        f"sqlite:///{replica},sqlite:////nonexistent/replica.db"
+    )
+    os.environ["DATABASE_REPLICA_MAX_LAG"] = str(max_lag)
+    os.environ["DATABASE_REPLICA_CHECK_SECONDS"] = str(max_lag / 5)
+
+    create_tables()
+    seed_contacts(rows)
+    replicate(primary, replica)
+    try:
+        started = time.perf_counter()
+        report = asyncio.run(run(rows, reads, max_lag, primary, replica))
+        report["seconds"] = time.perf_counter() - started
+    finally:
+        os.remove(replica)
+    report = {"rows": rows, "reads": reads, "max_lag_s": max_lag, **report}
+    emit(report)
+
+    def share(phase: str, engine: str) -> float:
+        counts = report[phase]
+        return counts[engine] / (counts["primary"] + counts["replica1"])
+
+    replica_phases = ("caught_up", "replicated", "caught_up_again")
+    for phase in replica_phases:
+        assert share(phase, "replica1") >= 0.9, (phase, report[phase])
+    for phase in ("own_write", "lagging"):
+        assert share(phase, "primary") >= 0.9, (phase, report[phase])
+    for phase in (*replica_phases, "own_write", "lagging"):
+        assert report[phase]["replica2"] == 0, (phase, report[phase])
+    assert report["own_write"]["name_read"] == "Own Write", report["own_write"]
+    assert report["lagging"]["name_read"] == "Other Write", report["lagging"]
+    assert report["lag_s"]["replica1"] >= max_lag, report["lag_s"]
+    assert report["lag_s"]["replica2"] == float("inf"), report["lag_s"]
+    assert report["caught_up_again"]["name_read"] == "Other Write"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--max-lag", type=float, default=0.5)
+    args = parser.parse_args()
+    main(args.rows, args.reads, args.max_lag)
@@ -0,0 +1,77 @@
+"""Contact search latency: unindexed ILIKE scan vs the configured backend.
+
+Uses the trigram backend when DATABASE_URL points at Postgres (run
+``alembic upgrade head`` first) and the in-process n-gram index otherwise.
+
+    python -m benchmarks.search --rows 1000000
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import create_tables, emit, seed_contacts, stopwatch, summarize
+
+QUERIES = (
+    "kowalski",
+    "anna now",
+    "kowalsky",
+    "Wiśniewska",
+    "601",
+    "+48 500 012 345",
+    "zzz",
+)
+
+
+async def main(rows: int, repeat: int, limit: int):
+    create_tables()
+    seed_contacts(rows)
+
+    from sqlalchemy import select
+
+    from src.db.db import AsyncSessionLocal, get_async_engine
+    from src.db.models.Contact import ContactModel
+    from src.services.search_service import create_search_backend
+
+    backend = create_search_backend()
+    report = {"rows": rows, "backend": type(backend).__name__, "queries": {}}
+    try:
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            await backend.search(db, "warmup", limit=1)
+            report["warmup_ms"] = (time.perf_counter() - start) * 1000
+
+            for query in QUERIES:
+                scan: list[float] = []
+                indexed: list[float] = []
+                for _ in range(repeat):
+                    with stopwatch(scan):
+                        # The previous implementation: no index, no limit
+                        (
+                            await db.scalars(
+                                select(ContactModel).where(
+                                    ContactModel.name.ilike(f"%{query}%")
+                                    | ContactModel.phone.ilike(f"%{query}%")
+                                )
+                            )
+                        ).all()
+                    with stopwatch(indexed):
+                        matches = await backend.search(db, query, limit=limit)
+                report["queries"][query] = {
+                    "matches": len(matches),
+                    "ilike_scan": summarize(scan),
+                    "search_backend": summarize(indexed),
+                }
+    finally:
+        await get_async_engine().dispose()
+
+    emit(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat, args.limit))
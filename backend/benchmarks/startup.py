@@ -0,0 +1,159 @@
+"""Startup: how long the app takes to import and to answer its first requests.
+
+Imports ``src.main`` in fresh interpreters under ``python -X importtime``
+``--runs`` times and reports the median run: the interpreter's wall time,
+the import of src.main alone, the modules' own import time summed per
+top-level package, and the slowest modules.
+Then starts the app under uvicorn ``--runs`` times and reports how long it
+takes to answer GET /api/health, and its first database query.
+
+Everything runs without GOOGLE_API_KEY/GEMINI_API_KEY: the import must not
+load the Gemini SDK, and a chat request must fail with the missing key
+instead of the startup. Fails if the median import of src.main or time
+to first request exceeds its budget; the defaults leave room for noise
+but not for the SDK's second of imports coming back.
+
+    python -m benchmarks.startup --runs 5 --import-budget 2.2 --ready-budget 4.0
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import create_tables, emit
+
+IMPORT_CHECK = (
+    "import sys, src.main; "
+    "assert 'google.genai' not in sys.modules, 'the Gemini SDK was imported'"
+)
+
+
+def app_env() -> dict:
+    """The benchmark database, and no model API key"""
+    env = dict(os.environ)
+    env.pop("GOOGLE_API_KEY", None)
+    env.pop("GEMINI_API_KEY", None)
+    return env
+
+
+def import_times(runs: int) -> dict:
+    """Median seconds to import src.main, and where they went in that run"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-W", "ignore", "-c", IMPORT_CHECK],
+            env=app_env(),
+            capture_output=True,
+            text=True,
+        )
+        wall = time.perf_counter() - started
+        assert result.returncode == 0, result.stderr
+        modules, main_import = [], 0
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            own, cumulative, name = line.removeprefix("import time:").split("|")
+            modules.append((name.strip(), int(own)))
+            if name.strip() == "src.main":
+                main_import = int(cumulative) / 1e6
+        samples.append((wall, main_import, modules))
+    samples.sort(key=lambda sample: sample[1])
+    wall, main_import, modules = samples[len(samples) // 2]
+
+    packages: dict[str, int] = {}
+    for name, own in modules:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + own
+    top = sorted(packages.items(), key=lambda item: -item[1])[:10]
+    slowest = sorted(modules, key=lambda module: -module[1])[:10]
+    return {
+        "wall_s": wall,
+        "src_main_s": main_import,
+        "packages_s": {package: own / 1e6 for package, own in top},
+        "slowest_modules_s": {name: own / 1e6 for name, own in slowest},
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_requests() -> dict:
+    """Seconds from spawning the server to its first answers"""
+    import httpx
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-W",
+            "ignore",
+            "-m",
+            "uvicorn",
+            "src.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=app_env(),
+    )
+    try:
+        with httpx.Client(base_url=base, timeout=30) as client:
+            while True:
+                assert server.poll() is None, "the server exited"
+                try:
+                    health = client.get("/api/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            ready = time.perf_counter() - started
+            assert health.status_code == 200, health.text
+            query = client.get("/api/contacts/stats")
+            assert query.status_code == 200, query.text
+            queried = time.perf_counter() - started
+            chat = client.post("/api/chat", json={"content": "Hi"})
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        "health_s": ready,
+        "first_query_s": queried,
+        "chat_without_key": {"status": chat.status_code, "detail": chat.json()},
+    }
+
+
+def main(runs: int, import_budget: float, ready_budget: float):
+    create_tables()
+    report = {"runs": runs, "import": import_times(runs)}
+    ready = [first_requests() for _ in range(runs)]
+    report["first_request"] = {
+        "health_s": statistics.median(run["health_s"] for run in ready),
+        "first_query_s": statistics.median(run["first_query_s"] for run in ready),
+        "chat_without_key": ready[0]["chat_without_key"],
+    }
+    report["budget_s"] = {"import": import_budget, "ready": ready_budget}
+    emit(report)
+
+    chat = report["first_request"]["chat_without_key"]
+    assert chat["status"] == 500 and "API_KEY" in chat["detail"]["detail"], chat
+    assert report["import"]["src_main_s"] <= import_budget, report["import"]
+    assert report["first_request"]["health_s"] <= ready_budget, report["first_request"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=2.2)
+    parser.add_argument("--ready-budget", type=float, default=4.0)
+    args = parser.parse_args()
+    main(args.runs, args.import_budget, args.ready_budget)
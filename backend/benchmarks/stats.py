@@ -0,0 +1,164 @@
+"""Contact count: maintained counter vs COUNT(*), and that it stays exact.
+
+Seeds ``--rows`` contacts and times ``ContactService.count_contacts`` (a sum
+over the few contact_stats rows) against ``SELECT COUNT(*)`` on the table,
+and ``get_stats`` with a search query (a cold count, then cached). Then
+runs every kind of write concurrently: single creates and deletes, batches
+and imports, including ones that fail or conflict. Fails unless the
+counter equals COUNT(*) afterwards and match counts equal what search
+returns.
+
+    python -m benchmarks.stats --rows 100000
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import (
+    FIRST_NAMES,
+    contact_name,
+    create_tables,
+    emit,
+    seed_contacts,
+    stopwatch,
+    summarize,
+)
+
+WRITE_PHONE_BASE = 700_000_000
+
+
+def phone(i: int) -> str:
+    return f"+48{WRITE_PHONE_BASE + i}"
+
+
+async def timed(call, repeat: int) -> dict:
+    samples: list[float] = []
+    for _ in range(repeat):
+        with stopwatch(samples):
+            await call()
+    return summarize(samples)
+
+
+async def writes(svc, session, worker: int, rounds: int):
+    """Every write path, with misses and conflicts mixed in"""
+    from src.db.schemas import ContactCreate, ContactUpdate
+    from src.services.contact_service import ContactConflictError
+    from src.services.import_service import ImportService
+
+    async def one(i: int):
+        # Workers get disjoint ranges of i, so their phones never collide
+        i += worker * rounds * 11
+        async with session() as db:
+            created = await svc.create_contact(
+                db, ContactCreate(name=contact_name(i), phone=phone(i))
+            )
+            # Read now; the next commit expires the instance
+            created_id = created.id
+            try:
+                # Same phone again: rejected, nothing counted
+                await svc.create_contact(
+                    db, ContactCreate(name=contact_name(i), phone=phone(i))
+                )
+            except ContactConflictError:
+                pass
+            await svc.update_contact_by_id(
+                db, created_id, ContactUpdate(name="Renamed", phone=phone(i))
+            )
+            if i % 2:
+                await svc.delete_contact(db, created_id)
+            await svc.delete_contact(db, 10**9 + i)  # not found
+
+            base = rounds + i * 10
+            result = await svc.batch(
+                db,
+                creates=[
+                    ContactCreate(name=contact_name(j), phone=phone(j))
+                    for j in (base, base + 1, base + 1, base + 2)  # one duplicate
+                ],
+                deletes=[created_id, 10**9 + i],
+            )
+            await svc.batch(db, deletes=[result.created[0].id])
+
+            async def records():
+                for j in range(base + 2, base + 6):  # base + 2 exists already
+                    yield j, {"name": contact_name(j), "phone": phone(j)}, None
+                yield base + 6, {"name": "", "phone": phone(base + 6)}, "bad row"
+
+            await ImportService(svc).import_contacts(db, records())
+
+    for i in range(rounds):
+        await one(i)
+
+
+async def main(rows: int, repeat: int, rounds: int, workers: int | None):
+    create_tables()
+    seed_contacts(rows)
+
+    from sqlalchemy import func, select
+
+    from src.db.db import AsyncSessionLocal, get_async_engine
+    from src.db.models.Contact import ContactModel
+    from src.services.contact_service import ContactService
+
+    svc = ContactService()
+    report = {"rows": rows, "repeat": repeat}
+    try:
+        async with AsyncSessionLocal() as db:
+
+            async def count_star():
+                return await db.scalar(select(func.count()).select_from(ContactModel))
+
+            report["count_star"] = await timed(count_star, repeat)
+            report["counter"] = await timed(lambda: svc.count_contacts(db), repeat)
+
+            # A name not asked for before is counted; asked again, it is cached
+            names = iter(FIRST_NAMES)
+            report["matches_cold"] = await timed(
+                lambda: svc.get_stats(db, query=next(names)), len(FIRST_NAMES)
+            )
+            report["matches_cached"] = await timed(
+                lambda: svc.get_stats(db, query="kowalski"), repeat
+            )
+
+        # SQLite takes one writer at a time, so it gets one worker unless
+        # told otherwise; on Postgres the workers race for the counter
+        if workers is None:
+            workers = 4 if get_async_engine().dialect.name == "postgresql" else 1
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(writes(svc, AsyncSessionLocal, w, rounds) for w in range(workers))
+        )
+        report["writes"] = {
+            "workers": workers,
+            "rounds": rounds,
+            "elapsed_s": time.perf_counter() - start,
+        }
+
+        async with AsyncSessionLocal() as db:
+            actual = await db.scalar(select(func.count()).select_from(ContactModel))
+            counted = await svc.count_contacts(db)
+            stats = await svc.get_stats(db, query="kowalski")
+            found = await svc.search_contacts(db, "kowalski", limit=rows + 10**6)
+    finally:
+        await get_async_engine().dispose()
+
+    report["after_writes"] = {
+        "count_star": actual,
+        "counter": counted,
+        "matches": stats.matches,
+        "searched": len(found),
+    }
+    emit(report)
+    assert counted == actual, report["after_writes"]
+    assert stats.total == actual and stats.matches == len(found), stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat, args.rounds, args.workers))
@@ -0,0 +1,124 @@
+"""Size of the list tools' results, as the model receives them.
+
+Seeds ``--rows`` contacts and calls get_contacts, search_contacts and
+get_contacts_by_ids with the full-object encoding at the largest page
+(roughly what they returned before result budgeting) and with the defaults
+(table encoding, a default page, a byte cap), and with only the name
+field. Reports bytes and estimated tokens of the text each call returns, and
+bytes per contact, since every variant is held to the same byte cap.
+
+Also pages through the whole contact list and a search under a tiny byte
+cap, and fails unless every contact comes back exactly once.
+
+    python -m benchmarks.tool_results --rows 1000
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.common import create_tables, emit, seed_contacts
+
+CALLS = {
+    "get_contacts": {},
+    "search_contacts": {"query": "kowalski"},
+    "get_contacts_by_ids": {"contact_ids": list(range(1, 101))},
+}
+VARIANTS = {
+    "objects_max_page": {"encoding": "objects", "limit": 100},
+    "default": {},
+    "name_only": {"fields": ["name"]},
+}
+
+
+async def result_size(client, tool: str, args: dict) -> dict:
+    result = await client.call_tool_mcp(tool, args)
+    content = result.structuredContent
+    assert not result.isError and content["success"], result
+    size = sum(len(block.text.encode()) for block in result.content)
+    contacts = len(content.get("rows") or content.get("contacts") or [])
+    return {
+        "bytes": size,
+        "tokens": size // 4,
+        "contacts": contacts,
+        "bytes_per_contact": round(size / contacts, 1),
+    }
+
+
+async def page_through(client, tool: str, args: dict, token: str) -> list[int]:
+    """IDs of every contact returned while following `token` to the end"""
+    ids, cursor = [], {}
+    while True:
+        result = await client.call_tool_mcp(
+            tool, {**args, **cursor, "fields": ["id"], "limit": 100}
+        )
+        content = result.structuredContent
+        assert content["success"], content
+        ids.extend(row[0] for row in content["rows"])
+        if content.get(token) is None:
+            return ids
+        cursor = {"after" if token == "next_cursor" else "skip": content[token]}
+
+
+async def main(rows: int):
+    create_tables()
+    seed_contacts(rows)
+
+    from fastmcp import Client
+
+    import src.mcp.tools.contact as contact_tools
+    from src.db.db import get_async_engine
+    from src.mcp.server import get_mcp_server
+
+    report = {"rows": rows, "max_bytes": contact_tools.TOOL_RESULT_MAX_BYTES}
+    try:
+        async with Client(get_mcp_server()) as client:
+            for tool, args in CALLS.items():
+                report[tool] = {}
+                for variant, extra in VARIANTS.items():
+                    if tool == "get_contacts_by_ids":
+                        extra = {k: v for k, v in extra.items() if k != "limit"}
+                    report[tool][variant] = await result_size(
+                        client, tool, {**args, **extra}
+                    )
+
+            # A cap of a few rows forces the truncated pages to hand on
+            contact_tools.TOOL_RESULT_MAX_BYTES = 64
+            listed = await page_through(client, "get_contacts", {}, "next_cursor")
+            searched = await page_through(
+                client, "search_contacts", {"query": "kowalski"}, "next_skip"
+            )
+            contact_tools.TOOL_RESULT_MAX_BYTES = report["max_bytes"]
+            everything = await client.call_tool_mcp(
+                "search_contacts",
+                {"query": "kowalski", "fields": ["id"], "limit": 100},
+            )
+    finally:
+        await get_async_engine().dispose()
+
+    report["paged"] = {"listed": len(listed), "searched": len(searched)}
+    emit(report)
+
+    assert sorted(listed) == list(range(1, rows + 1)), "get_contacts paging"
+    assert len(set(searched)) == len(searched), "search paging repeated a match"
+    first = [row[0] for row in everything.structuredContent["rows"]]
+    assert searched[: len(first)] == first, "search paging changed the order"
+    for tool, variants in report.items():
+        if tool in CALLS:
+            per_contact = {
+                variant: result["bytes_per_contact"]
+                for variant, result in variants.items()
+            }
+            assert (
+                per_contact["name_only"]
+                < per_contact["default"]
+                < per_contact["objects_max_page"]
+            ), (tool, per_contact)
+            # The cap bounds the contacts; the rest is a small envelope
+            assert variants["default"]["bytes"] <= report["max_bytes"] + 512, tool
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows))
@@ -0,0 +1,291 @@
+"""Multi-worker serving: throughput from 1 to N workers, and shared state.
+
+Seeds ``--rows`` contacts, then for each worker count in ``--workers``
+starts ``python -m src.serve`` with that WEB_CONCURRENCY and drives the
+contacts endpoints (reads by id, pages and search counts) from
+``--drivers`` client processes with ``--concurrency`` connections each
+for ``--seconds``, after ``--warmup`` seconds. Reports requests per second
+and p50/p99 latency per worker count, and the speedup over one worker.
+
+With the most workers it then checks that they serve as one app: contacts
+renamed through one connection are read back renamed, and found by
+search, through fresh connections that land on other workers; concurrent
+MCP tool calls over HTTP succeed; every worker reports the same duplicate
+scan; /api/metrics counts the requests of all workers; and schedulers
+sharing a cache never run more model calls between them than their cap.
+
+Fails if a check fails or, given twice as many CPUs as workers, the most
+workers are not ``--min-speedup`` times as fast as one.
+
+    python -m benchmarks.workers --rows 20000 --workers 1 2 4 --seconds 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.common import (
+    contact_name,
+    create_tables,
+    emit,
+    seed_contacts,
+    summarize,
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int) -> tuple[subprocess.Popen, str]:
+    """Start python -m src.serve and wait until it answers"""
+    import httpx
+
+    port = free_port()
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "src.serve"],
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    while True:
+        assert server.poll() is None, "the server exited"
+        try:
+            if httpx.get(f"{base}/api/health").status_code == 200:
+                return server, base
+        except httpx.TransportError:
+            time.sleep(0.05)
+
+
+def drive(base: str, rows: int, concurrency: int, seconds: float, seed: int) -> list:
+    """Request latencies of `concurrency` clients looping for `seconds`"""
+    import httpx
+
+    async def run() -> list:
+        rng = random.Random(seed)
+        latencies: list[float] = []
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base, limits=limits) as client:
+
+            async def loop():
+                while time.perf_counter() < end:
+                    pick = rng.random()
+                    if pick < 0.5:
+                        path = f"/api/contacts/{rng.randrange(rows) + 1}"
+                    elif pick < 0.75:
+                        path = f"/api/contacts?skip={rng.randrange(rows)}&limit=20"
+                    else:
+                        name = contact_name(rng.randrange(rows)).split()[1]
+                        path = f"/api/contacts/stats?q={name}"
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    latencies.append(time.perf_counter() - started)
+                    assert response.status_code == 200, response.text
+
+            end = time.perf_counter() + seconds
+            await asyncio.gather(*(loop() for _ in range(concurrency)))
+        return latencies
+
+    return asyncio.run(run())
+
+
+def load(base: str, rows: int, drivers: int, concurrency: int, seconds: float):
+    """Latencies of all drivers, each in a process of its own"""
+    with ProcessPoolExecutor(drivers) as pool:
+        results = pool.map(
+            drive,
+            [base] * drivers,
+            [rows] * drivers,
+            [concurrency] * drivers,
+            [seconds] * drivers,
+            range(drivers),
+        )
+        return [latency for latencies in results for latency in latencies]
+
+
+def requests_counted(client) -> float:
+    """Requests /api/metrics has counted, over every route"""
+    text = client.get("/api/metrics").text
+    return sum(
+        float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line.startswith("http_request_duration_seconds_count")
+    )
+
+
+async def mcp_calls(base: str, calls: int) -> list[bool]:
+    """Whether each of `calls` concurrent tool calls over HTTP succeeded"""
+    from fastmcp import Client
+
+    async with Client(f"{base}/api/llm/mcp") as client:
+        results = await asyncio.gather(
+            *(
+                client.call_tool_mcp("count_contacts", {"query": contact_name(i)})
+                for i in range(calls)
+            )
+        )
+    return [not result.isError for result in results]
+
+
+async def shared_slots(limit: int) -> dict:
+    """Peak model calls running at once across two schedulers sharing a cache"""
+    from src.model.scheduler import LlmScheduler
+    from src.services.cache import SqliteCache
+
+    path = os.path.join(tempfile.mkdtemp(prefix="contacts-slots-"), "cache.db")
+    schedulers = [
+        LlmScheduler(max_concurrency=limit, shared=SqliteCache(path)) for _ in range(2)
+    ]
+    running = peak = 0
+
+    async def call():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return True
+
+    done = await asyncio.gather(
+        *(scheduler.run(call) for scheduler in schedulers for _ in range(limit * 2))
+    )
+    return {"limit": limit, "peak": peak, "calls": len(done)}
+
+
+def shared_state(base: str, workers: int, served: int) -> dict:
+    """Checks that the workers serve one contact book, scan and set of metrics"""
+    import httpx
+
+    # Connection: close makes each request find a worker anew
+    fresh = httpx.Client(base_url=base, headers={"Connection": "close"}, timeout=60)
+    with fresh:
+        # Random names share too few trigrams to match each other in search
+        rng = random.Random(workers)
+        renamed = {}
+        for i in range(1, 4 * workers + 1):
+            contact = fresh.get(f"/api/contacts/{i}").json()
+            name = "".join(rng.choices(string.ascii_lowercase, k=12)).title()
+            response = fresh.put(
+                f"/api/contacts/{i}", json={"name": name, "phone": contact["phone"]}
+            )
+            assert response.status_code == 200, response.text
+            renamed[i] = name
+        reads = [fresh.get(f"/api/contacts/{i}").json()["name"] for i in renamed]
+        found = [
+            fresh.get("/api/contacts/stats", params={"q": name}).json()["matches"]
+            for name in renamed.values()
+        ]
+
+        tools = asyncio.run(mcp_calls(base, 4 * workers))
+
+        assert fresh.post("/api/contacts/duplicates/scan").status_code == 202
+        deadline = time.monotonic() + 300
+        while time.monotonic() < deadline:
+            scan = fresh.get("/api/contacts/duplicates?limit=1").json()["scan"]
+            if scan["status"] != "running":
+                break
+            time.sleep(0.2)
+        scans = {
+            (scan["job_id"], scan["status"], scan["clusters"])
+            for scan in (
+                fresh.get("/api/contacts/duplicates?limit=1").json()["scan"]
+                for _ in range(2 * workers)
+            )
+        }
+        counted = requests_counted(fresh)
+    return {
+        "renamed_read_back": reads == list(renamed.values()),
+        "renamed_found": found,
+        "mcp_calls_ok": sum(tools),
+        "mcp_calls": len(tools),
+        "scans_reported": sorted(map(list, scans)),
+        "metrics_requests": counted,
+        "requests_served": served,
+        "llm_slots": asyncio.run(shared_slots(2)),
+    }
+
+
+def main(
+    rows: int,
+    workers: list[int],
+    drivers: int,
+    concurrency: int,
+    seconds: float,
+    warmup: float,
+    min_speedup: float,
+):
+    create_tables()
+    seed_contacts(rows)
+
+    cpus = os.process_cpu_count() or 1
+    report = {"rows": rows, "cpus": cpus, "drivers": drivers, "runs": {}}
+    for count in workers:
+        server, base = start_server(count)
+        try:
+            load(base, rows, drivers, concurrency, warmup)
+            latencies = load(base, rows, drivers, concurrency, seconds)
+            report["runs"][count] = {
+                "requests_per_s": len(latencies) / seconds,
+                **summarize(latencies),
+            }
+            if count == max(workers):
+                # Warmup requests were counted too
+                served = len(latencies)
+                report["shared_state"] = shared_state(base, count, served)
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+    single = report["runs"][min(workers)]["requests_per_s"]
+    for run in report["runs"].values():
+        run["speedup"] = run["requests_per_s"] / single
+    emit(report)
+
+    checks = report["shared_state"]
+    assert checks["renamed_read_back"], checks
+    assert set(checks["renamed_found"]) == {1}, checks
+    assert checks["mcp_calls_ok"] == checks["mcp_calls"], checks
+    assert len(checks["scans_reported"]) == 1, checks
+    assert checks["scans_reported"][0][1] == "done", checks
+    assert checks["metrics_requests"] >= checks["requests_served"], checks
+    slots = checks["llm_slots"]
+    assert slots["peak"] == slots["limit"], slots
+    if cpus >= 2 * max(workers):
+        speedup = report["runs"][max(workers)]["speedup"]
+        assert speedup >= min_speedup, report["runs"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--drivers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--min-speedup", type=float, default=1.5)
+    args = parser.parse_args()
+    main(
+        args.rows,
+        args.workers,
+        args.drivers,
+        args.concurrency,
+        args.seconds,
+        args.warmup,
+        args.min_speedup,
+    )
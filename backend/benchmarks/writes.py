@@ -0,0 +1,160 @@
+"""Round trips and throughput of contact writes: pre-checks vs single statements.
+
+The "legacy" functions reproduce the previous create/update/delete paths (the
+API's duplicate-phone pre-check, the service's own lookup, the write, and the
+refresh). Round trips are counted with engine events, and the script fails if
+the current ContactService needs more than one statement per write besides
+the bookkeeping it does in the same transaction (the contact count and the
+change log).
+
+    python -m benchmarks.writes --writes 2000
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from benchmarks.common import create_tables, emit
+
+PHONE_BASE = 700_000_000
+
+
+def phone(i: int) -> str:
+    return f"+48{PHONE_BASE + i}"
+
+
+async def legacy_create(db, name: str, phone: str):
+    from sqlalchemy import select
+
+    from src.db.models.Contact import ContactModel
+
+    for _ in range(2):  # API pre-check, then the service's own check
+        await db.scalar(select(ContactModel).where(ContactModel.phone == phone))
+    db_contact = ContactModel(name=name, phone=phone)
+    db.add(db_contact)
+    await db.commit()
+    await db.refresh(db_contact)
+    return db_contact
+
+
+async def legacy_update(db, contact_id: int, name: str, phone: str):
+    from sqlalchemy import select
+
+    from src.db.models.Contact import ContactModel
+
+    await db.scalar(select(ContactModel).where(ContactModel.phone == phone))
+    db_contact = await db.scalar(
+        select(ContactModel).where(ContactModel.id == contact_id)
+    )
+    db_contact.name = name
+    db_contact.phone = phone
+    await db.commit()
+    await db.refresh(db_contact)
+    return db_contact
+
+
+async def legacy_delete(db, contact_id: int):
+    from sqlalchemy import select
+
+    from src.db.models.Contact import ContactModel
+
+    db_contact = await db.scalar(
+        select(ContactModel).where(ContactModel.id == contact_id)
+    )
+    await db.delete(db_contact)
+    await db.commit()
+
+
+class RoundTrips:
+    """Counts statements and transaction ends on an engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.counts: Counter = Counter()
+        event.listen(engine, "before_cursor_execute", self._statement)
+        event.listen(engine, "commit", self._commit)
+        event.listen(engine, "rollback", self._rollback)
+
+    def _statement(self, *args):
+        self.counts["statements"] += 1
+
+    def _commit(self, *args):
+        self.counts["commits"] += 1
+
+    def _rollback(self, *args):
+        self.counts["rollbacks"] += 1
+
+    def take(self) -> dict:
+        counts, self.counts = dict(self.counts), Counter()
+        return counts
+
+
+async def main(writes: int):
+    from src.db.db import AsyncSessionLocal, get_async_engine
+    from src.db.schemas import ContactCreate, ContactUpdate
+    from src.services.cache import MemoryCache
+    from src.services.contact_service import ContactService
+
+    create_tables()
+    # A cache that keeps nothing, so lookups are not hidden by cache hits
+    svc = ContactService(cache=MemoryCache(max_entries=0))
+    trips = RoundTrips(get_async_engine().sync_engine)
+    report = {"writes": writes, "round_trips": {}, "throughput_per_s": {}}
+
+    try:
+        async with AsyncSessionLocal() as db:
+            created = await legacy_create(db, "Legacy", phone(0))
+            report["round_trips"]["legacy_create"] = trips.take()
+            await legacy_update(db, created.id, "Legacy 2", phone(1))
+            report["round_trips"]["legacy_update"] = trips.take()
+            await legacy_delete(db, created.id)
+            report["round_trips"]["legacy_delete"] = trips.take()
+
+            created = await svc.create_contact(
+                db, ContactCreate(name="New", phone=phone(2))
+            )
+            report["round_trips"]["create"] = trips.take()
+            await svc.update_contact_by_id(
+                db, created.id, ContactUpdate(name="New 2", phone=phone(3))
+            )
+            report["round_trips"]["update"] = trips.take()
+            await svc.delete_contact(db, created.id)
+            report["round_trips"]["delete"] = trips.take()
+
+        # The change log insert and the count upsert, and on Postgres the lock
+        # that orders the change log
+        bookkeeping = 2 + (get_async_engine().dialect.name == "postgresql")
+        for op in ("create", "update", "delete"):
+            counts = report["round_trips"][op]
+            assert counts.get("statements") == 1 + bookkeeping, (op, counts)
+            assert counts.get("commits") == 1, (op, counts)
+
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            for i in range(writes):
+                await legacy_create(db, f"Legacy {i}", phone(10 + i))
+            report["throughput_per_s"]["legacy_create"] = writes / (
+                time.perf_counter() - start
+            )
+
+            start = time.perf_counter()
+            for i in range(writes):
+                await svc.create_contact(
+                    db, ContactCreate(name=f"New {i}", phone=phone(10 + writes + i))
+                )
+            report["throughput_per_s"]["create"] = writes / (
+                time.perf_counter() - start
+            )
+    finally:
+        await get_async_engine().dispose()
+
+    emit(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.writes))
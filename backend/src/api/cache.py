@@ -0,0 +1,12 @@
+from fastapi.routing import APIRouter
+
+from src.services.cache import get_cache
+from src.services.chat_service import response_cache_stats
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+
+@router.get("/stats")
+def read_cache_stats():
+    """Hit/miss counters of the contacts and chat response caches in this process."""
+    return {**get_cache().stats(), "chat": response_cache_stats.stats()}
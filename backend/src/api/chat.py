@@ -1,35 +1,111 @@
+import math
 from datetime import datetime, timezone
 from uuid import uuid4
 
 from fastapi import Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 from pydantic import ValidationError
 
+from src.api.responses import Response
 from src.db.schemas import ChatResponse, NewChatMessage
+from src.model.scheduler import SchedulerOverloadedError
 from src.services.chat_service import ChatService, get_chat_service
+from src.services.conversation_service import ConversationNotFoundError
+from src.utils.sse import format_sse
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
+def model_busy(e: SchedulerOverloadedError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=Response.MODEL_BUSY.value,
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
 @router.post("/", response_model=ChatResponse)
 @router.post("", response_model=ChatResponse)
 async def read_chat(
     input: NewChatMessage, svc: ChatService = Depends(get_chat_service)
 ):
     try:
-        response = await svc.get_chat_response_with_mcp(input.content)
+        conversation_id = input.conversationId or await svc.start_conversation()
+        response = await svc.get_chat_response_with_mcp(input.content, conversation_id)
         current_timestamp = datetime.now(timezone.utc).isoformat()
         return ChatResponse(
             content=response,
             id=str(uuid4()),
             role="assistant",
             createdAt=current_timestamp,
+            conversationId=conversation_id,
+        )
+    except SchedulerOverloadedError as e:
+        raise model_busy(e)
+    except ConversationNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=Response.CONVERSATION_NOT_FOUND.value
         )
     except ValidationError as e:
         raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.post("/stream")
+async def stream_chat(
+    input: NewChatMessage, svc: ChatService = Depends(get_chat_service)
+):
+    """
+    Stream the response as server-sent events: `delta` (text), `tool_call`,
+    `tool_result`, then `message` with the ChatResponse, or `error`.
+    A request the model is too busy for gets a 429 before the stream starts,
+    one for an unknown conversation a 404.
+    """
+    try:
+        svc.check_admission()
+        if input.conversationId:
+            # Checked up front, so the client gets a status code rather than
+            # an error event
+            await svc.get_history(input.conversationId)
+        conversation_id = input.conversationId or await svc.start_conversation()
+    except SchedulerOverloadedError as e:
+        raise model_busy(e)
+    except ConversationNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=Response.CONVERSATION_NOT_FOUND.value
+        )
+
+    async def events():
+        try:
+            async for event, data in svc.stream_chat_response_with_mcp(
+                input.content, conversation_id
+            ):
+                if event == "message":
+                    data = ChatResponse(
+                        content=data["content"],
+                        id=str(uuid4()),
+                        role="assistant",
+                        createdAt=datetime.now(timezone.utc).isoformat(),
+                        conversationId=conversation_id,
+                    ).model_dump()
+                yield format_sse(event, data)
+        except SchedulerOverloadedError as e:
+            yield format_sse(
+                "error",
+                {"detail": Response.MODEL_BUSY.value, "retry_after": e.retry_after},
+            )
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/hello", response_model=ChatResponse)
 async def get_hello_message(svc: ChatService = Depends(get_chat_service)):
     """Get a simple hello message from the chat service."""
@@ -44,6 +120,8 @@ async def get_hello_message(svc: ChatService = Depends(get_chat_service)):
             role="assistant",
             createdAt=current_timestamp,
         )
+    except SchedulerOverloadedError as e:
+        raise model_busy(e)
     except ValidationError as e:
         raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
@@ -1,84 +1,442 @@
-from typing import List
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import Response as HTTPResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.db import get_db
-from src.db.schemas import ContactCreate, Contact, ContactUpdate
-from src.services.contact_service import ContactService, get_contact_service
+from src.db.db import AsyncSessionLocal, get_async_db
+from src.db.schemas import (
+    ContactBatch,
+    ContactBatchResult,
+    ContactChanges,
+    ContactCreate,
+    ContactMerge,
+    Contact,
+    ContactsPage,
+    ContactStats,
+    ContactUpdate,
+    DuplicateClusters,
+    DuplicateScan,
+    ImportReport,
+    Job,
+)
+from src.services.change_feed import CONTACT_CHANGES_HEARTBEAT_SECONDS
+from src.services.contact_jobs import ContactJobs, get_contact_jobs
+from src.services.contact_service import (
+    BatchConflictError,
+    ContactAlreadyExistsError,
+    ContactService,
+    PhoneAlreadyRegisteredError,
+    get_contact_service,
+)
+from src.services.dedupe_service import DedupeService, get_dedupe_service
+from src.services.import_service import (
+    IMPORT_CHUNK_SIZE,
+    ImportService,
+    get_import_service,
+)
+from src.services.job_service import JobQueueFullError
 from src.api.responses import Response
+from src.utils.contact_formats import (
+    MEDIA_TYPES,
+    ContactFormat,
+    format_contacts,
+    format_from_content_type,
+    format_header,
+    parse_contacts,
+)
+from src.utils.cursor import encode_change_token
+from src.utils.etag import etag_matches, weak_etag
+from src.utils.sse import format_sse
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
+
+def etag_headers(etag: str) -> dict:
+    # no-cache lets clients keep the body but makes them revalidate it,
+    # which costs a 304 rather than the payload when nothing changed
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def contact_etag_headers(contact: Contact) -> dict:
+    return etag_headers(weak_etag("contact", contact.id, contact.version))
+
+
+def not_modified(etag: str) -> HTTPResponse:
+    return HTTPResponse(status_code=304, headers=etag_headers(etag))
+
+
+def queue_full() -> HTTPException:
+    return HTTPException(status_code=503, detail=Response.JOB_QUEUE_FULL.value)
+
 @router.post("/", response_model=Contact)
 @router.post("", response_model=Contact)
-def create_contact(
+async def create_contact(
     contact: ContactCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     svc: ContactService = Depends(get_contact_service),
 ):
-    db_contact = svc.get_contact_by_phone(db, phone=contact.phone)
-    if db_contact:
+    try:
+        created_contact = await svc.create_contact(db=db, contact=contact)
+    except ContactAlreadyExistsError:
         raise HTTPException(
             status_code=400, detail=Response.CONTACT_ALREADY_EXISTS.value
         )
 
-    created_contact = svc.create_contact(db=db, contact=contact)
-
     return Contact.model_validate(created_contact)
 
 
-@router.get("/", response_model=List[Contact])
-@router.get("", response_model=List[Contact])
-def read_contacts(
+@router.get("/", response_model=List[Contact] | ContactsPage)
+@router.get("", response_model=List[Contact] | ContactsPage)
+async def read_contacts(
+    response: HTTPResponse,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: str | None = None,
+    pagination: Literal["offset", "keyset"] = "offset",
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     svc: ContactService = Depends(get_contact_service),
 ):
-    contacts = svc.get_contacts(db, skip=skip, limit=limit)
+    """
+    Offset pagination returns a plain list of contacts.
+    Keyset pagination (``pagination=keyset`` or an ``after`` cursor) returns
+    a page with the cursor for the next request.
+    The ETag follows the count of contact changes, so any write changes it;
+    a matching If-None-Match gets 304 before any contact is read.
+    """
+    etag = weak_etag("contacts", await svc.count_changes(db))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers.update(etag_headers(etag))
+
+    if pagination == "keyset" or after is not None:
+        try:
+            contacts, next_cursor = await svc.get_contacts_page(
+                db, after=after, limit=limit
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail=Response.INVALID_CURSOR.value)
+        return ContactsPage(
+            contacts=[Contact.model_validate(contact) for contact in contacts],
+            next_cursor=next_cursor,
+        )
+
+    contacts = await svc.get_contacts(db, skip=skip, limit=limit)
 
     return [Contact.model_validate(contact) for contact in contacts]
 
 
+@router.post("/batch", response_model=ContactBatchResult)
+async def batch_contacts(
+    batch: ContactBatch,
+    db: AsyncSession = Depends(get_async_db),
+    svc: ContactService = Depends(get_contact_service),
+):
+    """
+    Delete, update and create many contacts in one transaction.
+    Each item gets its own result; failed items do not stop the others.
+    """
+    try:
+        return await svc.batch(
+            db,
+            creates=batch.create,
+            updates=[(item.id, item) for item in batch.update],
+            deletes=batch.delete,
+        )
+    except BatchConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/import", response_model=ImportReport | Job)
+async def import_contacts(
+    request: Request,
+    response: HTTPResponse,
+    format: ContactFormat | None = None,
+    region: str = "PL",
+    on_conflict: Literal["skip", "update"] = "skip",
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10_000),
+    background: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    svc: ImportService = Depends(get_import_service),
+    jobs: ContactJobs = Depends(get_contact_jobs),
+):
+    """
+    Bulk import contacts from a CSV (``name,phone`` header), NDJSON or vCard
+    body. The body is streamed and written in chunks, one transaction each.
+    The format defaults to the one named by the Content-Type header.
+    With `background`, the import runs as a job: the response is the job
+    (202), and its result the ImportReport.
+    """
+    format = format or format_from_content_type(request.headers.get("content-type"))
+    if format is None:
+        raise HTTPException(
+            status_code=415, detail=Response.UNSUPPORTED_IMPORT_FORMAT.value
+        )
+
+    if background:
+        try:
+            job = await jobs.start_import(
+                request.stream(),
+                format,
+                default_region=region,
+                update_existing=on_conflict == "update",
+                chunk_size=chunk_size,
+            )
+        except JobQueueFullError:
+            raise queue_full()
+        response.status_code = 202
+        return job
+
+    return await svc.import_contacts(
+        db,
+        parse_contacts(request.stream(), format),
+        default_region=region,
+        update_existing=on_conflict == "update",
+        chunk_size=chunk_size,
+    )
+
+
+@router.get("/export")
+async def export_contacts(
+    format: ContactFormat = "csv",
+    svc: ContactService = Depends(get_contact_service),
+):
+    """Stream the whole contact book as CSV, NDJSON or vCard."""
+
+    async def body():
+        # Dependency teardown runs before the body is sent, so the stream
+        # needs a session of its own
+        async with AsyncSessionLocal() as db:
+            yield format_header(format)
+            async for rows in svc.stream_contacts(db):
+                yield format_contacts(rows, format)
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
+
+
+@router.post("/export", response_model=Job, status_code=202)
+async def start_export(
+    format: ContactFormat = "csv",
+    jobs: ContactJobs = Depends(get_contact_jobs),
+):
+    """
+    Export the contact book as a job. Once it succeeds, the file is served
+    by GET /jobs/{id}/download.
+    """
+    try:
+        return await jobs.start_export(format)
+    except JobQueueFullError:
+        raise queue_full()
+
+
+@router.post("/reindex", response_model=Job, status_code=202)
+async def start_reindex(jobs: ContactJobs = Depends(get_contact_jobs)):
+    """Rebuild the search index as a job; searches use the old one meanwhile."""
+    try:
+        return await jobs.start_reindex()
+    except JobQueueFullError:
+        raise queue_full()
+
+
+# Declared before /{contact_id}, which would otherwise match "stats"
+@router.get("/stats", response_model=ContactStats)
+async def contact_stats(
+    q: str | None = Query(None, min_length=1, max_length=100),
+    db: AsyncSession = Depends(get_async_db),
+    svc: ContactService = Depends(get_contact_service),
+):
+    """
+    Number of contacts, from a count kept up to date by every write rather
+    than a table scan. With `q`, also how many contacts a search finds.
+    """
+    return await svc.get_stats(db, query=q)
+
+
+@router.get("/changes", response_model=ContactChanges)
+async def read_changes(
+    since: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    svc: ContactService = Depends(get_contact_service),
+):
+    """
+    Contacts created, updated and deleted after the `since` token, oldest
+    first. Pass `next` back as `since` to continue; `has_more` means more
+    are waiting already. Without `since`, only the token to start from: take
+    it, list the contacts, then follow the changes from it.
+    """
+    try:
+        return await svc.get_changes(db, since=since, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=Response.INVALID_CHANGE_TOKEN.value)
+
+
+@router.get("/changes/stream")
+async def stream_changes(
+    since: str | None = None,
+    last_event_id: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    svc: ContactService = Depends(get_contact_service),
+):
+    """
+    The change feed as server-sent events: `ready` with the token it starts
+    from, then a `change` (a ContactChangeEvent) for each change as it is made.
+    Event ids are change tokens, so a reconnecting EventSource resumes from
+    the last change it got.
+    """
+    since = last_event_id or since
+    try:
+        # Checked up front, so a bad token gets a status code
+        page = await svc.get_changes(db, since=since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=Response.INVALID_CHANGE_TOKEN.value)
+    start = since or page.next
+
+    async def events():
+        nonlocal page
+        yield format_sse("ready", {"next": start}, id=start)
+        while True:
+            for change in page.changes:
+                yield format_sse(
+                    "change", change.model_dump(), id=encode_change_token(change.seq)
+                )
+            if not page.has_more:
+                while not await svc.wait_for_changes(
+                    page.next, CONTACT_CHANGES_HEARTBEAT_SECONDS
+                ):
+                    yield ": keepalive\n\n"
+            # The request's session is closed once streaming starts
+            async with AsyncSessionLocal() as session:
+                page = await svc.get_changes(session, since=page.next)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/duplicates/scan", response_model=DuplicateScan, status_code=202)
+async def scan_duplicates(dedupe: DedupeService = Depends(get_dedupe_service)):
+    """
+    Start looking for duplicate contacts in a background job, unless a scan
+    is running already. Returns the scan's status; the clusters it finds
+    are served by GET /contacts/duplicates.
+    """
+    try:
+        return await dedupe.start_scan()
+    except JobQueueFullError:
+        raise queue_full()
+
+
+@router.get("/duplicates", response_model=DuplicateClusters)
+async def read_duplicates(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    dedupe: DedupeService = Depends(get_dedupe_service),
+):
+    """
+    Clusters of likely duplicates found by the latest scan, largest first,
+    with their contacts as they are now. `scan.changes_since` counts the
+    writes made since the scan started.
+    """
+    clusters, next_skip = await dedupe.get_clusters(db, skip=skip, limit=limit)
+    return DuplicateClusters(
+        scan=await dedupe.status(db), clusters=clusters, next_skip=next_skip
+    )
+
+
+@router.post("/merge", response_model=Contact)
+async def merge_contacts(
+    merge: ContactMerge,
+    response: HTTPResponse,
+    db: AsyncSession = Depends(get_async_db),
+    svc: ContactService = Depends(get_contact_service),
+):
+    """
+    Merge duplicates into `keep` in one transaction: the `merge` contacts
+    are deleted and `keep` takes `name` and `phone` when given. Nothing
+    changes unless every contact exists.
+    """
+    try:
+        db_contact = await svc.merge_contacts(
+            db, merge.keep, merge.merge, name=merge.name, phone=merge.phone
+        )
+    except PhoneAlreadyRegisteredError:
+        raise HTTPException(
+            status_code=400, detail=Response.PHONE_ALREADY_REGISTERED.value
+        )
+    if db_contact is None:
+        raise HTTPException(status_code=404, detail=Response.CONTACT_NOT_FOUND.value)
+
+    merged = Contact.model_validate(db_contact)
+    response.headers.update(contact_etag_headers(merged))
+    return merged
+
+
 @router.get("/{contact_id}", response_model=Contact)
-def read_contact(
+async def read_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    response: HTTPResponse,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     svc: ContactService = Depends(get_contact_service),
 ):
-    db_contact = svc.get_contact_by_id(db, contact_id=contact_id)
+    """
+    The ETag is the contact's version. A matching If-None-Match gets 304
+    after reading only the version.
+    """
+    if if_none_match:
+        version = await svc.get_contact_version(db, contact_id)
+        if version is not None:
+            etag = weak_etag("contact", contact_id, version)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+    db_contact = await svc.get_contact_by_id(db, contact_id=contact_id)
     if db_contact is None:
-        raise HTTPException(status_code=404, detail=Response.CONTACT_NOT_FOUND)
+        raise HTTPException(status_code=404, detail=Response.CONTACT_NOT_FOUND.value)
 
-    return Contact.model_validate(db_contact)
+    contact = Contact.model_validate(db_contact)
+    response.headers.update(contact_etag_headers(contact))
+    return contact
 
 
 @router.put("/{contact_id}", response_model=Contact)
-def update_contact(
+async def update_contact(
     contact_id: int,
     contact: ContactUpdate,
-    db: Session = Depends(get_db),
+    response: HTTPResponse,
+    db: AsyncSession = Depends(get_async_db),
     svc: ContactService = Depends(get_contact_service),
 ):
-    db_contact_by_phone = svc.get_contact_by_phone(db, phone=contact.phone)
-    if db_contact_by_phone and db_contact_by_phone.id != contact_id:
+    try:
+        db_contact = await svc.update_contact_by_id(
+            db, contact_id=contact_id, contact=contact
+        )
+    except PhoneAlreadyRegisteredError:
         raise HTTPException(status_code=400, detail="Phone number already registered")
-
-    db_contact = svc.update_contact_by_id(db, contact_id=contact_id, contact=contact)
     if db_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
 
-    return Contact.model_validate(db_contact)
+    updated = Contact.model_validate(db_contact)
+    response.headers.update(contact_etag_headers(updated))
+    return updated
 
 
 @router.delete("/{contact_id}")
-def delete_contact(
+async def delete_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     svc: ContactService = Depends(get_contact_service),
 ):
-    success = svc.delete_contact(db, contact_id=contact_id)
+    success = await svc.delete_contact(db, contact_id=contact_id)
     if not success:
         raise HTTPException(status_code=404, detail=Response.CONTACT_NOT_FOUND.value)
     return {"message": Response.CONTACT_DELETED.value}
\ No newline at end of file
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from src.api.responses import Response
+from src.db.schemas import Job
+from src.services.contact_jobs import ContactJobs, get_contact_jobs
+from src.services.job_service import JobService, get_job_service
+from src.utils.contact_formats import MEDIA_TYPES
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=Job)
+async def read_job(job_id: str, jobs: JobService = Depends(get_job_service)):
+    """
+    A background job's status and progress, and once it succeeds, its
+    result. Jobs whose process stopped are reported as failed.
+    """
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=Response.JOB_NOT_FOUND.value)
+    return job
+
+
+@router.get("/{job_id}/download")
+async def download_job_file(
+    job_id: str,
+    jobs: JobService = Depends(get_job_service),
+    contact_jobs: ContactJobs = Depends(get_contact_jobs),
+):
+    """The file written by a finished export job."""
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=Response.JOB_NOT_FOUND.value)
+    path = contact_jobs.export_path(job)
+    if path is None:
+        raise HTTPException(status_code=404, detail=Response.JOB_FILE_NOT_FOUND.value)
+    format = job.result["format"]
+    return FileResponse(
+        path, media_type=MEDIA_TYPES[format], filename=f"contacts.{format}"
+    )
@@ -0,0 +1,16 @@
+from fastapi import Response
+from fastapi.routing import APIRouter
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from src.services.metrics import collect_metrics
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("", response_class=Response)
+def read_metrics():
+    """
+    Request, tool, SQL, pool and model metrics in the Prometheus text format,
+    added up over all workers.
+    """
+    return Response(collect_metrics(), media_type=CONTENT_TYPE_LATEST)
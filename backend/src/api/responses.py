@@ -1,5 +1,7 @@
 from enum import Enum
 
+from src.db.schemas import MAX_NAME_LENGTH
+
 
 class Response(Enum):
     CONTACT_NOT_FOUND = "Contact not found"
@@ -13,4 +15,16 @@ class Response(Enum):
     CONTACT_UPDATE_FAILED = "Failed to update contact"
     CONTACT_DELETION_FAILED = "Failed to delete contact"
 
-    INVALID_PHONE_NUMBER = "Invalid phone number format"
\ No newline at end of file
+    INVALID_PHONE_NUMBER = "Invalid phone number format"
+    INVALID_CURSOR = "Invalid pagination cursor"
+    INVALID_CHANGE_TOKEN = "Invalid change token"
+    PHONE_ALREADY_REGISTERED = "Phone number already registered to another contact"
+    DUPLICATE_IN_BATCH = "Item repeats an earlier item of the batch"
+    BATCH_CONFLICT = "Batch conflicts with a concurrent write, nothing was applied"
+    INVALID_NAME = f"Name must be between 1 and {MAX_NAME_LENGTH} characters"
+    UNSUPPORTED_IMPORT_FORMAT = "Unsupported import format"
+    MODEL_BUSY = "The assistant is busy, try again later"
+    CONVERSATION_NOT_FOUND = "Conversation not found"
+    JOB_NOT_FOUND = "Job not found"
+    JOB_QUEUE_FULL = "Too many jobs are queued, try again later"
+    JOB_FILE_NOT_FOUND = "The job has no file to download"
\ No newline at end of file
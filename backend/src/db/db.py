@@ -1,23 +1,370 @@
+import asyncio
+import bisect
+import functools
+import inspect
+import itertools
 import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import Select, create_engine, func, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Comma-separated read replicas of DATABASE_URL; see RoutingSession
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# Reads skip a replica that may be missing changes older than this
+DATABASE_REPLICA_MAX_LAG = float(os.getenv("DATABASE_REPLICA_MAX_LAG", "5"))
+DATABASE_REPLICA_CHECK_SECONDS = float(os.getenv("DATABASE_REPLICA_CHECK_SECONDS", "1"))
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap the sync DBAPI driver in a database URL for its asyncio counterpart"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.drivername}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is not set")
+# With async handlers concurrency is no longer capped by the threadpool, so
+# the connection pool is what bounds in-flight queries.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
 
 Base = declarative_base()
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
+# Engines are created on first use, so importing the app (or its models,
+# as Alembic does) needs no database settings
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_replica_engines: Optional[dict[str, AsyncEngine]] = None
+_async_engine_hooks: list[Callable[[AsyncEngine, str], None]] = []
+_replica_lag_hooks: list[Callable[[str, float], None]] = []
+
+
+def _database_url() -> str:
+    if not DATABASE_URL:
+        raise ValueError("DATABASE_URL environment variable is not set")
+    return DATABASE_URL
+
+
+def get_engine() -> Engine:
+    """Get the sync engine, used by Alembic and scripts"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            _database_url(),
+            pool_pre_ping=True,
+            pool_recycle=300,
+        )
+    return _engine
+
+
+def _create_async_engine(url: str, name: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+    for hook in _async_engine_hooks:
+        hook(engine, name)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """Get the async engine the app runs its queries on, the primary's"""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = _create_async_engine(
+            os.getenv("ASYNC_DATABASE_URL") or to_async_url(_database_url()),
+            "primary",
+        )
+    return _async_engine
+
+
+def get_replica_engines() -> dict[str, AsyncEngine]:
+    """Get an async engine per DATABASE_REPLICA_URLS entry, by name"""
+    global _replica_engines
+    if _replica_engines is None:
+        _replica_engines = {
+            f"replica{i}": _create_async_engine(to_async_url(url), f"replica{i}")
+            for i, url in enumerate(DATABASE_REPLICA_URLS, start=1)
+        }
+    return _replica_engines
+
+
+def on_async_engine(hook: Callable[[AsyncEngine, str], None]) -> None:
+    """
+    Call `hook` with each async engine and its name ("primary", "replica1",
+    ...) once it is created, or now for those that are
+    """
+    if _async_engine is not None:
+        hook(_async_engine, "primary")
+    for name, engine in (_replica_engines or {}).items():
+        hook(engine, name)
+    _async_engine_hooks.append(hook)
+
+
+def on_replica_lag(hook: Callable[[str, float], None]) -> None:
+    """Call `hook` with a replica's name and lag in seconds after each check"""
+    _replica_lag_hooks.append(hook)
+
+
+class ReplicaRouter:
+    """
+    Picks the replica a session reads from. Replicas are checked in the
+    background, at most every `check_every` seconds while reads come in,
+    against the contact change log: a replica whose last change is at
+    least the primary's last change at some time has every change made
+    before then. A replica is read from while that time is at most
+    `max_lag` seconds ago and after this process last wrote, so a process
+    reads its own writes; other processes' writes may take `max_lag`.
+    Without such a replica, reads go to the primary.
+    """
+
+    # Lags longer than this are reported as infinite
+    LAG_HISTORY = 300.0
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: dict[str, AsyncEngine],
+        max_lag: float = DATABASE_REPLICA_MAX_LAG,
+        check_every: float = DATABASE_REPLICA_CHECK_SECONDS,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_every = check_every
+        # (last time seen, the primary's last change seq), oldest first
+        self._heads: list[tuple[float, int]] = []
+        # Per replica: the time before which it has every change
+        self._horizon: dict[str, float] = {}
+        self._written_at = float("-inf")
+        self._checked_at = float("-inf")
+        self._checking: Optional[asyncio.Task] = None
+        self._turn = itertools.count()
+
+    def pick(self) -> Optional[str]:
+        """The name of a replica fit to read from, or None for the primary"""
+        floor = max(time.monotonic() - self.max_lag, self._written_at)
+        fit = [name for name, at in self._horizon.items() if at > floor]
+        if not fit:
+            return None
+        return fit[next(self._turn) % len(fit)]
+
+    def written(self) -> None:
+        """Note that this process committed a write"""
+        self._written_at = time.monotonic()
+
+    def maybe_check(self) -> None:
+        """Start a check in the background if the last one is old enough"""
+        if self._checking is None and (
+            time.monotonic() - self._checked_at >= self.check_every
+        ):
+            self._checking = asyncio.get_running_loop().create_task(self.check())
+            self._checking.add_done_callback(self._checked)
+
+    def _checked(self, task: asyncio.Task) -> None:
+        self._checking = None
+        if not task.cancelled():
+            task.exception()  # retrieved; a failed check is retried later
+
+    async def check(self) -> None:
+        """Measure how far behind the primary each replica is"""
+        # Imported here: the models import Base from this module
+        from src.db.models.Contact import ContactChangeModel
+
+        last_seq = select(func.coalesce(func.max(ContactChangeModel.seq), 0))
+        started = self._checked_at = time.monotonic()
+        async with self.primary.connect() as conn:
+            head = await conn.scalar(last_seq)
+        if self._heads and self._heads[-1][1] == head:
+            self._heads[-1] = (started, head)
+        else:
+            self._heads.append((started, head))
+        del self._heads[
+            : bisect.bisect_left(
+                self._heads, started - self.LAG_HISTORY, key=lambda entry: entry[0]
+            )
+        ]
+        for name, engine in self.replicas.items():
+            try:
+                async with engine.connect() as conn:
+                    seq = await conn.scalar(last_seq)
+                # The last time the primary was no further than the replica
+                seen = bisect.bisect_right(self._heads, seq, key=lambda entry: entry[1])
+                caught_up = self._heads[seen - 1][0] if seen else None
+            except Exception:
+                # Unreachable: no reads until a check gets through again
+                caught_up = None
+            if caught_up is not None:
+                self._horizon[name] = caught_up
+            else:
+                self._horizon.pop(name, None)
+            lag = float("inf") if caught_up is None else started - caught_up
+            for hook in _replica_lag_hooks:
+                hook(name, lag)
+
+    async def close(self) -> None:
+        if self._checking is not None:
+            self._checking.cancel()
+
+
+_router: Optional[ReplicaRouter] = None
+
+
+def get_replica_router() -> Optional[ReplicaRouter]:
+    """Get the router over DATABASE_REPLICA_URLS, or None without replicas"""
+    global _router
+    if _router is None and DATABASE_REPLICA_URLS:
+        _router = ReplicaRouter(get_async_engine(), get_replica_engines())
+    return _router
+
+
+# Session.info keys: reads may go to a replica; the session has written;
+# the engine the session reads from once it has picked one
+_REPLICA_READS = "replica_reads"
+_WROTE = "wrote"
+_READ_BIND = "read_bind"
+
+
+class RoutingSession(Session):
+    """
+    The Session behind AsyncSessionLocal. SELECTs made inside `replica_reads`
+    methods go to a replica the ReplicaRouter picks, the same one for the
+    rest of the session. Everything else goes to the primary, and once a
+    session has written, so do its reads.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info[_WROTE] = True
+        elif (
+            self.info.get(_REPLICA_READS)
+            and not self.info.get(_WROTE)
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            bind = self.info.get(_READ_BIND)
+            if bind is None:
+                name = get_replica_router().pick()
+                bind = self.info[_READ_BIND] = (
+                    get_replica_engines()[name].sync_engine if name else False
+                )
+            if bind:
+                return bind
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+    def commit(self) -> None:
+        super().commit()
+        if self.info.get(_WROTE) and _router is not None:
+            _router.written()
+
+
+def read_from_replica(db: AsyncSession) -> bool:
+    """Whether the session's reads have gone to a replica"""
+    return bool(db.info.get(_READ_BIND))
+
+
+@contextmanager
+def _reading(db: AsyncSession):
+    router = get_replica_router()
+    if router is None:
+        yield
+        return
+    router.maybe_check()
+    previous = db.info.get(_REPLICA_READS)
+    db.info[_REPLICA_READS] = True
+    try:
+        yield
+    finally:
+        db.info[_REPLICA_READS] = previous
+
+
+def replica_reads(method):
+    """
+    Mark a read-only service method, coroutine or async generator, whose
+    first argument after self is the AsyncSession: its queries may run on
+    a replica.
+    """
+    if inspect.isasyncgenfunction(method):
+
+        @functools.wraps(method)
+        async def stream(self, db: AsyncSession, *args, **kwargs):
+            with _reading(db):
+                async for item in method(self, db, *args, **kwargs):
+                    yield item
+
+        return stream
+
+    @functools.wraps(method)
+    async def read(self, db: AsyncSession, *args, **kwargs):
+        with _reading(db):
+            return await method(self, db, *args, **kwargs)
+
+    return read
+
+
+class _SessionLocal(sessionmaker):
+    """A sessionmaker bound to the sync engine when it first makes a session"""
+
+    def __call__(self, **local_kw) -> Session:
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+class _AsyncSessionLocal(async_sessionmaker):
+    """The same, bound to the async engine"""
+
+    def __call__(self, **local_kw) -> AsyncSession:
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_async_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _SessionLocal(autocommit=False, autoflush=False)
+
+# Objects stay usable after commit; expiring them would need lazy loads,
+# which are not possible on an AsyncSession.
+AsyncSessionLocal = _AsyncSessionLocal(
+    autoflush=False, expire_on_commit=False, sync_session_class=RoutingSession
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async def dispose_engines() -> None:
+    """Close the pooled connections of the engines created so far"""
+    if _router is not None:
+        await _router.close()
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    for engine in (_replica_engines or {}).values():
+        await engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
 
 
 def get_db():
@@ -27,3 +374,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Async database dependency for FastAPI"""
+    async with AsyncSessionLocal() as db:
+        yield db
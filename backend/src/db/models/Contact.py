@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String, func
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, func
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -13,6 +13,11 @@ class ContactModel(Base):
     name = Column(String(128), nullable=False)
     phone = Column(String(32), nullable=False, unique=True)
     createdAt = Column(DateTime, nullable=False, default=func.now())
+    # Bumped by every update, for ETags
+    version = Column(Integer, nullable=False, default=1)
+    updatedAt = Column(
+        DateTime, nullable=False, default=func.now(), onupdate=func.now()
+    )
 
     def __repr__(self):
         return f"<ContactModel(id={self.id}, name='{self.name}', phone='{self.phone}')>"
@@ -23,4 +28,51 @@ class ContactModel(Base):
             "name": self.name,
             "phone": self.phone,
             "createdAt": self.createdAt,
+            "version": self.version,
+            "updatedAt": self.updatedAt,
         }
+
+
+class ContactStatsModel(Base):
+    """
+    Number of contacts and of changes made to them, kept by ContactService
+    in the same transaction as each write. Spread over a few slots so
+    concurrent writers rarely wait on the same row; the totals are their sums.
+    """
+
+    __tablename__ = "contact_stats"
+    slot = Column(Integer, primary_key=True, autoincrement=False)
+    contacts = Column(BigInteger, nullable=False, default=0)
+    # Rows created, updated or deleted; only ever grows, for list ETags
+    changes = Column(BigInteger, nullable=False, default=0)
+
+
+class ContactChangeModel(Base):
+    """
+    Append-only log of contact writes: one row per contact created, updated
+    or deleted, written by ContactService in the same transaction. seq gives
+    the order clients sync in.
+    """
+
+    __tablename__ = "contact_changes"
+    # Keeps SQLite from handing out the seq of a deleted last row again
+    __table_args__ = {"sqlite_autoincrement": True}
+    # SQLite only autoincrements an INTEGER primary key
+    seq = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    contactId = Column(Integer, nullable=False)
+    op = Column(String(8), nullable=False)
+    # The contact as the change left it; deletes keep only the phone
+    name = Column(String(128), nullable=True)
+    phone = Column(String(32), nullable=False)
+    version = Column(Integer, nullable=True)
+    createdAt = Column(DateTime, nullable=False, default=func.now())
+
+    def __repr__(self):
+        return (
+            f"<ContactChangeModel(seq={self.seq}, contactId={self.contactId}, "
+            f"op='{self.op}')>"
+        )
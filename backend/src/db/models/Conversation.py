@@ -0,0 +1,37 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, func
+
+from src.db.models.Contact import Base
+
+
+class ConversationModel(Base):
+    __tablename__ = "conversations"
+    id = Column(String(36), primary_key=True)
+    # Running summary of the messages up to and including summarizedUpTo
+    summary = Column(Text, nullable=True)
+    summarizedUpTo = Column(Integer, nullable=False, default=0)
+    createdAt = Column(DateTime, nullable=False, default=func.now())
+
+    def __repr__(self):
+        return f"<ConversationModel(id='{self.id}')>"
+
+
+class ConversationMessageModel(Base):
+    __tablename__ = "conversation_messages"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    conversationId = Column(
+        String(36),
+        ForeignKey("conversations.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    role = Column(String(16), nullable=False)
+    content = Column(Text, nullable=False)
+    # Estimated, see conversation_service.estimate_tokens
+    tokens = Column(Integer, nullable=False)
+    createdAt = Column(DateTime, nullable=False, default=func.now())
+
+    def __repr__(self):
+        return (
+            f"<ConversationMessageModel(id={self.id}, "
+            f"conversationId='{self.conversationId}', role='{self.role}')>"
+        )
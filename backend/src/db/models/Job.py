@@ -0,0 +1,24 @@
+from sqlalchemy import JSON, Column, DateTime, Float, Integer, String, Text
+
+from src.db.models.Contact import Base
+
+
+class JobModel(Base):
+    """State of a background job, see job_service.DatabaseJobStore."""
+
+    __tablename__ = "jobs"
+    id = Column(String(32), primary_key=True)
+    kind = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False)
+    processed = Column(Integer, nullable=False, default=0)
+    progress = Column(Float, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    createdAt = Column(DateTime(timezone=True), nullable=False)
+    startedAt = Column(DateTime(timezone=True), nullable=True)
+    # Finished jobs are deleted after JOB_TTL_SECONDS
+    finishedAt = Column(DateTime(timezone=True), nullable=True, index=True)
+    updatedAt = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<JobModel(id='{self.id}', kind='{self.kind}', status='{self.status}')>"
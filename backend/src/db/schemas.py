@@ -1,12 +1,54 @@
-from typing import Annotated, Literal
+from datetime import datetime
+from typing import Annotated, Any, Literal
 
-from pydantic import BaseModel, ConfigDict, Field, constr
-from pydantic_extra_types.phone_numbers import PhoneNumberValidator
+from pydantic import (
+    BaseModel,
+    BeforeValidator,
+    ConfigDict,
+    Field,
+    WithJsonSchema,
+    constr,
+)
+from pydantic_core import PydanticCustomError
+
+from src.utils.phone import format_phone_number
+
+MAX_NAME_LENGTH = 50
+
+
+def _to_e164(value: Any) -> str:
+    # Numbers must carry their country code, as with PhoneNumberValidator.
+    # Goes through the memoized normalizer, since every Contact built from a
+    # row or cache entry is validated again.
+    phone = format_phone_number(value, None) if isinstance(value, str) else None
+    if phone is None:
+        raise PydanticCustomError("value_error", "value is not a valid phone number")
+    return phone
+
+
+PhoneE164 = Annotated[
+    str,
+    BeforeValidator(_to_e164),
+    WithJsonSchema({"type": "string", "format": "phone"}),
+]
+
+def _stored_phone(value: Any) -> Any:
+    # Rows written before phones were normalized can hold other formats;
+    # they are returned as stored rather than failing the whole response
+    if isinstance(value, str):
+        return format_phone_number(value, None) or value
+    return value
+
+
+StoredPhone = Annotated[
+    str,
+    BeforeValidator(_stored_phone),
+    WithJsonSchema({"type": "string", "format": "phone"}),
+]
 
-PhoneE164 = Annotated[str, PhoneNumberValidator(number_format="E164")]
 
 class ContactBase(BaseModel):
-    name: constr(min_length=1, max_length=50)  # type: ignore
+    name: constr(min_length=1, max_length=MAX_NAME_LENGTH)  # type: ignore
     phone: PhoneE164
 
 
@@ -19,6 +61,145 @@ class ContactUpdate(ContactBase):
 
 class Contact(ContactBase):
     id: int
+    phone: StoredPhone
+    # Rows that predate versioning are at version 1
+    version: int = 1
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ContactsPage(BaseModel):
+    contacts: list[Contact]
+    next_cursor: str | None = None
+
+
+class ContactStats(BaseModel):
+    total: int
+    # With a search query: how many contacts it matches
+    query: str | None = None
+    matches: int | None = None
+
+
+class ContactChangeEvent(BaseModel):
+    seq: int
+    op: Literal["insert", "update", "delete"]
+    id: int
+    # The contact as the change left it; None for deletes
+    contact: Contact | None = None
+
+
+class ContactChanges(BaseModel):
+    """Contact changes in the order they were made."""
+
+    changes: list[ContactChangeEvent]
+    # Pass as `since` to get the changes that follow these
+    next: str
+    # More changes are waiting beyond `limit`
+    has_more: bool = False
+
+
+# Items per list in a batch request
+MAX_BATCH_ITEMS = 1000
+
+
+class DuplicateScan(BaseModel):
+    status: Literal["idle", "running", "done", "failed"]
+    # The background job running the scan, see GET /jobs/{id}
+    job_id: str | None = None
+    startedAt: datetime | None = None
+    finishedAt: datetime | None = None
+    # Contacts read, blocks and pairs scored, blocks too common to score
+    scanned: int = 0
+    blocks: int = 0
+    oversized_blocks: int = 0
+    pairs: int = 0
+    clusters: int = 0
+    # Contact writes since the scan started; its clusters may be out of date
+    changes_since: int | None = None
+    error: str | None = None
+
+
+class DuplicateCluster(BaseModel):
+    # Position in the scan's list of clusters
+    index: int
+    # Score of the cluster's most similar pair, up to 1
+    score: float
+    contacts: list[Contact]
+
+
+class DuplicateClusters(BaseModel):
+    scan: DuplicateScan
+    clusters: list[DuplicateCluster]
+    next_skip: int | None = None
+
+
+class ContactMerge(BaseModel):
+    """Contacts merged into `keep`, which takes `name` and `phone` if given."""
+
+    keep: int
+    merge: list[int] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
+    name: constr(min_length=1, max_length=MAX_NAME_LENGTH) | None = None  # type: ignore
+    phone: PhoneE164 | None = None
+
+
+class ContactUpdateItem(ContactUpdate):
+    id: int
+
+
+class ContactBatch(BaseModel):
+    """Writes applied in one transaction: deletes, then updates, then creates."""
+
+    create: list[ContactCreate] = Field(default=[], max_length=MAX_BATCH_ITEMS)
+    update: list[ContactUpdateItem] = Field(default=[], max_length=MAX_BATCH_ITEMS)
+    delete: list[int] = Field(default=[], max_length=MAX_BATCH_ITEMS)
+
+
+class BatchItemResult(BaseModel):
+    # Position of the item in its list of the request
+    index: int
+    success: bool
+    id: int | None = None
+    contact: Contact | None = None
+    error: str | None = None
+
+
+class ContactBatchResult(BaseModel):
+    created: list[BatchItemResult] = []
+    updated: list[BatchItemResult] = []
+    deleted: list[BatchItemResult] = []
+
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    received: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    # Capped, see `failed` for the total
+    errors: list[ImportRowError] = []
+
+
+class Job(BaseModel):
+    """Work run in the background; poll GET /jobs/{id} until it finishes."""
+
+    id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed"] = "queued"
+    # Items handled so far, and the fraction done when the total is known
+    processed: int = 0
+    progress: float | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    createdAt: datetime
+    startedAt: datetime | None = None
+    finishedAt: datetime | None = None
+    # Refreshed while the job is queued or running
+    updatedAt: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -28,6 +209,7 @@ class ChatResponse(BaseModel):
     id: str
     role: Literal["user", "assistant"]
     createdAt: str
+    conversationId: str | None = None
 
 
 class NewChatMessage(BaseModel):
@@ -39,3 +221,7 @@ class NewChatMessage(BaseModel):
         examples=["Hello, how can I help you?"],
         description="The content of the chat message, must be between 2 and 400 characters long.",
     )
+    conversationId: str | None = Field(
+        default=None,
+        description="Conversation to continue; a new one is started when omitted.",
+    )
@@ -1,15 +1,27 @@
 # src/main.py
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastmcp import FastMCP
 
+from src.api.cache import router as cache_router
 from src.api.chat import router as chat_router
 from src.api.contacts import router as contacts_router
-from src.mcp.prompts.chat import register_chat_prompts
-from src.mcp.prompts.contact import register_contacts_prompts
-from src.mcp.tools.contact import register_contact_tools
+from src.api.jobs import router as jobs_router
+from src.api.metrics import router as metrics_router
+from src.db.db import dispose_engines, on_async_engine, on_replica_lag
+from src.mcp.server import MCP_STATELESS_HTTP, get_mcp_server
+from src.services.job_service import get_job_service
+from src.services.metrics import (
+    METRICS_ENABLED,
+    MetricsMiddleware,
+    instrument_engine,
+    record_replica_lag,
+    shutdown_metrics,
+)
+from src.services.mpc_client import mcp_client_lifespan
+from src.utils.phone import shutdown_phone_pool
 
 
 def create_base_app(lifespan=None) -> FastAPI:
@@ -29,9 +41,18 @@ def create_base_app(lifespan=None) -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+        on_async_engine(
+            lambda engine, name: instrument_engine(engine.sync_engine, name)
+        )
+        on_replica_lag(record_replica_lag)
 
     app.include_router(contacts_router, prefix="/api")
+    app.include_router(jobs_router, prefix="/api")
     app.include_router(chat_router, prefix="/api")
+    app.include_router(cache_router, prefix="/api")
+    app.include_router(metrics_router, prefix="/api")
 
     @app.get("/api/health")
     def health_check():
@@ -40,27 +61,28 @@ def create_base_app(lifespan=None) -> FastAPI:
     return app
 
 
-base_app = create_base_app()
-
-mcp = FastMCP(
-    name="Contacts Server",
-    instructions="""
-    This server provides data about contacts.
-    You can use it to retrieve, create, update, and delete contacts.
-    """,
-    on_duplicate_tools="error",
-    on_duplicate_prompts="error",
-    on_duplicate_resources="error",
-)
-
-register_contact_tools(mcp)
-register_contacts_prompts(mcp)
-register_chat_prompts(mcp)
-mcp_app = mcp.http_app(path="/mcp")
+def create_app() -> FastAPI:
+    """Create the served app: the base app with the MCP server mounted"""
+    mcp_app = get_mcp_server().http_app(path="/mcp", stateless_http=MCP_STATELESS_HTTP)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        try:
+            async with mcp_app.lifespan(app):
+                async with mcp_client_lifespan():
+                    yield
+        finally:
+            await get_job_service().shutdown()
+            await dispose_engines()
+            shutdown_phone_pool()
+            shutdown_metrics()
+
+    app = create_base_app(lifespan=lifespan)
+    app.mount("/api/llm", mcp_app)
+    return app
 
 
-app = create_base_app(lifespan=mcp_app.lifespan)
-app.mount("/api/llm", mcp_app)
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,47 @@
+import os
+from typing import Optional
+
+from fastmcp import FastMCP
+
+from src.mcp.prompts.chat import register_chat_prompts
+from src.mcp.prompts.contact import register_contacts_prompts
+from src.mcp.tools.contact import register_contact_tools
+from src.mcp.tools.job import register_job_tools
+from src.services.metrics import METRICS_ENABLED, ToolMetricsMiddleware
+
+# Serve each MCP HTTP request on its own, without a session, since with
+# several workers the next request of a client may reach another one
+MCP_STATELESS_HTTP = os.getenv("MCP_STATELESS_HTTP", "false").lower() in ("1", "true")
+
+
+def create_mcp_server() -> FastMCP:
+    """Create the MCP server with all contact tools and prompts registered"""
+    mcp = FastMCP(
+        name="Contacts Server",
+        instructions="""
+        This server provides data about contacts.
+        You can use it to retrieve, create, update, and delete contacts.
+        """,
+        on_duplicate_tools="error",
+        on_duplicate_prompts="error",
+        on_duplicate_resources="error",
+    )
+
+    if METRICS_ENABLED:
+        mcp.add_middleware(ToolMetricsMiddleware())
+    register_contact_tools(mcp)
+    register_job_tools(mcp)
+    register_contacts_prompts(mcp)
+    register_chat_prompts(mcp)
+    return mcp
+
+
+_mcp: Optional[FastMCP] = None
+
+
+def get_mcp_server() -> FastMCP:
+    """Get the MCP server shared by the mounted app and the in-process client"""
+    global _mcp
+    if _mcp is None:
+        _mcp = create_mcp_server()
+    return _mcp
@@ -1,109 +1,241 @@
-from typing import Annotated
+import json
+import os
+from typing import Annotated, Literal, Sequence
 
 from fastmcp import FastMCP
-from pydantic import Field
+from pydantic import Field, ValidationError
 from src.api.responses import Response
-from src.db.db import get_db
-from src.db.schemas import ContactCreate, ContactUpdate
-from src.mcp.tools.schema import GetContactResponse, GetContactsResponse, McpResponse
-from src.services.contact_service import get_contact_service
-from src.utils.phone import format_phone_number
+from src.db.db import AsyncSessionLocal
+from src.db.schemas import (
+    MAX_NAME_LENGTH,
+    BatchItemResult,
+    Contact,
+    ContactCreate,
+    ContactUpdate,
+)
+from src.mcp.tools.schema import (
+    BatchResponse,
+    ContactChange,
+    ContactField,
+    CountContactsResponse,
+    DuplicatesResponse,
+    FormatPhoneResponse,
+    GetContactResponse,
+    GetContactsResponse,
+    McpResponse,
+    NewContact,
+)
+from src.services.contact_service import (
+    ContactAlreadyExistsError,
+    PhoneAlreadyRegisteredError,
+    get_contact_service,
+)
+from src.services.dedupe_service import get_dedupe_service
+from src.services.job_service import JobQueueFullError
+from src.utils.cursor import encode_cursor
+from src.utils.phone import format_phone_number, format_phone_numbers
+
+# Items per call of the batch tools
+MAX_TOOL_BATCH = 100
+# Contacts per call of the list tools unless the model asks for more
+TOOL_PAGE_SIZE = 20
+# Cap on the contacts part of a list tool's result; what does not fit is
+# left for the next page
+TOOL_RESULT_MAX_BYTES = int(os.getenv("MCP_TOOL_RESULT_MAX_BYTES", "4000"))
+# How long find_duplicate_contacts waits for a scan it started
+DEDUPE_TOOL_WAIT_SECONDS = float(os.getenv("DEDUPE_TOOL_WAIT_SECONDS", "20"))
+
+Fields = Annotated[
+    list[ContactField] | None,
+    Field(description="Fields to return for each contact; omit for all of them"),
+]
+Encoding = Annotated[
+    Literal["table", "objects"],
+    Field(
+        description="table: column names once and a row per contact (smallest); "
+        "objects: one object per contact"
+    ),
+]
+
+
+def _project(
+    contacts: Sequence[Contact],
+    fields: Sequence[ContactField] | None,
+    encoding: str,
+) -> tuple[dict, int]:
+    """
+    Encode contacts with only the requested fields, as many as fit in
+    TOOL_RESULT_MAX_BYTES (at least one, so paging always advances).
+    Returns the response fields and how many contacts were included.
+    """
+    columns = list(dict.fromkeys(fields or ContactField.__args__))
+    items = [[getattr(contact, column) for column in columns] for contact in contacts]
+    if encoding == "objects":
+        items = [dict(zip(columns, item)) for item in items]
+    kept, size = 0, 0
+    for item in items:
+        size += len(json.dumps(item, ensure_ascii=False).encode()) + 1
+        if kept and size > TOOL_RESULT_MAX_BYTES:
+            break
+        kept += 1
+    if encoding == "objects":
+        return {"contacts": items[:kept]}, kept
+    return {"columns": columns, "rows": items[:kept]}, kept
+
+
+def _validate_batch(
+    items: Sequence[NewContact], schema: type[ContactCreate] | type[ContactUpdate]
+) -> tuple[list[tuple[int, ContactCreate | ContactUpdate]], list[BatchItemResult]]:
+    """Normalize phones and validate items, keeping their positions."""
+    phones = format_phone_numbers([item.phone for item in items])
+    valid, invalid = [], []
+    for index, (item, phone) in enumerate(zip(items, phones)):
+        if phone is None:
+            error = Response.INVALID_PHONE_NUMBER.value
+        else:
+            try:
+                valid.append((index, schema(name=item.name, phone=phone)))
+                continue
+            except ValidationError:
+                error = Response.INVALID_NAME.value
+        invalid.append(
+            BatchItemResult(
+                index=index, success=False, id=getattr(item, "id", None), error=error
+            )
+        )
+    return valid, invalid
+
+
+def _batch_response(
+    action: str,
+    results: list[BatchItemResult],
+    valid: Sequence[tuple[int, object]] = (),
+    invalid: Sequence[BatchItemResult] = (),
+) -> BatchResponse:
+    # Results of the validated subset are renumbered to the caller's positions
+    for (index, _), result in zip(valid, results):
+        result.index = index
+    results = sorted([*results, *invalid], key=lambda result: result.index)
+    succeeded = sum(result.success for result in results)
+    return BatchResponse(
+        success=succeeded == len(results),
+        message=f"{succeeded} of {len(results)} contacts {action}",
+        results=results,
+    )
 
 
 def register_contact_tools(mcp: FastMCP):
     @mcp.tool(
         annotations={
             "title": "Get Contacts",
-            "description": "Retrieve a list of all contacts",
+            "description": "Retrieve a page of contacts; pass next_cursor as after to get the next page",
+            "readOnlyHint": True,
         },
         tags=["contacts"],
     )
-    def get_contacts() -> GetContactsResponse:
-        """Get all contacts from the database"""
-        db = next(get_db())
-        try:
-            contacts = get_contact_service().get_contacts(db)
-            return GetContactsResponse(
-                success=True,
-                contacts=contacts,
-            )
-        except Exception:
-            return GetContactResponse(
-                success=False,
-                message=Response.CONTACT_RETRIEVAL_FAILED,
-            )
-        finally:
-            db.close()
+    async def get_contacts(
+        after: Annotated[
+            str | None,
+            "Cursor from the previous page's next_cursor; omit for the first page",
+        ] = None,
+        limit: Annotated[int, Field(ge=1, le=100)] = TOOL_PAGE_SIZE,
+        fields: Fields = None,
+        encoding: Encoding = "table",
+    ) -> GetContactsResponse:
+        """Get contacts from the database, one page at a time"""
+        async with AsyncSessionLocal() as db:
+            try:
+                contacts, next_cursor = await get_contact_service().get_contacts_page(
+                    db, after=after, limit=limit
+                )
+                projected, kept = _project(contacts, fields, encoding)
+                if kept < len(contacts):
+                    next_cursor = encode_cursor(contacts[kept - 1].id)
+                return GetContactsResponse(
+                    success=True,
+                    next_cursor=next_cursor,
+                    **projected,
+                )
+            except ValueError:
+                return GetContactsResponse(
+                    success=False,
+                    message=Response.INVALID_CURSOR.value,
+                )
+            except Exception:
+                return GetContactResponse(
+                    success=False,
+                    message=Response.CONTACT_RETRIEVAL_FAILED.value,
+                )
 
     @mcp.tool(
         annotations={
             "title": "Get Contact by ID",
             "description": "Retrieve a specific contact by their ID",
+            "readOnlyHint": True,
         },
         tags=["contacts"],
     )
-    def get_contact_by_id(
+    async def get_contact_by_id(
         contact_id: Annotated[int, "The ID of the contact to retrieve"],
     ) -> GetContactResponse:
         """Get a specific contact by their ID"""
-        db = next(get_db())
-        try:
-            contact = get_contact_service().get_contact_by_id(db, contact_id=contact_id)
-            if not contact:
+        async with AsyncSessionLocal() as db:
+            try:
+                contact = await get_contact_service().get_contact_by_id(
+                    db, contact_id=contact_id
+                )
+                if not contact:
+                    return GetContactResponse(
+                        success=False,
+                        message=Response.CONTACT_NOT_FOUND.value,
+                    )
+                return GetContactResponse(
+                    success=True,
+                    contact=contact,
+                )
+            except Exception as e:
                 return GetContactResponse(
                     success=False,
-                    message=Response.CONTACT_NOT_FOUND,
+                    message=f"Failed to get contact: {str(e)}",
                 )
-            return GetContactResponse(
-                success=True,
-                contact=contact,
-            )
-        except Exception as e:
-            return GetContactResponse(
-                success=False,
-                message=f"Failed to get contact: {str(e)}",
-            )
-        finally:
-            db.close()
 
     @mcp.tool(
         annotations={
             "title": "Get Contact by Phone Number",
             "description": "Retrieve a specific contact by their phone number",
+            "readOnlyHint": True,
         },
         tags=["contacts"],
     )
-    def get_contact_by_phone_number(
+    async def get_contact_by_phone_number(
         phone: Annotated[str, "The phone number of the contact to retrieve"],
     ) -> GetContactResponse:
         """Get a specific contact by their phone number"""
-        db = next(get_db())
-        try:
-            formatted_number = format_phone_number(phone)
-            if not formatted_number:
+        async with AsyncSessionLocal() as db:
+            try:
+                formatted_number = format_phone_number(phone)
+                if not formatted_number:
+                    return GetContactResponse(
+                        success=False,
+                        message="Invalid phone number format",
+                    )
+                contact = await get_contact_service().get_contact_by_phone(
+                    db, phone=formatted_number
+                )
+                if not contact:
+                    return GetContactResponse(
+                        success=False,
+                        message=Response.CONTACT_NOT_FOUND.value,
+                    )
                 return GetContactResponse(
-                    success=False,
-                    message="Invalid phone number format",
+                    success=True,
+                    contact=contact,
                 )
-            contact = get_contact_service().get_contact_by_phone(
-                db, phone=formatted_number
-            )
-            if not contact:
+            except Exception as e:
                 return GetContactResponse(
                     success=False,
-                    message=Response.CONTACT_NOT_FOUND,
+                    message=f"Failed to get contact: {str(e)}",
                 )
-            return GetContactResponse(
-                success=True,
-                contact=contact,
-            )
-        except Exception as e:
-            return GetContactResponse(
-                success=False,
-                message=f"Failed to get contact: {str(e)}",
-            )
-        finally:
-            db.close()
 
     @mcp.tool(
         annotations={
@@ -112,7 +244,7 @@ def register_contact_tools(mcp: FastMCP):
         },
         tags=["contacts"],
     )
-    def create_contact(
+    async def create_contact(
         name: Annotated[str, "The name of the contact"],
         phone: Annotated[
             str,
@@ -122,36 +254,33 @@ def register_contact_tools(mcp: FastMCP):
         ],
     ) -> GetContactResponse:
         """Create a new contact with name and phone number (E.164 format like +1234567890)"""
-        db = next(get_db())
-        try:
-            formatted_number = format_phone_number(phone)
-            if not formatted_number:
+        async with AsyncSessionLocal() as db:
+            try:
+                formatted_number = format_phone_number(phone)
+                if not formatted_number:
+                    return GetContactResponse(
+                        success=False,
+                        message="Invalid phone number format",
+                    )
+                contact_data = ContactCreate(name=name, phone=formatted_number)
+                created_contact = await get_contact_service().create_contact(
+                    db, contact_data
+                )
                 return GetContactResponse(
-                    success=False,
-                    message="Invalid phone number format",
+                    success=True,
+                    contact=created_contact,
                 )
-            existing_contact = get_contact_service().get_contact_by_phone(
-                db, phone=formatted_number
-            )
-            if existing_contact:
+            except ContactAlreadyExistsError as e:
                 return GetContactResponse(
                     success=False,
                     message="Contact with this phone number already exists",
-                    contact=existing_contact,
+                    contact=e.existing,
+                )
+            except Exception as e:
+                return GetContactResponse(
+                    success=False,
+                    message=str(e),
                 )
-            contact_data = ContactCreate(name=name, phone=formatted_number)
-            created_contact = get_contact_service().create_contact(db, contact_data)
-            return GetContactResponse(
-                success=True,
-                contact=created_contact,
-            )
-        except Exception as e:
-            return GetContactResponse(
-                success=False,
-                message=str(e),
-            )
-        finally:
-            db.close()
 
     @mcp.tool(
         annotations={
@@ -160,7 +289,7 @@ def register_contact_tools(mcp: FastMCP):
         },
         tags=["contacts"],
     )
-    def update_contact(
+    async def update_contact(
         contact_id: Annotated[int, "The ID of the contact to update"],
         name: Annotated[str, "The new name of the contact"],
         phone: Annotated[
@@ -169,50 +298,36 @@ def register_contact_tools(mcp: FastMCP):
         ],
     ) -> GetContactResponse:
         """Update an existing contact's information"""
-        db = next(get_db())
-        try:
-            # Check if contact exists
-            existing_contact = get_contact_service().get_contact_by_id(
-                db, contact_id=contact_id
-            )
-            if not existing_contact:
+        async with AsyncSessionLocal() as db:
+            try:
+                contact_data = ContactUpdate(name=name, phone=phone)
+                updated_contact = await get_contact_service().update_contact_by_id(
+                    db, contact_id=contact_id, contact=contact_data
+                )
+                if not updated_contact:
+                    return GetContactResponse(
+                        success=False,
+                        message="Contact not found",
+                    )
                 return GetContactResponse(
-                    success=False,
-                    message="Contact not found",
+                    success=True,
+                    contact=updated_contact,
                 )
-            contact_with_phone = get_contact_service().get_contact_by_phone(
-                db, phone=phone
-            )
-            if contact_with_phone and contact_with_phone.id != contact_id:
+            except PhoneAlreadyRegisteredError:
                 return GetContactResponse(
                     success=False,
                     message="Phone number already registered to another contact",
                 )
-            contact_data = ContactUpdate(name=name, phone=phone)
-            updated_contact = get_contact_service().update_contact_by_id(
-                db, contact_id=contact_id, contact=contact_data
-            )
-            if not updated_contact:
+            except ValueError as e:
                 return GetContactResponse(
                     success=False,
-                    message=Response.CONTACT_UPDATE_FAILED,
+                    message=str(e),
+                )
+            except Exception:
+                return GetContactResponse(
+                    success=False,
+                    message=Response.CONTACT_UPDATE_FAILED.value,
                 )
-            return GetContactResponse(
-                success=True,
-                contact=updated_contact,
-            )
-        except ValueError as e:
-            return GetContactResponse(
-                success=False,
-                message=str(e),
-            )
-        except Exception:
-            return GetContactResponse(
-                success=False,
-                message=Response.CONTACT_UPDATE_FAILED,
-            )
-        finally:
-            db.close()
 
     @mcp.tool(
         annotations={
@@ -221,78 +336,351 @@ def register_contact_tools(mcp: FastMCP):
         },
         tags=["contacts"],
     )
-    def delete_contact(
+    async def delete_contact(
         contact_id: Annotated[int, "The ID of the contact to delete"],
     ) -> McpResponse:
         """Delete a contact by their ID"""
-        db = next(get_db())
-        try:
-            success = get_contact_service().delete_contact(db, contact_id=contact_id)
-            if not success:
+        async with AsyncSessionLocal() as db:
+            try:
+                success = await get_contact_service().delete_contact(
+                    db, contact_id=contact_id
+                )
+                if not success:
+                    return McpResponse(
+                        success=False,
+                        message=Response.CONTACT_NOT_FOUND.value,
+                    )
+                return McpResponse(
+                    success=True,
+                    message=Response.CONTACT_DELETED.value,
+                )
+            except Exception:
                 return McpResponse(
                     success=False,
-                    message=Response.CONTACT_NOT_FOUND,
+                    message=Response.CONTACT_DELETION_FAILED.value,
                 )
-            return McpResponse(
-                success=True,
-                message=Response.CONTACT_DELETED,
-            )
-        except Exception:
-            return McpResponse(
-                success=False,
-                message=Response.CONTACT_DELETION_FAILED,
-            )
-        finally:
-            db.close()
 
     @mcp.tool(
         annotations={
             "title": "Search Contacts",
             "description": "Search contacts by name or phone number",
+            "readOnlyHint": True,
         },
         tags=["contacts"],
     )
-    def search_contacts(
+    async def search_contacts(
         query: Annotated[str, "The search query (name or phone number)"],
+        skip: Annotated[int, Field(ge=0, description="Number of matches to skip")] = 0,
+        limit: Annotated[int, Field(ge=1, le=100)] = TOOL_PAGE_SIZE,
+        fields: Fields = None,
+        encoding: Encoding = "table",
     ) -> GetContactsResponse:
-        """Search contacts by name or phone number"""
-        db = next(get_db())
-        try:
-            contacts = get_contact_service().search_contacts(db, query=query)
-            return GetContactsResponse(
-                success=True,
-                message="Contacts retrieved successfully",
-                contacts=contacts,
-            )
-        except Exception:
-            return GetContactsResponse(
-                success=False,
-                message=Response.CONTACT_RETRIEVAL_FAILED,
-            )
-        finally:
-            db.close()
+        """Search contacts by name or phone number, best matches first"""
+        async with AsyncSessionLocal() as db:
+            try:
+                # One extra match tells us whether there are more
+                contacts = await get_contact_service().search_contacts(
+                    db, query=query, skip=skip, limit=limit + 1
+                )
+                projected, kept = _project(contacts[:limit], fields, encoding)
+                more = kept < len(contacts)
+                return GetContactsResponse(
+                    success=True,
+                    message=f"{kept} matches" + (", more available" if more else ""),
+                    next_skip=skip + kept if more else None,
+                    **projected,
+                )
+            except Exception:
+                return GetContactsResponse(
+                    success=False,
+                    message=Response.CONTACT_RETRIEVAL_FAILED.value,
+                )
+
+    @mcp.tool(
+        annotations={
+            "title": "Count Contacts",
+            "description": "Count all contacts, or the matches of a search query",
+            "readOnlyHint": True,
+        },
+        tags=["contacts"],
+    )
+    async def count_contacts(
+        query: Annotated[
+            str | None,
+            "Count the contacts this search finds; omit to count all contacts",
+        ] = None,
+    ) -> CountContactsResponse:
+        """Count contacts without listing them"""
+        async with AsyncSessionLocal() as db:
+            try:
+                stats = await get_contact_service().get_stats(db, query=query)
+                return CountContactsResponse(
+                    success=True, total=stats.total, matches=stats.matches
+                )
+            except Exception:
+                return CountContactsResponse(
+                    success=False,
+                    message=Response.CONTACT_RETRIEVAL_FAILED.value,
+                )
+
+    @mcp.tool(
+        annotations={
+            "title": "Get Contacts by IDs",
+            "description": "Retrieve several contacts by their IDs in one call",
+            "readOnlyHint": True,
+        },
+        tags=["contacts"],
+    )
+    async def get_contacts_by_ids(
+        contact_ids: Annotated[list[int], Field(max_length=MAX_TOOL_BATCH)],
+        fields: Fields = None,
+        encoding: Encoding = "table",
+    ) -> GetContactsResponse:
+        """Get several contacts by their IDs"""
+        async with AsyncSessionLocal() as db:
+            try:
+                contacts = await get_contact_service().get_contacts_by_ids(
+                    db, contact_ids
+                )
+                found = {contact.id for contact in contacts}
+                missing = [i for i in contact_ids if i not in found]
+                projected, kept = _project(contacts, fields, encoding)
+                problems = []
+                if missing:
+                    problems.append(f"Contacts not found: {missing}")
+                if kept < len(contacts):
+                    omitted = [contact.id for contact in contacts[kept:]]
+                    problems.append(f"Too large to return, ask again for: {omitted}")
+                return GetContactsResponse(
+                    success=not missing,
+                    message="; ".join(problems) or None,
+                    **projected,
+                )
+            except Exception:
+                return GetContactsResponse(
+                    success=False,
+                    message=Response.CONTACT_RETRIEVAL_FAILED.value,
+                )
+
+    @mcp.tool(
+        annotations={
+            "title": "Create Contacts",
+            "description": "Create several contacts in one call",
+        },
+        tags=["contacts"],
+    )
+    async def create_contacts(
+        contacts: Annotated[list[NewContact], Field(max_length=MAX_TOOL_BATCH)],
+    ) -> BatchResponse:
+        """Create several contacts at once, with a result for each one"""
+        async with AsyncSessionLocal() as db:
+            try:
+                valid, invalid = _validate_batch(contacts, ContactCreate)
+                result = await get_contact_service().batch(
+                    db, creates=[contact for _, contact in valid]
+                )
+                return _batch_response("created", result.created, valid, invalid)
+            except Exception as e:
+                return BatchResponse(success=False, message=str(e))
+
+    @mcp.tool(
+        annotations={
+            "title": "Update Contacts",
+            "description": "Update several existing contacts in one call",
+        },
+        tags=["contacts"],
+    )
+    async def update_contacts(
+        contacts: Annotated[list[ContactChange], Field(max_length=MAX_TOOL_BATCH)],
+    ) -> BatchResponse:
+        """Update several contacts at once, with a result for each one"""
+        async with AsyncSessionLocal() as db:
+            try:
+                valid, invalid = _validate_batch(contacts, ContactUpdate)
+                result = await get_contact_service().batch(
+                    db,
+                    updates=[(contacts[index].id, update) for index, update in valid],
+                )
+                return _batch_response("updated", result.updated, valid, invalid)
+            except Exception as e:
+                return BatchResponse(success=False, message=str(e))
+
+    @mcp.tool(
+        annotations={
+            "title": "Delete Contacts",
+            "description": "Delete several contacts by their IDs in one call",
+        },
+        tags=["contacts"],
+    )
+    async def delete_contacts(
+        contact_ids: Annotated[list[int], Field(max_length=MAX_TOOL_BATCH)],
+    ) -> BatchResponse:
+        """Delete several contacts at once, with a result for each one"""
+        async with AsyncSessionLocal() as db:
+            try:
+                result = await get_contact_service().batch(db, deletes=contact_ids)
+                return _batch_response("deleted", result.deleted)
+            except Exception:
+                return BatchResponse(
+                    success=False,
+                    message=Response.CONTACT_DELETION_FAILED.value,
+                )
+
+    # Not read-only as far as result caching goes: it may start a scan, and
+    # its answer changes as the scan runs
+    @mcp.tool(
+        annotations={
+            "title": "Find Duplicate Contacts",
+            "description": "List clusters of contacts that look like the same person",
+        },
+        tags=["contacts"],
+    )
+    async def find_duplicate_contacts(
+        skip: Annotated[
+            int, Field(ge=0, description="next_skip of the previous call")
+        ] = 0,
+        limit: Annotated[int, Field(ge=1, le=50)] = 10,
+    ) -> DuplicatesResponse:
+        """
+        Find likely duplicate contacts, scanning the contact book first if it
+        changed since the last scan
+        """
+        dedupe = get_dedupe_service()
+        async with AsyncSessionLocal() as db:
+            try:
+                scan = await dedupe.status(db)
+                if scan.status != "done" or scan.changes_since:
+                    await dedupe.start_scan()
+                    await dedupe.wait(DEDUPE_TOOL_WAIT_SECONDS)
+                    scan = await dedupe.status(db)
+                    if scan.status == "running":
+                        return DuplicatesResponse(
+                            success=False,
+                            message=f"The duplicate scan is still running "
+                            f"({scan.scanned} contacts read) as job "
+                            f"{scan.job_id}, ask again shortly",
+                            scan=scan,
+                        )
+                    if scan.status != "done":
+                        return DuplicatesResponse(
+                            success=False, message=scan.error, scan=scan
+                        )
+
+                clusters, next_skip = await dedupe.get_clusters(db, skip, limit)
+                columns = list(ContactField.__args__)
+                kept, size = [], 0
+                for cluster in clusters:
+                    item = {
+                        "score": round(cluster.score, 2),
+                        "rows": [
+                            [getattr(contact, column) for column in columns]
+                            for contact in cluster.contacts
+                        ],
+                    }
+                    size += len(json.dumps(item, ensure_ascii=False).encode()) + 1
+                    if kept and size > TOOL_RESULT_MAX_BYTES:
+                        next_skip = cluster.index
+                        break
+                    kept.append(item)
+                return DuplicatesResponse(
+                    success=True,
+                    scan=scan,
+                    columns=columns,
+                    clusters=kept,
+                    next_skip=next_skip,
+                )
+            except JobQueueFullError:
+                return DuplicatesResponse(
+                    success=False, message=Response.JOB_QUEUE_FULL.value
+                )
+            except Exception:
+                return DuplicatesResponse(
+                    success=False,
+                    message=Response.CONTACT_RETRIEVAL_FAILED.value,
+                )
+
+    @mcp.tool(
+        annotations={
+            "title": "Merge Contacts",
+            "description": "Merge duplicate contacts into one, deleting the others",
+        },
+        tags=["contacts"],
+    )
+    async def merge_contacts(
+        keep_id: Annotated[int, "The ID of the contact to keep"],
+        merge_ids: Annotated[
+            list[int],
+            Field(
+                min_length=1,
+                max_length=MAX_TOOL_BATCH,
+                description="IDs of the duplicates to merge into it; they are deleted",
+            ),
+        ],
+        name: Annotated[
+            str | None, "New name for the kept contact; omit to keep its own"
+        ] = None,
+        phone: Annotated[
+            str | None,
+            "New phone number for the kept contact, such as a merged "
+            "contact's; omit to keep its own",
+        ] = None,
+    ) -> GetContactResponse:
+        """Merge duplicates into one contact at once; nothing changes if any is missing"""
+        async with AsyncSessionLocal() as db:
+            try:
+                if phone is not None:
+                    phone = format_phone_number(phone)
+                    if not phone:
+                        return GetContactResponse(
+                            success=False,
+                            message=Response.INVALID_PHONE_NUMBER.value,
+                        )
+                if name is not None and not 1 <= len(name) <= MAX_NAME_LENGTH:
+                    return GetContactResponse(
+                        success=False, message=Response.INVALID_NAME.value
+                    )
+                contact = await get_contact_service().merge_contacts(
+                    db, keep_id, merge_ids, name=name, phone=phone
+                )
+                if contact is None:
+                    return GetContactResponse(
+                        success=False,
+                        message=Response.CONTACT_NOT_FOUND.value,
+                    )
+                return GetContactResponse(success=True, contact=contact)
+            except PhoneAlreadyRegisteredError:
+                return GetContactResponse(
+                    success=False,
+                    message=Response.PHONE_ALREADY_REGISTERED.value,
+                )
+            except Exception:
+                return GetContactResponse(
+                    success=False,
+                    message=Response.CONTACT_UPDATE_FAILED.value,
+                )
 
     @mcp.tool(
         annotations={
             "title": "Format Phone Number",
             "description": "Format a phone number to E.164 standard",
+            "readOnlyHint": True,
         },
         tags=["contacts"],
     )
     def format_phone_number_tool(
         phone: str, default_region: str = "PL"
-    ) -> GetContactResponse:
+    ) -> FormatPhoneResponse:
         """
         Format phone number to E.164.
         Returns None if invalid or cannot be parsed.
         """
         formatted = format_phone_number(phone, default_region)
         if not formatted:
-            return GetContactResponse(
+            return FormatPhoneResponse(
                 success=False,
-                message=Response.INVALID_PHONE_NUMBER,
+                message=Response.INVALID_PHONE_NUMBER.value,
             )
-        return GetContactResponse(
+        return FormatPhoneResponse(
             success=True,
-            contact=formatted,
+            phone=formatted,
         )
@@ -0,0 +1,57 @@
+from typing import Annotated
+
+from fastmcp import FastMCP
+from src.api.responses import Response
+from src.mcp.tools.schema import JobResponse
+from src.services.contact_jobs import get_contact_jobs
+from src.services.job_service import JobQueueFullError, get_job_service
+from src.utils.contact_formats import ContactFormat
+
+
+def register_job_tools(mcp: FastMCP):
+    # Not readOnly: the chat service would cache the answer, and a job's
+    # status changes while the contact book does not
+    @mcp.tool(
+        annotations={
+            "title": "Get Job Status",
+            "description": "Check the status, progress and result of a background job",
+        },
+        tags=["jobs"],
+    )
+    async def get_job_status(
+        job_id: Annotated[str, "The job ID returned when the job was started"],
+    ) -> JobResponse:
+        """Get a background job's status, progress and result"""
+        try:
+            job = await get_job_service().get(job_id)
+            if job is None:
+                return JobResponse(success=False, message=Response.JOB_NOT_FOUND.value)
+            return JobResponse(success=True, job=job)
+        except Exception:
+            return JobResponse(
+                success=False, message=Response.CONTACT_RETRIEVAL_FAILED.value
+            )
+
+    @mcp.tool(
+        annotations={
+            "title": "Export Contacts",
+            "description": "Start exporting all contacts to a file the user can download",
+        },
+        tags=["jobs", "contacts"],
+    )
+    async def export_contacts(
+        format: Annotated[ContactFormat, "File format: csv, ndjson or vcf"] = "csv",
+    ) -> JobResponse:
+        """
+        Start exporting the contact book in the background. Returns the job;
+        once it succeeds, its result has the download link
+        """
+        try:
+            job = await get_contact_jobs().start_export(format)
+            return JobResponse(success=True, job=job)
+        except JobQueueFullError:
+            return JobResponse(success=False, message=Response.JOB_QUEUE_FULL.value)
+        except Exception:
+            return JobResponse(
+                success=False, message=Response.CONTACT_RETRIEVAL_FAILED.value
+            )
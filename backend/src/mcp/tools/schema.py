@@ -1,5 +1,7 @@
+from typing import Any, Literal
+
 from pydantic import BaseModel
-from src.db.schemas import Contact
+from src.db.schemas import BatchItemResult, Contact, DuplicateScan, Job
 
 
 class McpResponse(BaseModel):
@@ -11,9 +13,54 @@ class ContactResponse(Contact):
     pass
 
 
+ContactField = Literal["id", "name", "phone"]
+
+
 class GetContactsResponse(McpResponse):
-    contacts: list[Contact] | None = None
+    # One object per contact, with the requested fields
+    contacts: list[dict[str, Any]] | None = None
+    # The same in table form: field names once, then one row per contact
+    columns: list[ContactField] | None = None
+    rows: list[list[Any]] | None = None
+    # Set when more results are available: pass back as after / skip
+    next_cursor: str | None = None
+    next_skip: int | None = None
 
 
 class GetContactResponse(McpResponse):
     contact: Contact | None = None
+
+
+class CountContactsResponse(McpResponse):
+    total: int | None = None
+    matches: int | None = None
+
+
+class FormatPhoneResponse(McpResponse):
+    phone: str | None = None
+
+
+class NewContact(BaseModel):
+    name: str
+    phone: str
+
+
+class ContactChange(NewContact):
+    id: int
+
+
+class BatchResponse(McpResponse):
+    results: list[BatchItemResult] = []
+
+
+class DuplicatesResponse(McpResponse):
+    scan: DuplicateScan | None = None
+    columns: list[ContactField] | None = None
+    # Per cluster: its score and one row per contact in it
+    clusters: list[dict[str, Any]] | None = None
+    # Set when more clusters are available: pass back as skip
+    next_skip: int | None = None
+
+
+class JobResponse(McpResponse):
+    job: Job | None = None
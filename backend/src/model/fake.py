@@ -0,0 +1,104 @@
+import asyncio
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Iterable
+
+from google.genai import types
+
+# A scripted model turn: each item is streamed as one chunk. Strings become
+# text, dicts ({"name": ..., "args": {...}}) become function calls. A turn
+# that is an exception is raised instead, to simulate a failing request.
+Turn = Iterable[str | dict] | Exception
+
+
+def _chunk(item: str | dict) -> types.GenerateContentResponse:
+    if isinstance(item, str):
+        part = types.Part(text=item)
+    else:
+        part = types.Part(
+            function_call=types.FunctionCall(
+                name=item["name"], args=item.get("args", {})
+            )
+        )
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))]
+    )
+
+
+def _last_user_text(contents: Any) -> str:
+    if isinstance(contents, str):
+        return contents
+    for content in reversed(list(contents)):
+        if content.role == "user":
+            return "".join(part.text or "" for part in content.parts or [])
+    return ""
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeGenaiClient"):
+        self._client = client
+
+    def _next_turn(self, contents: Any, config: Any) -> list:
+        self._client.requests.append({"contents": contents, "config": config})
+        if self._client.turns:
+            turn = self._client.turns.pop(0)
+            if isinstance(turn, Exception):
+                raise turn
+            return list(turn)
+        # Unscripted requests echo the last user message
+        return [_last_user_text(contents)]
+
+    async def generate_content_stream(
+        self, *, model: str, contents: Any, config: Any = None
+    ) -> AsyncIterator[types.GenerateContentResponse]:
+        turn = self._next_turn(contents, config)
+
+        async def stream():
+            with self._client.track():
+                for item in turn:
+                    if self._client.delay:
+                        await asyncio.sleep(self._client.delay)
+                    yield _chunk(item)
+
+        return stream()
+
+    async def generate_content(
+        self, *, model: str, contents: Any, config: Any = None
+    ) -> types.GenerateContentResponse:
+        turn = self._next_turn(contents, config)
+        with self._client.track():
+            if self._client.delay:
+                await asyncio.sleep(self._client.delay * len(turn))
+        parts = [
+            part for item in turn for part in _chunk(item).candidates[0].content.parts
+        ]
+        return types.GenerateContentResponse(
+            candidates=[
+                types.Candidate(content=types.Content(role="model", parts=parts))
+            ]
+        )
+
+
+class FakeGenaiClient:
+    """
+    Stand-in for genai.Client that replays scripted turns without calling
+    the API. Every request is recorded in `requests`, and `max_in_flight`
+    is the most requests that were ever being answered at once.
+    """
+
+    def __init__(self, turns: Iterable[Turn] | None = None, delay: float = 0.0):
+        self.turns = list(turns or [])
+        self.delay = delay
+        self.requests: list[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.aio = SimpleNamespace(models=_FakeModels(self))
+
+    @contextmanager
+    def track(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
@@ -1,16 +1,43 @@
 import os
-from google import genai
-from google.genai import types
+from typing import TYPE_CHECKING, Optional
+
 from src.config.config import model_config
 
+if TYPE_CHECKING:
+    from google import genai
+    from google.genai import types
 
 API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
 
-if not API_KEY:
-    raise RuntimeError("Missing GEMINI_API_KEY/GOOGLE_API_KEY environment variable")
+_google_client: Optional["genai.Client"] = None
+_default_config: Optional["types.GenerateContentConfig"] = None
+
+
+def get_google_client() -> "genai.Client":
+    """
+    Get the Gemini client, created on first use. The SDK takes about a
+    second to import, so only processes that talk to the model pay for it,
+    and a missing key fails the first chat request instead of the startup.
+    """
+    global _google_client
+    if _google_client is None:
+        if not API_KEY:
+            raise RuntimeError(
+                "Missing GEMINI_API_KEY/GOOGLE_API_KEY environment variable"
+            )
+        from google import genai
+
+        _google_client = genai.Client(api_key=API_KEY)
+    return _google_client
+
 
-google_client = genai.Client(
-    api_key=API_KEY,
-)
+def get_default_config() -> "types.GenerateContentConfig":
+    """Get the generation config of requests without tools."""
+    global _default_config
+    if _default_config is None:
+        from google.genai import types
 
-default_config = types.GenerateContentConfig(**model_config.model_client.model_dump())
+        _default_config = types.GenerateContentConfig(
+            system_instruction=model_config.system_instruction
+        )
+    return _default_config
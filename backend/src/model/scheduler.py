@@ -0,0 +1,231 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+
+from src.services.cache import Cache, get_cache, is_shared
+from src.services.metrics import LLM_SCHEDULER_EVENTS, LLM_SLOTS
+
+T = TypeVar("T")
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Seconds a request may wait for a slot before it is turned away
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+# Longest a model call may hold a slot shared with other processes; the
+# slots of a process that died free up after this
+LLM_SLOT_LEASE_SECONDS = float(os.getenv("LLM_SLOT_LEASE_SECONDS", "300"))
+# How often a process waiting for a shared slot asks again
+SHARED_SLOT_POLL_SECONDS = 0.05
+SHARED_SLOTS_KEY = "llm:slots"
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class SchedulerOverloadedError(Exception):
+    """No model slot can be had within the request's deadline."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Model is busy, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying."""
+    # Only raised once the SDK is loaded, so this import is free by then
+    from google.genai import errors
+
+    if isinstance(exc, errors.APIError):
+        return exc.code in RETRYABLE_STATUS
+    return isinstance(exc, (httpx.TransportError, TimeoutError))
+
+
+class LlmScheduler:
+    """
+    Admission control for model calls: at most `max_concurrency` run at
+    once, the rest wait in FIFO order. A request whose expected wait
+    exceeds its deadline is rejected up front instead of queueing.
+
+    Given a cache other processes share, a call also takes one of
+    `max_concurrency` leases in it, so the cap holds across all workers.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_delay: float = LLM_RETRY_MAX_DELAY,
+        shared: Optional[Cache] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._shared = shared
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        # Moving average of how long a call holds its slot, for wait estimates
+        self._service_time = 1.0
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait(self) -> float:
+        """Seconds a request made now would likely wait for a slot."""
+        if self.active < self.max_concurrency and not self._waiters:
+            return 0.0
+        return (len(self._waiters) + 1) / self.max_concurrency * self._service_time
+
+    def check_admission(self, timeout: Optional[float] = None) -> None:
+        """Raise SchedulerOverloadedError if a slot is not expected in time."""
+        wait = self.estimated_wait()
+        if wait > (self.queue_timeout if timeout is None else timeout):
+            LLM_SCHEDULER_EVENTS.labels("rejected").inc()
+            raise SchedulerOverloadedError(wait)
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        """Hold one of the concurrency slots for the duration of the block."""
+        timeout = self.queue_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        await self._acquire(timeout)
+        lease = None
+        try:
+            if self._shared is not None:
+                lease = await self._acquire_shared(deadline)
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                self._service_time += 0.2 * (
+                    time.monotonic() - started - self._service_time
+                )
+        finally:
+            try:
+                if lease is not None:
+                    await self._shared.release(SHARED_SLOTS_KEY, lease)
+            finally:
+                self._release()
+
+    async def _acquire(self, timeout: float) -> None:
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            LLM_SLOTS.labels("active").set(self.active)
+            return
+
+        self.check_admission(timeout)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        LLM_SLOTS.labels("queued").set(len(self._waiters))
+        try:
+            async with asyncio.timeout(timeout):
+                await waiter
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we gave up; pass it on
+                self._release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                LLM_SLOTS.labels("queued").set(len(self._waiters))
+            if isinstance(exc, TimeoutError):
+                LLM_SCHEDULER_EVENTS.labels("timed_out").inc()
+                raise SchedulerOverloadedError(
+                    max(self.estimated_wait(), self._service_time)
+                ) from None
+            raise
+
+    async def _acquire_shared(self, deadline: float) -> str:
+        # Other processes cannot wake this one, so it asks until the deadline
+        while True:
+            lease = await self._shared.acquire(
+                SHARED_SLOTS_KEY, self.max_concurrency, LLM_SLOT_LEASE_SECONDS
+            )
+            if lease is not None:
+                return lease
+            if time.monotonic() + SHARED_SLOT_POLL_SECONDS > deadline:
+                LLM_SCHEDULER_EVENTS.labels("timed_out").inc()
+                raise SchedulerOverloadedError(self._service_time)
+            await asyncio.sleep(SHARED_SLOT_POLL_SECONDS)
+
+    def _release(self) -> None:
+        # The slot goes straight to the oldest waiter, so newcomers can't
+        # overtake the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            LLM_SLOTS.labels("queued").set(len(self._waiters))
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        LLM_SLOTS.labels("active").set(self.active)
+
+    async def retrying(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Await `call()`, retrying transient failures with jittered backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await call()
+            except Exception as exc:
+                if attempt == self.max_retries or not is_retryable(exc):
+                    raise
+                LLM_SCHEDULER_EVENTS.labels("retried").inc()
+                # Full jitter keeps clients that failed together from
+                # retrying together
+                ceiling = min(self.max_delay, self.base_delay * 2**attempt)
+                await asyncio.sleep(random.uniform(0, ceiling))
+        raise AssertionError("unreachable")
+
+    async def run(
+        self, call: Callable[[], Awaitable[T]], timeout: Optional[float] = None
+    ) -> T:
+        """Await `call()` within a slot, with retries."""
+        async with self.slot(timeout):
+            return await self.retrying(call)
+
+    async def coalesce(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Single flight: concurrent callers with the same key share one
+        `call()` and all get its result (or exception).
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            LLM_SCHEDULER_EVENTS.labels("coalesced").inc()
+        # A caller that disconnects must not cancel the others' result
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved even if every caller went away
+
+
+_scheduler: Optional[LlmScheduler] = None
+
+
+def get_llm_scheduler() -> LlmScheduler:
+    """
+    Get the scheduler shared by all chat requests in this process, and
+    through a shared cache, by the other workers.
+    """
+    global _scheduler
+    if _scheduler is None:
+        cache = get_cache()
+        _scheduler = LlmScheduler(shared=cache if is_shared(cache) else None)
+    return _scheduler
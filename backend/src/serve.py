@@ -0,0 +1,46 @@
+# python -m src.serve: the app under uvicorn, in WEB_CONCURRENCY workers
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+
+
+def worker_count() -> int:
+    """WEB_CONCURRENCY, or one worker per CPU this process may run on."""
+    return int(os.getenv("WEB_CONCURRENCY") or os.process_cpu_count() or 1)
+
+
+def share_state(workers: int) -> None:
+    """
+    Point the workers at the state they have to share. Set in the
+    environment, since the workers are new interpreters that inherit it.
+    """
+    if workers == 1:
+        return
+    if os.getenv("JOB_STORE") == "memory":
+        raise SystemExit("JOB_STORE=memory cannot be shared by several workers")
+    state_dir = tempfile.mkdtemp(prefix="contacts-workers-")
+    # Without Redis, the cache is a SQLite file on this host
+    if not os.getenv("REDIS_URL"):
+        os.environ.setdefault("CACHE_PATH", os.path.join(state_dir, "cache.db"))
+    metrics_dir = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR", os.path.join(state_dir, "metrics")
+    )
+    # Files left by an earlier run would be added to this one's metrics
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+    os.environ.setdefault("MCP_STATELESS_HTTP", "true")
+
+
+def main() -> None:
+    workers = worker_count()
+    share_state(workers)
+    uvicorn.run("src.main:app", host=HOST, port=PORT, workers=workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional, Protocol
+
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+# A SQLite file shared by the worker processes of one host, used when
+# there is no REDIS_URL; `python -m src.serve` sets it for several workers
+CACHE_PATH = os.getenv("CACHE_PATH")
+# Writes between sweeps of expired entries from the CACHE_PATH file
+SQLITE_PRUNE_EVERY = 1000
+
+
+class Cache(Protocol):
+    """Key/value cache for JSON-serializable values."""
+
+    async def get(self, key: str) -> Optional[Any]: ...
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None: ...
+
+    async def delete(self, *keys: str) -> None: ...
+
+    async def incr(self, key: str) -> int:
+        """Atomically increment a counter, starting from 0."""
+        ...
+
+    async def counter(self, key: str) -> int:
+        """Current value of a counter; not counted as a hit or miss."""
+        ...
+
+    async def acquire(self, key: str, limit: int, ttl: float) -> Optional[str]:
+        """
+        Take one of `limit` leases on `key` for up to `ttl` seconds. Returns
+        the lease, or None if all are held. Leases a process never released
+        expire after `ttl`, so a crashed process cannot keep them.
+        """
+        ...
+
+    async def release(self, key: str, lease: str) -> None: ...
+
+    def stats(self) -> dict: ...
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        # Counters are kept apart so LRU eviction can never reset them
+        self._counters: dict[str, int] = {}
+        self._leases: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + (ttl or self._ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    async def counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    async def acquire(self, key: str, limit: int, ttl: float) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            leases = self._leases.setdefault(key, {})
+            for lease, expires_at in list(leases.items()):
+                if expires_at < now:
+                    del leases[lease]
+            if len(leases) >= limit:
+                return None
+            lease = uuid.uuid4().hex
+            leases[lease] = now + ttl
+            return lease
+
+    async def release(self, key: str, lease: str) -> None:
+        with self._lock:
+            self._leases.get(key, {}).pop(lease, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+# Leases are a sorted set of lease ids scored by when they expire
+ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+redis.call('PEXPIRE', KEYS[1], ARGV[5])
+return 1
+"""
+
+
+class RedisCache:
+    """Cache backed by the shared Redis instance (the `cache` compose service)."""
+
+    def __init__(self, url: str, ttl: int = CACHE_TTL):
+        from redis.asyncio import Redis
+
+        self._redis = Redis.from_url(url)
+        self._ttl = ttl
+        self._acquire = self._redis.register_script(ACQUIRE_SCRIPT)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._redis.get(key)
+        self._count(raw is not None)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        await self._redis.set(key, json.dumps(value, default=str), ex=ttl or self._ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        await self.counter(key)
+        return await self._redis.incr(key)
+
+    async def counter(self, key: str) -> int:
+        value = await self._redis.get(key)
+        if value is None:
+            # The server evicts with allkeys-lru. Seeding a lost counter from the
+            # clock keeps it from restarting at a value old entries were keyed on.
+            await self._redis.set(key, time.time_ns(), nx=True)
+            value = await self._redis.get(key)
+        return int(value)
+
+    async def acquire(self, key: str, limit: int, ttl: float) -> Optional[str]:
+        now = time.time()
+        lease = uuid.uuid4().hex
+        taken = await self._acquire(
+            keys=[key], args=[now, limit, now + ttl, lease, int(ttl * 1000)]
+        )
+        return lease if taken else None
+
+    async def release(self, key: str, lease: str) -> None:
+        await self._redis.zrem(key, lease)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+
+class SqliteCache:
+    """
+    Cache in a SQLite file, shared by the processes of one host: the
+    stand-in for Redis when several workers serve without one. Statements
+    run in a thread, since one can wait up to the busy timeout for another
+    process's write lock.
+    """
+
+    def __init__(
+        self, path: str, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL
+    ):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._conn = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        # Losing the cache in a crash is fine; waiting on fsync is not
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters "
+            "(key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (key TEXT NOT NULL, "
+            "lease TEXT PRIMARY KEY, expires REAL NOT NULL)"
+        )
+        # One statement at a time on the shared connection
+        self._lock = threading.Lock()
+        self._writes = 0
+        # Counted on the event loop, so stats() never waits on the lock
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        row = await asyncio.to_thread(self._get, key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def _get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires >= ?",
+                (key, time.time()),
+            ).fetchone()
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        raw = json.dumps(value, default=str)
+        await asyncio.to_thread(self._set, key, raw, ttl or self._ttl)
+
+    def _set(self, key: str, raw: str, ttl: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                (key, raw, time.time() + ttl),
+            )
+            self._writes += 1
+            if self._writes % SQLITE_PRUNE_EVERY == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        self._conn.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+        # Then the entries closest to expiring, past max_entries
+        self._conn.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries "
+            "ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self._max_entries,),
+        )
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await asyncio.to_thread(self._delete, keys)
+
+    def _delete(self, keys: tuple[str, ...]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM entries WHERE key = ?", [(key,) for key in keys]
+            )
+
+    async def incr(self, key: str) -> int:
+        return await asyncio.to_thread(self._incr, key)
+
+    def _incr(self, key: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "INSERT INTO counters VALUES (?, 1) ON CONFLICT (key) "
+                "DO UPDATE SET value = value + 1 RETURNING value",
+                (key,),
+            ).fetchone()[0]
+
+    async def counter(self, key: str) -> int:
+        return await asyncio.to_thread(self._counter, key)
+
+    def _counter(self, key: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM counters WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    async def acquire(self, key: str, limit: int, ttl: float) -> Optional[str]:
+        return await asyncio.to_thread(self._acquire, key, limit, ttl)
+
+    def _acquire(self, key: str, limit: int, ttl: float) -> Optional[str]:
+        lease = uuid.uuid4().hex
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so no other process
+            # can count the same free lease
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                self._conn.execute(
+                    "DELETE FROM leases WHERE key = ? AND expires < ?", (key, now)
+                )
+                (held,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM leases WHERE key = ?", (key,)
+                ).fetchone()
+                if held < limit:
+                    self._conn.execute(
+                        "INSERT INTO leases VALUES (?, ?, ?)", (key, lease, now + ttl)
+                    )
+            finally:
+                self._conn.execute("COMMIT")
+        return lease if held < limit else None
+
+    async def release(self, key: str, lease: str) -> None:
+        await asyncio.to_thread(self._release, lease)
+
+    def _release(self, lease: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE lease = ?", (lease,))
+
+    def stats(self) -> dict:
+        return {"backend": "sqlite", "hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[Cache] = None
+
+
+def create_cache(
+    url: Optional[str] = REDIS_URL, path: Optional[str] = CACHE_PATH
+) -> Cache:
+    """
+    Create a Redis cache when REDIS_URL is set, a SQLite one when CACHE_PATH
+    is, otherwise an in-process one.
+    """
+    if url:
+        return RedisCache(url)
+    if path:
+        return SqliteCache(path)
+    return MemoryCache()
+
+
+def is_shared(cache: Cache) -> bool:
+    """Whether other processes see what is written to the cache."""
+    return not isinstance(cache, MemoryCache)
+
+
+def get_cache() -> Cache:
+    """Get the cache shared by the whole app."""
+    global _cache
+    if _cache is None:
+        _cache = create_cache()
+    return _cache
@@ -0,0 +1,89 @@
+import asyncio
+import os
+from typing import Optional
+
+from sqlalchemy import func, select
+
+from src.db.db import AsyncSessionLocal
+from src.db.models.Contact import ContactChangeModel
+
+# How often a process with change stream subscribers looks for changes made
+# by other processes; its own writes wake the subscribers right away
+CONTACT_CHANGES_POLL_SECONDS = float(os.getenv("CONTACT_CHANGES_POLL_SECONDS", "1"))
+# Longest a change stream stays silent; idle proxies would close it
+CONTACT_CHANGES_HEARTBEAT_SECONDS = float(
+    os.getenv("CONTACT_CHANGES_HEARTBEAT_SECONDS", "15")
+)
+
+
+class ChangeWatcher:
+    """
+    Tells change stream subscribers when the change log grows. One poller
+    per process reads the latest seq on behalf of all of them, and only
+    while someone is waiting, so an idle subscriber runs no queries.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = CONTACT_CHANGES_POLL_SECONDS,
+        session_factory=AsyncSessionLocal,
+    ):
+        self._poll_interval = poll_interval
+        self._session_factory = session_factory
+        self._head = 0
+        self._waiters = 0
+        self._changed = asyncio.Condition()
+        self._poke = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def poke(self) -> None:
+        """Look for changes now rather than at the next poll."""
+        self._poke.set()
+
+    async def wait(self, after: int, timeout: float) -> bool:
+        """
+        Wait up to `timeout` seconds for a change with a seq above `after`.
+        Returns whether one came.
+        """
+        self._waiters += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+        try:
+            async with self._changed:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self._head > after), timeout
+                )
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            self._waiters -= 1
+
+    async def _poll(self) -> None:
+        while self._waiters:
+            self._poke.clear()
+            try:
+                async with self._session_factory() as db:
+                    head = await db.scalar(select(func.max(ContactChangeModel.seq)))
+            except Exception:
+                # Try again at the next poll; subscribers only wait longer
+                head = None
+            if head is not None and head > self._head:
+                self._head = head
+                async with self._changed:
+                    self._changed.notify_all()
+            try:
+                await asyncio.wait_for(self._poke.wait(), self._poll_interval)
+            except TimeoutError:
+                pass
+
+
+_change_watcher: Optional[ChangeWatcher] = None
+
+
+def get_change_watcher() -> ChangeWatcher:
+    """Get the change watcher shared by the whole process."""
+    global _change_watcher
+    if _change_watcher is None:
+        _change_watcher = ChangeWatcher()
+    return _change_watcher
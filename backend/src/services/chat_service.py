@@ -1,43 +1,439 @@
-from src.model.gemini import google_client, default_config
-from google import genai
-from google.genai import types
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional
+
+from src.model.gemini import get_default_config, get_google_client
 from src.config.config import model_config
+from src.model.scheduler import LlmScheduler, get_llm_scheduler
+from src.services.cache import Cache, get_cache
+from src.services.contact_service import CONTACTS_VERSION_KEY
+from src.services.conversation_service import (
+    ConversationService,
+    History,
+    get_conversation_service,
+)
+from src.services.metrics import CHAT_TOOL_CACHE, record_llm_call
 from src.services.mpc_client import get_mcp_client
 
+if TYPE_CHECKING:
+    from google import genai
+    from google.genai import types
+
+# Same cap as the SDK's automatic function calling
+MAX_TOOL_ROUNDS = 10
+
+# Seconds a cached answer is served; 0 disables the response cache
+CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", "3600"))
+# Seconds a read-only tool result is reused within a conversation; 0 disables
+CHAT_TOOL_CACHE_TTL = int(os.getenv("CHAT_TOOL_CACHE_TTL", "300"))
+
+SUMMARY_INSTRUCTION = (
+    "Summarize this conversation between a user and a contact book assistant "
+    "for the assistant's own later reference, in at most {words} words. Keep "
+    "contact names, phone numbers and IDs, and what the user asked for or "
+    "decided; drop greetings and formatting."
+)
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase and collapse whitespace, so near-identical prompts share a key."""
+    return " ".join(text.lower().split())
+
+
+class ResponseCacheStats:
+    """Hit/miss counters of the chat response cache in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Answers not stored because contacts changed during the turn
+        self.stale = 0
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+response_cache_stats = ResponseCacheStats()
+
 
 class ChatService:
     def __init__(
         self,
-        genai_client: genai.Client | None = None,
+        genai_client: Optional["genai.Client"] = None,
         model: str = model_config.model_id,
+        cache: Optional[Cache] = None,
+        cache_ttl: int = CHAT_CACHE_TTL,
+        scheduler: Optional[LlmScheduler] = None,
+        conversations: Optional[ConversationService] = None,
+        tool_cache_ttl: int = CHAT_TOOL_CACHE_TTL,
     ):
-        self._client = genai_client or google_client
+        self._genai_client = genai_client
         self._model = model
-        self._config = default_config
         self._mcp_client = get_mcp_client()
+        self._cache = cache or get_cache()
+        self._cache_ttl = cache_ttl
+        self._scheduler = scheduler or get_llm_scheduler()
+        self._conversations = conversations or get_conversation_service()
+        self._tool_cache_ttl = tool_cache_ttl
+
+    @property
+    def _client(self) -> "genai.Client":
+        # Created on first use, so cached answers need no API key
+        if self._genai_client is None:
+            self._genai_client = get_google_client()
+        return self._genai_client
+
+    def check_admission(self) -> None:
+        """Raise SchedulerOverloadedError now if the model is too busy to answer."""
+        self._scheduler.check_admission()
+
+    async def _cache_key(self, user_input: str) -> tuple[str, int]:
+        """
+        Key of the cached answer to a prompt, and the contacts version it is
+        valid for. Any contact write bumps the version, retiring every answer.
+        """
+        version = await self._cache.counter(CONTACTS_VERSION_KEY)
+        digest = hashlib.sha256(
+            json.dumps(
+                [
+                    self._model,
+                    model_config.system_instruction,
+                    normalize_prompt(user_input),
+                ],
+                default=str,
+            ).encode()
+        ).hexdigest()
+        return f"chat:response:{version}:{digest}", version
+
+    async def _get_cached(self, user_input: str) -> tuple[Optional[str], str, int]:
+        key, version = await self._cache_key(user_input)
+        cached = await self._cache.get(key)
+        response_cache_stats.count("misses" if cached is None else "hits")
+        return cached, key, version
+
+    async def _set_cached(self, key: str, version: int, response: str) -> None:
+        # A turn that wrote contacts (or raced with a write) may describe a
+        # state that no longer exists; don't serve it again.
+        if await self._cache.counter(CONTACTS_VERSION_KEY) != version:
+            response_cache_stats.count("stale")
+            return
+        await self._cache.set(key, response, ttl=self._cache_ttl)
+
+    async def start_conversation(self) -> str:
+        return await self._conversations.start()
+
+    async def get_history(self, conversation_id: Optional[str]) -> Optional[History]:
+        """Earlier turns of the conversation, or None for a first turn"""
+        if conversation_id is None:
+            return None
+        history = await self._conversations.history(conversation_id)
+        return history if history.summary or history.messages else None
+
+    async def get_chat_response_with_mcp(
+        self, user_input: str, conversation_id: Optional[str] = None
+    ) -> str:
+        """
+        Generate response with MCP tools available. First turns are cached
+        per prompt, and identical ones arriving while one is being answered
+        share it. With a conversation, the turn is stored in it.
+        """
+        history = await self.get_history(conversation_id)
+        if history:
+            response = await self._generate_with_mcp(
+                user_input, history, conversation_id
+            )
+        else:
+            response = await self._first_turn(user_input, conversation_id)
+        if conversation_id:
+            await self._conversations.record_turn(conversation_id, user_input, response)
+            await self._conversations.compact(conversation_id, self._summarize)
+        return response
+
+    async def _first_turn(self, user_input: str, conversation_id: Optional[str]) -> str:
+        if not self._cache_ttl:
+            key, _ = await self._cache_key(user_input)
+            return await self._scheduler.coalesce(
+                key, lambda: self._generate_with_mcp(user_input, None, conversation_id)
+            )
+
+        cached, key, version = await self._get_cached(user_input)
+        if cached is not None:
+            return cached
+
+        async def generate() -> str:
+            response = await self._generate_with_mcp(user_input, None, conversation_id)
+            await self._set_cached(key, version, response)
+            return response
+
+        return await self._scheduler.coalesce(key, generate)
+
+    async def _generate_with_mcp(
+        self,
+        user_input: str,
+        history: Optional[History] = None,
+        conversation_id: Optional[str] = None,
+    ) -> str:
+        response = ""
+        async for event, data in self._stream_with_mcp(
+            user_input, history, conversation_id
+        ):
+            if event == "message":
+                response = data["content"]
+        return response
+
+    async def stream_chat_response_with_mcp(
+        self, user_input: str, conversation_id: Optional[str] = None
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """
+        Stream a response with MCP tools available, as (event, data) pairs:
+        "delta" for each piece of text, "tool_call" and "tool_result" around
+        every tool round, and "message" with the full text at the end.
+        A cached answer is sent as a single delta.
+        """
+        history = await self.get_history(conversation_id)
+        if history:
+            events = self._stream_with_mcp(user_input, history, conversation_id)
+        else:
+            events = self._stream_first_turn(user_input, conversation_id)
+        async for event, data in events:
+            if event == "message" and conversation_id:
+                # Stored before the client has the answer, so leaving early
+                # cannot lose the turn
+                await self._conversations.record_turn(
+                    conversation_id, user_input, data["content"]
+                )
+            yield event, data
+        if conversation_id:
+            await self._conversations.compact(conversation_id, self._summarize)
+
+    async def _stream_first_turn(
+        self, user_input: str, conversation_id: Optional[str]
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        if not self._cache_ttl:
+            async for event in self._stream_with_mcp(user_input, None, conversation_id):
+                yield event
+            return
+
+        cached, key, version = await self._get_cached(user_input)
+        if cached is not None:
+            yield "delta", {"text": cached}
+            yield "message", {"content": cached}
+            return
+        async for event, data in self._stream_with_mcp(
+            user_input, None, conversation_id
+        ):
+            if event == "message":
+                await self._set_cached(key, version, data["content"])
+            yield event, data
+
+    async def _stream_with_mcp(
+        self,
+        user_input: str,
+        history: Optional[History] = None,
+        conversation_id: Optional[str] = None,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        # Tools are called here rather than by the SDK, so their progress can
+        # be reported while the model is still working, and read-only results
+        # can be reused within a conversation.
+        from google.genai import types
 
-    async def get_chat_response_with_mcp(self, user_input: str) -> str:
-        """Generate response with MCP tools available"""
         async with self._mcp_client:
-            config_dict = model_config.model_client.model_dump(exclude={"tools"})
-            mcp_config = types.GenerateContentConfig(
-                **config_dict,
-                tools=[self._mcp_client.session],
+            system_instruction = model_config.system_instruction
+            if history and history.summary:
+                system_instruction = (
+                    f"{system_instruction}\n\n"
+                    f"Summary of the conversation so far:\n{history.summary}"
+                )
+            listed = await self._mcp_client.list_tools()
+            read_only = {
+                tool.name
+                for tool in listed
+                if tool.annotations and tool.annotations.readOnlyHint
+            }
+            tools = [_to_gemini_tool(tool) for tool in listed]
+            config = types.GenerateContentConfig(
+                system_instruction=system_instruction,
+                tools=tools,
+                automatic_function_calling=types.AutomaticFunctionCallingConfig(
+                    disable=True
+                ),
+            )
+            contents = [
+                (types.UserContent if role == "user" else types.ModelContent)(
+                    parts=[types.Part.from_text(text=content)]
+                )
+                for role, content in (history.messages if history else [])
+            ]
+            contents.append(
+                types.UserContent(parts=[types.Part.from_text(text=user_input)])
+            )
+            text = []
+
+            for _ in range(MAX_TOOL_ROUNDS):
+                model_parts = []
+                usage = None
+                async with self._scheduler.slot():
+                    first, stream, started = await self._scheduler.retrying(
+                        lambda: self._open_stream(contents, config)
+                    )
+                    outcome = "error"
+                    try:
+                        async for chunk in _prepend(first, stream):
+                            # Usage is cumulative; the last chunk has the totals
+                            usage = chunk.usage_metadata or usage
+                            if not chunk.candidates or not chunk.candidates[0].content:
+                                continue
+                            for part in chunk.candidates[0].content.parts or []:
+                                model_parts.append(part)
+                                if part.text and not part.thought:
+                                    text.append(part.text)
+                                    yield "delta", {"text": part.text}
+                        outcome = "ok"
+                    finally:
+                        record_llm_call(self._model, started, outcome, usage)
+
+                calls = [
+                    part.function_call for part in model_parts if part.function_call
+                ]
+                if not calls:
+                    break
+
+                contents.append(types.ModelContent(parts=model_parts))
+                response_parts = []
+                for call in calls:
+                    args = dict(call.args or {})
+                    yield "tool_call", {"id": call.id, "name": call.name, "args": args}
+                    payload, is_error, cached = await self._call_tool(
+                        call.name,
+                        args,
+                        conversation_id if call.name in read_only else None,
+                    )
+                    yield (
+                        "tool_result",
+                        {
+                            "id": call.id,
+                            "name": call.name,
+                            "is_error": is_error,
+                            "cached": cached,
+                        },
+                    )
+                    response_parts.append(
+                        types.Part.from_function_response(
+                            name=call.name,
+                            response={"error" if is_error else "result": payload},
+                        )
+                    )
+                contents.append(types.UserContent(parts=response_parts))
+
+            yield "message", {"content": "".join(text)}
+
+    async def _call_tool(
+        self, name: str, args: dict, conversation_id: Optional[str]
+    ) -> tuple[dict, bool, bool]:
+        """
+        Call an MCP tool, returning (payload, is_error, cached). Given a
+        conversation, the result is reused for the same call in that
+        conversation until a contact write bumps the version.
+        """
+        key = None
+        if conversation_id and self._tool_cache_ttl:
+            version = await self._cache.counter(CONTACTS_VERSION_KEY)
+            digest = hashlib.sha256(
+                json.dumps([name, args], sort_keys=True, default=str).encode()
+            ).hexdigest()
+            key = f"chat:tool:{conversation_id}:{version}:{digest}"
+            cached = await self._cache.get(key)
+            CHAT_TOOL_CACHE.labels("miss" if cached is None else "hit").inc()
+            if cached is not None:
+                return cached, False, True
+
+        result = await self._mcp_client.call_tool_mcp(name, args)
+        if result.structuredContent is not None:
+            # The text content is the same result serialized again; send it
+            # once, without empty fields
+            payload = {
+                key: value
+                for key, value in result.structuredContent.items()
+                if value is not None
+            }
+        else:
+            payload = {
+                "content": [
+                    block.text for block in result.content if block.type == "text"
+                ]
+            }
+        if key and not result.isError:
+            await self._cache.set(key, payload, ttl=self._tool_cache_ttl)
+        return payload, result.isError, False
+
+    async def _summarize(self, summary: Optional[str], messages: list) -> str:
+        """Fold older messages into the conversation's running summary"""
+        from google.genai import types
+
+        transcript = "\n".join(f"{role}: {content}" for role, content in messages)
+        prompt = f"New messages:\n{transcript}"
+        if summary:
+            prompt = f"Summary so far:\n{summary}\n\n{prompt}"
+        config = types.GenerateContentConfig(
+            system_instruction=SUMMARY_INSTRUCTION.format(
+                words=self._conversations.summary_tokens * 3 // 4
             )
+        )
+
+        async def generate() -> "types.GenerateContentResponse":
+            started = time.perf_counter()
+            try:
+                resp = await self._client.aio.models.generate_content(
+                    model=self._model, contents=prompt, config=config
+                )
+            except Exception:
+                record_llm_call(self._model, started, "error")
+                raise
+            record_llm_call(self._model, started, "ok", resp.usage_metadata)
+            return resp
 
-            resp = await self._client.aio.models.generate_content(
+        resp = await self._scheduler.run(generate)
+        return resp.text or summary or ""
+
+    async def _open_stream(self, contents: list, config: "types.GenerateContentConfig"):
+        """
+        Start a streamed round and wait for its first chunk, which is when the
+        request is actually sent, so failures up to there can be retried.
+        """
+        started = time.perf_counter()
+        try:
+            stream = await self._client.aio.models.generate_content_stream(
                 model=self._model,
-                contents=user_input,
-                config=mcp_config,
+                contents=contents,
+                config=config,
             )
-            return resp.text or ""
+            first = await anext(stream, None)
+        except Exception:
+            record_llm_call(self._model, started, "error")
+            raise
+        return first, stream, started
 
     def get_chat_response(self, user_input: str) -> str:
         """Original method without MCP (synchronous)"""
         resp = self._client.models.generate_content(
             model=self._model,
             contents=user_input,
-            config=self._config,
+            config=get_default_config(),
         )
         return resp.text or ""
 
@@ -46,10 +442,51 @@ class ChatService:
         resp = await self._client.aio.models.generate_content(
             model=self._model,
             contents=user_input,
-            config=self._config,
+            config=get_default_config(),
         )
         return resp.text or ""
 
 
+def _to_gemini_tool(tool) -> "types.Tool":
+    """An MCP tool as a Gemini function declaration"""
+    from google.genai import types
+
+    return types.Tool(
+        function_declarations=[
+            types.FunctionDeclaration(
+                name=tool.name,
+                description=tool.description,
+                parameters=types.Schema.from_json_schema(
+                    json_schema=types.JSONSchema(**_supported_schema(tool.inputSchema))
+                ),
+            )
+        ]
+    )
+
+
+def _supported_schema(schema: dict[str, Any]) -> dict[str, Any]:
+    """The parts of a JSON schema that types.JSONSchema models, recursively"""
+    from google.genai import types
+
+    supported = types.JSONSchema.model_fields.keys()
+    filtered = {}
+    for key, value in schema.items():
+        if key not in supported:
+            continue
+        if key == "items":
+            value = _supported_schema(value)
+        elif key == "properties":
+            value = {name: _supported_schema(item) for name, item in value.items()}
+        filtered[key] = value
+    return filtered
+
+
+async def _prepend(first, stream: AsyncIterator) -> AsyncIterator:
+    if first is not None:
+        yield first
+    async for item in stream:
+        yield item
+
+
 def get_chat_service() -> ChatService:
     return ChatService()
@@ -0,0 +1,176 @@
+import asyncio
+import contextlib
+import os
+import tempfile
+import time
+from typing import AsyncIterator, Optional
+
+from src.db.db import AsyncSessionLocal
+from src.db.schemas import ImportReport, Job
+from src.services.contact_service import ContactService
+from src.services.import_service import IMPORT_CHUNK_SIZE, ImportService
+from src.services.job_service import (
+    JOB_TTL_SECONDS,
+    JobContext,
+    JobService,
+    get_job_service,
+)
+from src.utils.contact_formats import (
+    ContactFormat,
+    format_contacts,
+    format_header,
+    parse_contacts,
+)
+
+# Where import bodies are spooled and exports written, until JOB_TTL_SECONDS
+JOB_FILES_DIR = os.getenv("JOB_FILES_DIR") or os.path.join(
+    tempfile.gettempdir(), "contact-jobs"
+)
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+class ContactJobs:
+    """Starts imports, exports and search reindexing as background jobs."""
+
+    def __init__(
+        self,
+        jobs: Optional[JobService] = None,
+        contacts: Optional[ContactService] = None,
+        files_dir: str = JOB_FILES_DIR,
+    ):
+        self._jobs = jobs or get_job_service()
+        self._contacts = contacts or ContactService()
+        self._imports = ImportService(self._contacts)
+        self._files_dir = files_dir
+
+    def export_path(self, job: Job) -> Optional[str]:
+        """The file a finished export wrote, unless it has expired."""
+        if job.kind != "export" or job.status != "succeeded":
+            return None
+        path = os.path.join(self._files_dir, f"{job.id}.{job.result['format']}")
+        return path if os.path.exists(path) else None
+
+    def _prune(self) -> None:
+        """Delete files older than the jobs they belong to."""
+        cutoff = time.time() - JOB_TTL_SECONDS
+        with os.scandir(self._files_dir) as entries:
+            for entry in entries:
+                # Another process may be pruning the same directory
+                with contextlib.suppress(FileNotFoundError):
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+
+    async def _spool(self, body: AsyncIterator[bytes]) -> str:
+        await asyncio.to_thread(os.makedirs, self._files_dir, exist_ok=True)
+        await asyncio.to_thread(self._prune)
+        fd, path = tempfile.mkstemp(dir=self._files_dir, suffix=".import")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                async for chunk in body:
+                    await asyncio.to_thread(file.write, chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path
+
+    async def start_import(
+        self,
+        body: AsyncIterator[bytes],
+        format: ContactFormat,
+        default_region: str = "PL",
+        update_existing: bool = False,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> Job:
+        """
+        Import a body as a job. The body has to be read before the response
+        is sent, so it is spooled to a file first, and the job reads that.
+        The job's result is the ImportReport.
+        """
+        path = await self._spool(body)
+
+        async def run(ctx: JobContext) -> dict:
+            size = os.path.getsize(path)
+            read = 0
+
+            async def chunks() -> AsyncIterator[bytes]:
+                nonlocal read
+                with open(path, "rb") as file:
+                    while chunk := await asyncio.to_thread(file.read, FILE_CHUNK_SIZE):
+                        read += len(chunk)
+                        yield chunk
+
+            def progress(report: ImportReport) -> None:
+                ctx.progress(report.received, fraction=read / size if size else None)
+
+            try:
+                async with AsyncSessionLocal() as db:
+                    report = await self._imports.import_contacts(
+                        db,
+                        parse_contacts(chunks(), format),
+                        default_region=default_region,
+                        update_existing=update_existing,
+                        chunk_size=chunk_size,
+                        progress=progress,
+                    )
+            finally:
+                os.unlink(path)
+            ctx.progress(report.received)
+            return report.model_dump()
+
+        try:
+            return await self._jobs.submit("import", run)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+    async def start_export(self, format: ContactFormat) -> Job:
+        """
+        Export the contact book to a file as a job; once it succeeds, the
+        file is served by GET /jobs/{id}/download.
+        """
+        await asyncio.to_thread(os.makedirs, self._files_dir, exist_ok=True)
+        await asyncio.to_thread(self._prune)
+
+        async def run(ctx: JobContext) -> dict:
+            path = os.path.join(self._files_dir, f"{ctx.job.id}.{format}")
+            # Written under another name, so a download never gets half a file
+            partial = path + ".part"
+            written = 0
+            try:
+                async with AsyncSessionLocal() as db:
+                    total = await self._contacts.count_contacts(db)
+                    with open(partial, "w", encoding="utf-8", newline="") as file:
+                        file.write(format_header(format))
+                        async for rows in self._contacts.stream_contacts(db):
+                            text = format_contacts(rows, format)
+                            await asyncio.to_thread(file.write, text)
+                            written += len(rows)
+                            ctx.progress(written, total)
+                os.replace(partial, path)
+            except BaseException:
+                if os.path.exists(partial):
+                    os.unlink(partial)
+                raise
+            return {
+                "format": format,
+                "contacts": written,
+                "bytes": os.path.getsize(path),
+                "download": f"/api/jobs/{ctx.job.id}/download",
+            }
+
+        return await self._jobs.submit("export", run)
+
+    async def start_reindex(self) -> Job:
+        """Rebuild the search index as a job; searches go on meanwhile."""
+
+        async def run(ctx: JobContext) -> dict:
+            async with AsyncSessionLocal() as db:
+                indexed = await self._contacts.reindex(db, ctx.progress)
+            return {"indexed": indexed}
+
+        return await self._jobs.submit("reindex", run)
+
+
+def get_contact_jobs() -> ContactJobs:
+    """Dependency to get the contact jobs."""
+    return ContactJobs()
@@ -1,99 +1,877 @@
-from typing import List, Optional
+import math
+import os
+import random
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
 
-from sqlalchemy.orm import Session
-from src.db.schemas import ContactCreate, ContactUpdate
-from src.db.models.Contact import ContactModel
+from sqlalchemy import Row, case, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.api.responses import Response
+from src.db.db import DATABASE_REPLICA_MAX_LAG, read_from_replica, replica_reads
+from src.db.schemas import (
+    BatchItemResult,
+    Contact,
+    ContactBatchResult,
+    ContactChangeEvent,
+    ContactChanges,
+    ContactCreate,
+    ContactStats,
+    ContactUpdate,
+)
+from src.db.models.Contact import (
+    ContactChangeModel,
+    ContactModel,
+    ContactStatsModel,
+)
+from src.services.cache import Cache, get_cache
+from src.services.change_feed import ChangeWatcher, get_change_watcher
+from src.services.search_service import (
+    Progress,
+    SearchBackend,
+    get_search_backend,
+    normalize_name,
+)
+from src.utils.cursor import (
+    decode_change_token,
+    decode_cursor,
+    encode_change_token,
+    encode_cursor,
+)
+
+# Bumped by every write; list pages are keyed on it, so a write invalidates
+# all of them at once without having to know which pages it touched.
+CONTACTS_VERSION_KEY = "contacts:version"
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+# Rows of contact_stats the count is spread over
+CONTACT_COUNT_SLOTS = 16
+
+# Postgres advisory lock serializing the tail of contact writes, see _record
+CONTACT_CHANGES_LOCK = 0x636F6E74
+
+# A replica may not have a write yet whose version bump the cache key has
+# seen, so what is read there is cached only for as long as it may lag
+REPLICA_CACHE_TTL = max(1, math.ceil(DATABASE_REPLICA_MAX_LAG))
+
+
+class ContactConflictError(ValueError):
+    """A write would give a contact a phone number that is already taken."""
+
+    def __init__(self, phone: str, message: str):
+        super().__init__(message)
+        self.phone = phone
+
+
+class BatchConflictError(ValueError):
+    """A concurrent write broke a batch's unique phones; nothing was applied."""
+
+    def __init__(self):
+        super().__init__(Response.BATCH_CONFLICT.value)
+
+
+class ContactAlreadyExistsError(ContactConflictError):
+    def __init__(self, phone: str, existing: Optional[Contact] = None):
+        super().__init__(phone, f"Contact with phone number {phone} already exists")
+        self.existing = existing
+
+
+class PhoneAlreadyRegisteredError(ContactConflictError):
+    def __init__(self, phone: str):
+        super().__init__(
+            phone, f"Phone number {phone} is already registered to another contact"
+        )
+
+
+def _id_key(contact_id: int) -> str:
+    return f"contacts:id:{contact_id}"
+
+
+def _phone_key(phone: str) -> str:
+    return f"contacts:phone:{phone}"
+
+
+def _insert(db: AsyncSession, model=ContactModel):
+    """INSERT construct of the session's dialect, which supports ON CONFLICT."""
+    return _dialect_insert(db.bind.dialect.name, model)
+
+
+def _dialect_insert(dialect: str, model):
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise ValueError(f"Upserts are not supported on {dialect}")
+
+
+def count_contacts_statement(dialect: str, delta: int, changes: int):
+    """
+    Add `delta` to the contact count and `changes` to the change count, in
+    a random slot. Upserts, so the slots need no seeding.
+    """
+    stmt = _dialect_insert(dialect, ContactStatsModel).values(
+        slot=random.randrange(CONTACT_COUNT_SLOTS), contacts=delta, changes=changes
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[ContactStatsModel.slot],
+        set_={
+            "contacts": ContactStatsModel.contacts + stmt.excluded.contacts,
+            "changes": ContactStatsModel.changes + stmt.excluded.changes,
+        },
+    )
+
+
+def _change(op: str, db_contact: ContactModel) -> dict:
+    """Change log row for a contact as a write left it."""
+    return {
+        "contactId": db_contact.id,
+        "op": op,
+        "name": db_contact.name,
+        "phone": db_contact.phone,
+        "version": db_contact.version,
+    }
+
+
+def _deletion(contact_id: int, phone: str) -> dict:
+    # Same keys as _change, so a batch's rows go in one executemany
+    return {
+        "contactId": contact_id,
+        "op": "delete",
+        "name": None,
+        "phone": phone,
+        "version": None,
+    }
+
+
+def _to_change(row: ContactChangeModel) -> ContactChangeEvent:
+    contact = None
+    if row.op != "delete":
+        contact = Contact.model_validate(
+            {
+                "id": row.contactId,
+                "name": row.name,
+                "phone": row.phone,
+                "version": row.version,
+            }
+        )
+    return ContactChangeEvent(seq=row.seq, op=row.op, id=row.contactId, contact=contact)
+
+
+def _item_result(
+    index: int,
+    db_contact: Optional[ContactModel],
+    error: Optional[str],
+    contact_id: Optional[int] = None,
+) -> BatchItemResult:
+    return BatchItemResult(
+        index=index,
+        success=error is None,
+        id=db_contact.id if db_contact is not None else contact_id,
+        contact=Contact.model_validate(db_contact) if db_contact is not None else None,
+        error=error,
+    )
 
 
 class ContactService:
-    def get_contacts(
-        self, db: Session, skip: int = 0, limit: int = 100
-    ) -> List[ContactModel]:  # Return SQLAlchemy model
-        """Get all contacts with pagination."""
-        return sorted(
-            db.query(ContactModel).offset(skip).limit(limit).all(), key=lambda c: c.id
+    def __init__(
+        self,
+        search_backend: Optional[SearchBackend] = None,
+        cache: Optional[Cache] = None,
+        change_watcher: Optional[ChangeWatcher] = None,
+    ):
+        self._search = search_backend or get_search_backend()
+        self._cache = cache or get_cache()
+        self._changes = change_watcher or get_change_watcher()
+
+    async def _page_key(self, *parts) -> str:
+        version = await self._cache.counter(CONTACTS_VERSION_KEY)
+        return ":".join(["contacts:page", str(version), *map(str, parts)])
+
+    async def _record(self, db: AsyncSession, delta: int, changes: List[dict]) -> None:
+        """
+        Append the changes to the change log and adjust the contact and
+        change counts, within the write's transaction.
+        """
+        if not changes:
+            return
+        dialect = db.bind.dialect.name
+        if dialect == "postgresql":
+            # Held until commit, so seqs are handed out in commit order and a
+            # reader that has seen one has seen every seq below it. SQLite
+            # already takes one writer at a time.
+            await db.execute(select(func.pg_advisory_xact_lock(CONTACT_CHANGES_LOCK)))
+        await db.execute(insert(ContactChangeModel), changes)
+        await db.execute(count_contacts_statement(dialect, delta, len(changes)))
+
+    async def _written(self) -> None:
+        """After a committed write: retire all list pages, wake change streams."""
+        await self._cache.incr(CONTACTS_VERSION_KEY)
+        self._changes.poke()
+
+    async def _invalidate(self, contact_id: int, *phones: str) -> None:
+        """Retire all list pages and drop cached lookups for a written contact."""
+        # Bumped first: a lookup that read the row before the write either
+        # sees the new version and skips caching it, or is cached in time
+        # for the delete
+        await self._written()
+        await self._cache.delete(_id_key(contact_id), *map(_phone_key, phones))
+
+    async def _fill(
+        self, db: AsyncSession, key: str, value, version: Optional[int] = None
+    ) -> None:
+        """
+        Cache what a read found, briefly if it was read on a replica. Given
+        the contacts version read before the query, skip it if a write has
+        happened since, as the row may be the one the write replaced.
+        """
+        if (
+            version is not None
+            and await self._cache.counter(CONTACTS_VERSION_KEY) != version
+        ):
+            return
+        ttl = REPLICA_CACHE_TTL if read_from_replica(db) else None
+        await self._cache.set(key, value, ttl=ttl)
+
+    async def _get_one(
+        self, db: AsyncSession, key: str, *criteria
+    ) -> Optional[Contact]:
+        cached = await self._cache.get(key)
+        if cached is not None:
+            return Contact.model_validate(cached)
+
+        version = await self._cache.counter(CONTACTS_VERSION_KEY)
+        db_contact = await db.scalar(select(ContactModel).where(*criteria))
+        if db_contact is None:
+            return None
+        contact = Contact.model_validate(db_contact)
+        await self._fill(db, key, contact.model_dump(), version)
+        return contact
+
+    @replica_reads
+    async def get_contacts(
+        self, db: AsyncSession, skip: int = 0, limit: int = 100
+    ) -> List[Contact]:
+        """Get all contacts with offset pagination."""
+        key = await self._page_key("offset", skip, limit)
+        cached = await self._cache.get(key)
+        if cached is not None:
+            return [Contact.model_validate(contact) for contact in cached]
+
+        rows = await db.scalars(
+            select(ContactModel).order_by(ContactModel.id).offset(skip).limit(limit)
+        )
+        contacts = [Contact.model_validate(contact) for contact in rows]
+        await self._fill(db, key, [contact.model_dump() for contact in contacts])
+        return contacts
+
+    @replica_reads
+    async def get_contacts_page(
+        self, db: AsyncSession, after: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Contact], Optional[str]]:
+        """
+        Get contacts with keyset pagination.
+        Returns the page and the cursor for the next one (None on the last page).
+        """
+        after_id = decode_cursor(after) if after else None
+        key = await self._page_key("keyset", after_id, limit)
+        cached = await self._cache.get(key)
+        if cached is not None:
+            contacts = [
+                Contact.model_validate(contact) for contact in cached["contacts"]
+            ]
+            return contacts, cached["next_cursor"]
+
+        query = select(ContactModel)
+        if after_id is not None:
+            query = query.where(ContactModel.id > after_id)
+
+        # One extra row tells us whether there is a next page
+        rows = (
+            await db.scalars(query.order_by(ContactModel.id).limit(limit + 1))
+        ).all()
+        next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+        contacts = [Contact.model_validate(contact) for contact in rows[:limit]]
+        await self._fill(
+            db,
+            key,
+            {
+                "contacts": [contact.model_dump() for contact in contacts],
+                "next_cursor": next_cursor,
+            },
+        )
+        return contacts, next_cursor
+
+    @replica_reads
+    async def stream_contacts(
+        self, db: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Stream (id, name, phone) rows in ID order, batch_size rows at a time.
+        Uses a server-side cursor, so memory does not grow with the table.
+        """
+        result = await db.stream(
+            select(ContactModel.id, ContactModel.name, ContactModel.phone)
+            .order_by(ContactModel.id)
+            .execution_options(yield_per=batch_size)
         )
+        async for rows in result.partitions():
+            yield rows
 
-    def get_contact_by_phone(self, db: Session, phone: str) -> Optional[ContactModel]:
+    @replica_reads
+    async def get_contacts_by_ids(
+        self, db: AsyncSession, contact_ids: Sequence[int]
+    ) -> List[Contact]:
+        """Get the contacts with the given IDs in one query, in the order asked."""
+        rows = await db.scalars(
+            select(ContactModel).where(ContactModel.id.in_(set(contact_ids)))
+        )
+        by_id = {contact.id: Contact.model_validate(contact) for contact in rows}
+        return [by_id[contact_id] for contact_id in contact_ids if contact_id in by_id]
+
+    @replica_reads
+    async def get_contact_by_phone(
+        self, db: AsyncSession, phone: str
+    ) -> Optional[Contact]:
         """Get a contact by phone number."""
-        return db.query(ContactModel).filter(ContactModel.phone == phone).first()
+        # Phones map to IDs. An update returns only the new row, so the entry
+        # under the previous phone is not dropped; it is ignored once the
+        # contact it points to no longer has that phone.
+        contact_id = await self._cache.get(_phone_key(phone))
+        if contact_id is not None:
+            contact = await self.get_contact_by_id(db, contact_id)
+            if contact is not None and contact.phone == phone:
+                return contact
+
+        version = await self._cache.counter(CONTACTS_VERSION_KEY)
+        db_contact = await db.scalar(
+            select(ContactModel).where(ContactModel.phone == phone)
+        )
+        if db_contact is None:
+            return None
+        contact = Contact.model_validate(db_contact)
+        await self._fill(db, _phone_key(phone), contact.id, version)
+        await self._fill(db, _id_key(contact.id), contact.model_dump(), version)
+        return contact
 
-    def get_contact_by_id(self, db: Session, contact_id: int) -> Optional[ContactModel]:
+    @replica_reads
+    async def get_contact_by_id(
+        self, db: AsyncSession, contact_id: int
+    ) -> Optional[Contact]:
         """Get detailed information about a specific contact by ID."""
-        return db.query(ContactModel).filter(ContactModel.id == contact_id).first()
-
-    def create_contact(self, db: Session, contact: ContactCreate) -> ContactModel:
-        """Create a new contact."""
-        # Check for duplicate phone numbers
-        existing_contact = self.get_contact_by_phone(db, contact.phone)
-        if existing_contact:
-            raise ValueError(
-                f"Contact with phone number {contact.phone} already exists"
-            )
+        return await self._get_one(
+            db, _id_key(contact_id), ContactModel.id == contact_id
+        )
+
+    async def create_contact(
+        self, db: AsyncSession, contact: ContactCreate
+    ) -> ContactModel:
+        """
+        Create a new contact with a single INSERT ... ON CONFLICT DO NOTHING
+        RETURNING. Raises ContactAlreadyExistsError if the phone is taken.
+        """
+        stmt = (
+            _insert(db)
+            .values(name=contact.name, phone=contact.phone)
+            .on_conflict_do_nothing(index_elements=[ContactModel.phone])
+            .returning(ContactModel)
+        )
+        db_contact = (
+            await db.scalars(stmt, execution_options={"populate_existing": True})
+        ).first()
+        if db_contact is None:
+            await db.rollback()
+            existing = await self.get_contact_by_phone(db, contact.phone)
+            raise ContactAlreadyExistsError(contact.phone, existing)
 
-        db_contact = ContactModel(name=contact.name, phone=contact.phone)
-        db.add(db_contact)
-        db.commit()
-        db.refresh(db_contact)
+        await self._record(db, 1, [_change("insert", db_contact)])
+        await db.commit()
+        self._search.index(db_contact)
+        await self._invalidate(db_contact.id, db_contact.phone)
         return db_contact
 
-    def update_contact_by_id(
-        self, db: Session, contact_id: int, contact: ContactUpdate
+    async def upsert_contacts(
+        self, db: AsyncSession, contacts: List[dict], update_existing: bool = False
+    ) -> Tuple[List[ContactModel], List[ContactModel]]:
+        """
+        Write many contacts with a single multi-row INSERT ... ON CONFLICT in
+        one transaction. Phones must be normalized and unique within the batch.
+        Existing phones are skipped, or renamed when update_existing is set.
+        Returns the inserted and the updated contacts.
+        """
+        if not contacts:
+            return [], []
+
+        existing: set[str] = set()
+        stmt = _insert(db).values(contacts)
+        if update_existing:
+            phones = [contact["phone"] for contact in contacts]
+            existing = set(
+                await db.scalars(
+                    select(ContactModel.phone).where(ContactModel.phone.in_(phones))
+                )
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ContactModel.phone],
+                set_={
+                    "name": stmt.excluded.name,
+                    "version": ContactModel.version + 1,
+                    "updatedAt": func.now(),
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[ContactModel.phone])
+
+        written = (
+            await db.scalars(
+                stmt.returning(ContactModel),
+                execution_options={"populate_existing": True},
+            )
+        ).all()
+        inserted, updated, changes = [], [], []
+        for db_contact in written:
+            is_update = db_contact.phone in existing
+            (updated if is_update else inserted).append(db_contact)
+            changes.append(_change("update" if is_update else "insert", db_contact))
+        await self._record(db, len(inserted), changes)
+        await db.commit()
+
+        for db_contact in written:
+            self._search.index(db_contact)
+        if written:
+            await self._written()
+            await self._cache.delete(
+                *(_id_key(db_contact.id) for db_contact in written),
+                *(_phone_key(db_contact.phone) for db_contact in written),
+            )
+        return inserted, updated
+
+    async def _update(
+        self, db: AsyncSession, contact: ContactUpdate, *criteria
     ) -> Optional[ContactModel]:
-        """Update an existing contact by ID."""
-        db_contact = (
-            db.query(ContactModel).filter(ContactModel.id == contact_id).first()
+        """
+        Apply an update with a single UPDATE ... RETURNING, returning None if
+        no contact matched.
+        """
+        stmt = (
+            update(ContactModel)
+            .where(*criteria)
+            .values(
+                name=contact.name,
+                phone=contact.phone,
+                version=ContactModel.version + 1,
+            )
+            .returning(ContactModel)
+            .execution_options(synchronize_session=False, populate_existing=True)
         )
-        if db_contact:
-            db_contact.name = contact.name
-            db_contact.phone = contact.phone
-            db.commit()
-            db.refresh(db_contact)
+        try:
+            db_contact = (await db.scalars(stmt)).first()
+        except IntegrityError:
+            await db.rollback()
+            raise PhoneAlreadyRegisteredError(contact.phone)
+        if db_contact is None:
+            await db.rollback()
+            return None
+        await self._record(db, 0, [_change("update", db_contact)])
+        await db.commit()
+
+        self._search.index(db_contact)
+        await self._invalidate(db_contact.id, db_contact.phone)
         return db_contact
 
-    def delete_contact(self, db: Session, contact_id: int) -> bool:
+    async def _delete(self, db: AsyncSession, *criteria) -> bool:
+        row = (
+            await db.execute(
+                delete(ContactModel)
+                .where(*criteria)
+                .returning(ContactModel.id, ContactModel.phone)
+                .execution_options(synchronize_session=False)
+            )
+        ).first()
+        if row is None:
+            await db.rollback()
+            return False
+        contact_id, phone = row
+        await self._record(db, -1, [_deletion(contact_id, phone)])
+        await db.commit()
+
+        self._search.remove(contact_id)
+        await self._invalidate(contact_id, phone)
+        return True
+
+    async def update_contact_by_id(
+        self, db: AsyncSession, contact_id: int, contact: ContactUpdate
+    ) -> Optional[ContactModel]:
+        """
+        Update an existing contact by ID.
+        Raises PhoneAlreadyRegisteredError if another contact has the phone.
+        """
+        return await self._update(db, contact, ContactModel.id == contact_id)
+
+    async def delete_contact(self, db: AsyncSession, contact_id: int) -> bool:
         """Delete a contact by ID."""
-        db_contact = (
-            db.query(ContactModel).filter(ContactModel.id == contact_id).first()
-        )
-        if db_contact:
-            db.delete(db_contact)
-            db.commit()
-            return True
-        return False
+        return await self._delete(db, ContactModel.id == contact_id)
 
-    def update_contact_by_phone_num(
-        self, db: Session, phone: str, contact: ContactUpdate
+    async def update_contact_by_phone_num(
+        self, db: AsyncSession, phone: str, contact: ContactUpdate
     ) -> Optional[ContactModel]:
-        """Update a contact by phone number."""
-        db_contact = db.query(ContactModel).filter(ContactModel.phone == phone).first()
-        if db_contact:
-            db_contact.name = contact.name
-            db_contact.phone = contact.phone
-            db.commit()
-            db.refresh(db_contact)
-        return db_contact
+        """
+        Update a contact by phone number.
+        Raises PhoneAlreadyRegisteredError if another contact has the new phone.
+        """
+        return await self._update(db, contact, ContactModel.phone == phone)
 
-    def delete_contact_by_phone(self, db: Session, phone: str) -> bool:
+    async def delete_contact_by_phone(self, db: AsyncSession, phone: str) -> bool:
         """Delete a contact by phone number."""
-        db_contact = db.query(ContactModel).filter(ContactModel.phone == phone).first()
-        if db_contact:
-            db.delete(db_contact)
-            db.commit()
-            return True
-        return False
-
-    def search_contacts(self, db: Session, query: str) -> List[ContactModel]:
-        """Search contacts by name or phone number."""
-        return (
-            db.query(ContactModel)
-            .filter(
-                ContactModel.name.ilike(f"%{query}%")
-                | ContactModel.phone.ilike(f"%{query}%")
+        return await self._delete(db, ContactModel.phone == phone)
+
+    async def merge_contacts(
+        self,
+        db: AsyncSession,
+        keep_id: int,
+        merge_ids: Sequence[int],
+        name: Optional[str] = None,
+        phone: Optional[str] = None,
+    ) -> Optional[ContactModel]:
+        """
+        Merge duplicates into one contact in one transaction: the contacts in
+        merge_ids are deleted and keep_id takes `name` and `phone` when given,
+        which may be the phone of a merged contact. Returns None, changing
+        nothing, unless every contact exists.
+        Raises PhoneAlreadyRegisteredError if another contact has the phone.
+        """
+        ids = [keep_id, *dict.fromkeys(i for i in merge_ids if i != keep_id)]
+        rows = await db.scalars(
+            select(ContactModel).where(ContactModel.id.in_(ids)).with_for_update()
+        )
+        by_id = {db_contact.id: db_contact for db_contact in rows}
+        if len(by_id) < len(ids):
+            await db.rollback()
+            return None
+        kept = by_id[keep_id]
+        previous_phone = kept.phone
+
+        deleted = dict(
+            (
+                await db.execute(
+                    delete(ContactModel)
+                    .where(ContactModel.id.in_(ids[1:]))
+                    .returning(ContactModel.id, ContactModel.phone)
+                    .execution_options(synchronize_session=False)
+                )
+            ).all()
+        )
+        try:
+            db_contact = (
+                await db.scalars(
+                    update(ContactModel)
+                    .where(ContactModel.id == keep_id)
+                    .values(
+                        name=name or kept.name,
+                        phone=phone or kept.phone,
+                        version=ContactModel.version + 1,
+                    )
+                    .returning(ContactModel)
+                    .execution_options(
+                        synchronize_session=False, populate_existing=True
+                    )
+                )
+            ).one()
+        except IntegrityError:
+            await db.rollback()
+            raise PhoneAlreadyRegisteredError(phone)
+        await self._record(
+            db,
+            -len(deleted),
+            [
+                *(_deletion(*item) for item in deleted.items()),
+                _change("update", db_contact),
+            ],
+        )
+        await db.commit()
+
+        for contact_id in deleted:
+            self._search.remove(contact_id)
+        self._search.index(db_contact)
+        await self._written()
+        await self._cache.delete(
+            *(_id_key(contact_id) for contact_id in ids),
+            *map(_phone_key, {*deleted.values(), previous_phone}),
+        )
+        return db_contact
+
+    async def batch(
+        self,
+        db: AsyncSession,
+        creates: Sequence[ContactCreate] = (),
+        updates: Sequence[Tuple[int, ContactUpdate]] = (),
+        deletes: Sequence[int] = (),
+    ) -> ContactBatchResult:
+        """
+        Apply many writes in one transaction: deletes, then updates, then
+        creates, each kind with one set-based statement (updates also look up
+        who owns their new phones). Items that conflict or don't match are
+        reported per item and the rest still apply.
+        Raises BatchConflictError if a concurrent write breaks the unique
+        phone constraint, in which case nothing is applied.
+        """
+        result = ContactBatchResult()
+        try:
+            deleted = await self._delete_many(db, deletes, result)
+            updated = await self._update_many(db, updates, result)
+            created = await self._create_many(db, creates, result)
+        except IntegrityError:
+            await db.rollback()
+            raise BatchConflictError()
+        await self._record(
+            db,
+            len(created) - len(deleted),
+            [
+                *(_deletion(*item) for item in deleted.items()),
+                *(_change("update", db_contact) for db_contact in updated),
+                *(_change("insert", db_contact) for db_contact in created),
+            ],
+        )
+        await db.commit()
+
+        for contact_id in deleted:
+            self._search.remove(contact_id)
+        for db_contact in [*updated, *created]:
+            self._search.index(db_contact)
+        written = [*deleted.items(), *((c.id, c.phone) for c in [*updated, *created])]
+        if written:
+            await self._written()
+            await self._cache.delete(
+                *(_id_key(contact_id) for contact_id, _ in written),
+                *(_phone_key(phone) for _, phone in written),
+            )
+        return result
+
+    async def _delete_many(
+        self, db: AsyncSession, contact_ids: Sequence[int], result: ContactBatchResult
+    ) -> dict[int, str]:
+        deleted: dict[int, str] = {}
+        if contact_ids:
+            rows = await db.execute(
+                delete(ContactModel)
+                .where(ContactModel.id.in_(set(contact_ids)))
+                .returning(ContactModel.id, ContactModel.phone)
+                .execution_options(synchronize_session=False)
+            )
+            deleted = dict(rows.all())
+        seen: set[int] = set()
+        for index, contact_id in enumerate(contact_ids):
+            error = None
+            if contact_id in seen:
+                error = Response.DUPLICATE_IN_BATCH.value
+            elif contact_id not in deleted:
+                error = Response.CONTACT_NOT_FOUND.value
+            seen.add(contact_id)
+            result.deleted.append(
+                BatchItemResult(
+                    index=index, success=error is None, id=contact_id, error=error
+                )
+            )
+        return deleted
+
+    async def _update_many(
+        self,
+        db: AsyncSession,
+        updates: Sequence[Tuple[int, ContactUpdate]],
+        result: ContactBatchResult,
+    ) -> List[ContactModel]:
+        if not updates:
+            return []
+        owners = dict(
+            (
+                await db.execute(
+                    select(ContactModel.phone, ContactModel.id).where(
+                        ContactModel.phone.in_({update.phone for _, update in updates})
+                    )
+                )
+            ).all()
+        )
+
+        errors: dict[int, str] = {}
+        apply: dict[int, ContactUpdate] = {}
+        for index, (contact_id, contact) in enumerate(updates):
+            owner = owners.get(contact.phone, contact_id)
+            if contact_id in apply:
+                errors[index] = Response.DUPLICATE_IN_BATCH.value
+            elif owner != contact_id:
+                # Includes swapping phones within the batch, which a single
+                # UPDATE cannot do under a non-deferred unique constraint
+                errors[index] = Response.PHONE_ALREADY_REGISTERED.value
+            else:
+                apply[contact_id] = contact
+                owners[contact.phone] = contact_id
+
+        by_id: dict[int, ContactModel] = {}
+        if apply:
+            rows = await db.scalars(
+                update(ContactModel)
+                .where(ContactModel.id.in_(list(apply)))
+                .values(
+                    name=case(
+                        {i: c.name for i, c in apply.items()}, value=ContactModel.id
+                    ),
+                    phone=case(
+                        {i: c.phone for i, c in apply.items()}, value=ContactModel.id
+                    ),
+                    version=ContactModel.version + 1,
+                )
+                .returning(ContactModel)
+                .execution_options(synchronize_session=False, populate_existing=True)
+            )
+            by_id = {db_contact.id: db_contact for db_contact in rows}
+
+        for index, (contact_id, _) in enumerate(updates):
+            db_contact = by_id.get(contact_id) if index not in errors else None
+            error = errors.get(index)
+            if error is None and db_contact is None:
+                error = Response.CONTACT_NOT_FOUND.value
+            result.updated.append(_item_result(index, db_contact, error, contact_id))
+        return list(by_id.values())
+
+    async def _create_many(
+        self,
+        db: AsyncSession,
+        creates: Sequence[ContactCreate],
+        result: ContactBatchResult,
+    ) -> List[ContactModel]:
+        first: dict[str, int] = {}
+        for index, contact in enumerate(creates):
+            first.setdefault(contact.phone, index)
+
+        by_phone: dict[str, ContactModel] = {}
+        if first:
+            rows = await db.scalars(
+                _insert(db)
+                .values(
+                    [
+                        {"name": creates[index].name, "phone": phone}
+                        for phone, index in first.items()
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[ContactModel.phone])
+                .returning(ContactModel),
+                execution_options={"populate_existing": True},
+            )
+            by_phone = {db_contact.phone: db_contact for db_contact in rows}
+
+        for index, contact in enumerate(creates):
+            db_contact = by_phone.get(contact.phone)
+            if first[contact.phone] != index:
+                db_contact, error = None, Response.DUPLICATE_IN_BATCH.value
+            elif db_contact is None:
+                error = Response.CONTACT_ALREADY_EXISTS.value
+            else:
+                error = None
+            result.created.append(_item_result(index, db_contact, error))
+        return list(by_phone.values())
+
+    @replica_reads
+    async def search_contacts(
+        self, db: AsyncSession, query: str, skip: int = 0, limit: int = 20
+    ) -> List[ContactModel]:
+        """Search contacts by name or phone number, best matches first."""
+        return await self._search.search(db, query, skip=skip, limit=limit)
+
+    async def reindex(
+        self, db: AsyncSession, progress: Optional[Progress] = None
+    ) -> int:
+        """
+        Rebuild the search index, reporting (done, total) as it goes.
+        Returns how many items were rebuilt.
+        """
+        indexed = await self._search.rebuild(db, progress)
+        # Cached match counts came from the old index
+        await self._cache.incr(CONTACTS_VERSION_KEY)
+        return indexed
+
+    @replica_reads
+    async def count_contacts(self, db: AsyncSession) -> int:
+        """Number of contacts, read from the maintained count, not the table."""
+        total = await db.scalar(select(func.sum(ContactStatsModel.contacts)))
+        return int(total or 0)
+
+    @replica_reads
+    async def count_changes(self, db: AsyncSession) -> int:
+        """
+        Rows written since the count started. Grows with every write and
+        survives restarts, so it can version whole listings.
+        """
+        total = await db.scalar(select(func.sum(ContactStatsModel.changes)))
+        return int(total or 0)
+
+    @replica_reads
+    async def get_changes(
+        self, db: AsyncSession, since: Optional[str] = None, limit: int = 100
+    ) -> ContactChanges:
+        """
+        Up to `limit` changes made after the `since` token, oldest first.
+        Without a token there are no changes, only the token to follow new
+        ones with from now on.
+        Raises ValueError if the token is malformed.
+        """
+        if since is None:
+            head = await db.scalar(select(func.max(ContactChangeModel.seq)))
+            return ContactChanges(changes=[], next=encode_change_token(head or 0))
+
+        after = decode_change_token(since)
+        # One extra row tells us whether more are waiting
+        rows = (
+            await db.scalars(
+                select(ContactChangeModel)
+                .where(ContactChangeModel.seq > after)
+                .order_by(ContactChangeModel.seq)
+                .limit(limit + 1)
             )
-            .all()
+        ).all()
+        changes = [_to_change(row) for row in rows[:limit]]
+        return ContactChanges(
+            changes=changes,
+            next=encode_change_token(changes[-1].seq) if changes else since,
+            has_more=len(rows) > limit,
         )
 
+    async def wait_for_changes(self, since: str, timeout: float) -> bool:
+        """
+        Wait up to `timeout` seconds for a change after the `since` token.
+        Returns whether one came.
+        """
+        return await self._changes.wait(decode_change_token(since), timeout)
+
+    @replica_reads
+    async def get_contact_version(
+        self, db: AsyncSession, contact_id: int
+    ) -> Optional[int]:
+        """Version of a contact, without loading the row if it is not cached."""
+        cached = await self._cache.get(_id_key(contact_id))
+        if cached is not None:
+            return cached.get("version", 1)
+        return await db.scalar(
+            select(ContactModel.version).where(ContactModel.id == contact_id)
+        )
+
+    @replica_reads
+    async def get_stats(
+        self, db: AsyncSession, query: Optional[str] = None
+    ) -> ContactStats:
+        """
+        The contact count, and with a query, how many contacts search finds
+        for it. Match counts are cached until the next write.
+        """
+        stats = ContactStats(total=await self.count_contacts(db))
+        if query:
+            key = await self._page_key("matches", normalize_name(query))
+            matches = await self._cache.get(key)
+            if matches is None:
+                matches = await self._search.count(db, query)
+                await self._fill(db, key, matches)
+            stats.query, stats.matches = query, matches
+        return stats
+
 
 def get_contact_service() -> ContactService:
     """Dependency to get the contact service."""
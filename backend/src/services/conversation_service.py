@@ -0,0 +1,153 @@
+import os
+import uuid
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from sqlalchemy import insert, select, update
+
+from src.db.db import AsyncSessionLocal
+from src.db.models.Conversation import ConversationMessageModel, ConversationModel
+
+# Tokens of history (summary excluded) sent with each turn
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "2000"))
+# Cap on the running summary of older messages
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "300"))
+
+# role, content
+Message = tuple[str, str]
+Summarizer = Callable[[Optional[str], list[Message]], Awaitable[str]]
+
+
+class ConversationNotFoundError(LookupError):
+    pass
+
+
+class History(NamedTuple):
+    summary: Optional[str]
+    messages: list[Message]
+
+
+def estimate_tokens(text: str) -> int:
+    """About four characters per token, close enough for budgeting."""
+    return max(1, len(text) // 4)
+
+
+def truncate_tokens(text: str, tokens: int) -> str:
+    return text if estimate_tokens(text) <= tokens else text[: tokens * 4]
+
+
+class ConversationService:
+    """
+    Stores chat turns and keeps each conversation's history within a token
+    budget: the newest messages are sent as they are, older ones are folded
+    into a running summary.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = CHAT_HISTORY_TOKENS,
+        summary_tokens: int = CHAT_SUMMARY_TOKENS,
+    ):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+
+    async def start(self) -> str:
+        conversation_id = str(uuid.uuid4())
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                insert(ConversationModel).values(id=conversation_id, summarizedUpTo=0)
+            )
+            await db.commit()
+        return conversation_id
+
+    async def _unsummarized(self, db, conversation_id: str):
+        conversation = await db.get(ConversationModel, conversation_id)
+        if conversation is None:
+            raise ConversationNotFoundError(conversation_id)
+        messages = (
+            await db.scalars(
+                select(ConversationMessageModel)
+                .where(
+                    ConversationMessageModel.conversationId == conversation_id,
+                    ConversationMessageModel.id > conversation.summarizedUpTo,
+                )
+                .order_by(ConversationMessageModel.id)
+            )
+        ).all()
+        return conversation, messages
+
+    async def history(self, conversation_id: str) -> History:
+        """Summary and unsummarized messages, oldest first, to send to the model"""
+        async with AsyncSessionLocal() as db:
+            conversation, messages = await self._unsummarized(db, conversation_id)
+        return History(
+            conversation.summary,
+            [(message.role, message.content) for message in messages],
+        )
+
+    async def record_turn(self, conversation_id: str, user: str, assistant: str):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                insert(ConversationMessageModel),
+                [
+                    {
+                        "conversationId": conversation_id,
+                        "role": role,
+                        "content": content,
+                        "tokens": estimate_tokens(content),
+                    }
+                    for role, content in (("user", user), ("assistant", assistant))
+                ],
+            )
+            await db.commit()
+
+    async def compact(self, conversation_id: str, summarize: Summarizer) -> bool:
+        """
+        If the unsummarized messages exceed the budget, fold the oldest into
+        the summary until the rest fit in half of it, so compaction runs
+        every few turns rather than on each one. Returns whether it did.
+        """
+        async with AsyncSessionLocal() as db:
+            conversation, messages = await self._unsummarized(db, conversation_id)
+        if sum(message.tokens for message in messages) <= self.token_budget:
+            return False
+
+        kept, kept_tokens = len(messages), 0
+        while (
+            kept and kept_tokens + messages[kept - 1].tokens <= self.token_budget // 2
+        ):
+            kept -= 1
+            kept_tokens += messages[kept].tokens
+        folded = messages[:kept]
+        if not folded:
+            return False
+
+        # No session is held while the model writes the summary
+        summary = await summarize(
+            conversation.summary,
+            [(message.role, message.content) for message in folded],
+        )
+        async with AsyncSessionLocal() as db:
+            # A concurrent compaction of the same messages wins; drop ours
+            result = await db.execute(
+                update(ConversationModel)
+                .where(
+                    ConversationModel.id == conversation_id,
+                    ConversationModel.summarizedUpTo == conversation.summarizedUpTo,
+                )
+                .values(
+                    summary=truncate_tokens(summary, self.summary_tokens),
+                    summarizedUpTo=folded[-1].id,
+                )
+            )
+            await db.commit()
+        return result.rowcount == 1
+
+
+_conversation_service: Optional[ConversationService] = None
+
+
+def get_conversation_service() -> ConversationService:
+    global _conversation_service
+    if _conversation_service is None:
+        _conversation_service = ConversationService()
+    return _conversation_service
@@ -0,0 +1,355 @@
+import asyncio
+import os
+import re
+import unicodedata
+from array import array
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.db import AsyncSessionLocal
+from src.db.schemas import DuplicateCluster, DuplicateScan
+from src.services.cache import Cache, get_cache
+from src.services.contact_service import ContactService, get_contact_service
+from src.services.job_service import (
+    JOB_LOST,
+    JOB_TTL_SECONDS,
+    JobContext,
+    JobService,
+    get_job_service,
+)
+from src.utils.phone import format_phone_numbers
+
+# Pairs scoring at least this are duplicates. A name alone (the same words
+# in any order) is just enough; a shared phone also needs some name overlap.
+DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.55"))
+# Blocks larger than this are too common a key to say anything (a popular
+# name) and are skipped rather than scored pair by pair
+DEDUPE_MAX_BLOCK = int(os.getenv("DEDUPE_MAX_BLOCK", "50"))
+
+NAME_WEIGHT = 0.6
+PHONE_WEIGHT = 0.4
+# Leading characters of each word in the name block key, so a typo late in
+# a word still lands in the same block. Words with digits are kept whole.
+NAME_KEY_PREFIX = 4
+SIGNATURE_BITS = 256
+E164 = re.compile(r"\+[1-9]\d{6,14}")
+MIN_PHONE_DIGITS = 6
+MAX_PHONE_DIGITS = 15
+NO_KEY = -1
+# The latest scan, and its clusters by job id, for every worker to serve
+DEDUPE_SCAN_KEY = "dedupe:scan"
+DEDUPE_CLUSTERS_KEY = "dedupe:clusters:{}"
+
+
+def name_tokens(name: str) -> list[str]:
+    """Lowercased words of a name, accents removed, in sorted order."""
+    text = unicodedata.normalize("NFKD", name.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return sorted(re.findall(r"\w+", text))
+
+
+def _key_word(token: str) -> str:
+    return token[:NAME_KEY_PREFIX] if token.isalpha() else token
+
+
+def name_signature(tokens: Sequence[str]) -> int:
+    """
+    Character trigrams of the sorted words as a bit set, so word order does
+    not matter and two names compare with a few integer operations.
+    """
+    text = f" {' '.join(tokens)} "
+    signature = 0
+    for i in range(len(text) - 2):
+        signature |= 1 << (hash(text[i : i + 3]) % SIGNATURE_BITS)
+    return signature
+
+
+def similarity(a: int, b: int) -> float:
+    """Jaccard similarity of two name signatures."""
+    union = (a | b).bit_count()
+    return (a & b).bit_count() / union if union else 0.0
+
+
+class _UnionFind:
+    def __init__(self):
+        self._parent: dict[int, int] = {}
+
+    def find(self, item: int) -> int:
+        root = self._parent.setdefault(item, item)
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while item != root:
+            self._parent[item], item = root, self._parent[item]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        self._parent[self.find(a)] = self.find(b)
+
+    def items(self) -> list[int]:
+        return list(self._parent)
+
+
+class DuplicateFinder:
+    """
+    Finds clusters of likely duplicate contacts without comparing every
+    pair: contacts are grouped into blocks that share a normalized phone or
+    the same name words, and only pairs within a block are scored. Keeps a
+    few bytes per contact, so a whole contact book fits in memory.
+    """
+
+    def __init__(
+        self, threshold: float = DEDUPE_THRESHOLD, max_block: int = DEDUPE_MAX_BLOCK
+    ):
+        self.threshold = threshold
+        self.max_block = max_block
+        self._ids = array("q")
+        self._phones = array("q")
+        self._names = array("q")
+        self._signatures: list[int] = []
+        self.blocks = self.oversized_blocks = self.pairs = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, rows: Sequence[Tuple[int, str, str]]) -> None:
+        """Take (id, name, phone) rows."""
+        # Stored phones are E.164 already, except rows written before
+        # phones were normalized; only those are parsed
+        legacy = [phone for _, _, phone in rows if not E164.fullmatch(phone)]
+        normalized = dict(zip(legacy, format_phone_numbers(legacy)))
+        for contact_id, name, phone in rows:
+            phone = normalized.get(phone) or phone
+            digits = re.sub(r"\D", "", phone)
+            tokens = name_tokens(name)
+            self._ids.append(contact_id)
+            # Too short or too long to be a phone number worth blocking on
+            known = MIN_PHONE_DIGITS <= len(digits) <= MAX_PHONE_DIGITS
+            self._phones.append(int(digits) if known else NO_KEY)
+            self._names.append(
+                hash(" ".join(map(_key_word, tokens))) if tokens else NO_KEY
+            )
+            self._signatures.append(name_signature(tokens))
+
+    def _blocks(self, keys: array) -> Iterator[list[int]]:
+        """Positions of the contacts sharing each key, for keys shared at all."""
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        start = 0
+        for end in range(1, len(order) + 1):
+            if end < len(order) and keys[order[end]] == keys[order[start]]:
+                continue
+            if end - start > 1 and keys[order[start]] != NO_KEY:
+                yield order[start:end]
+            start = end
+
+    def _score(self, a: int, b: int) -> float:
+        score = NAME_WEIGHT * similarity(self._signatures[a], self._signatures[b])
+        if self._phones[a] == self._phones[b] != NO_KEY:
+            score += PHONE_WEIGHT
+        return score
+
+    def clusters(self) -> List[Tuple[float, List[int]]]:
+        """
+        (score, contact ids) of each cluster of duplicates, largest first.
+        A cluster's score is that of its best pair.
+        """
+        found = _UnionFind()
+        best: dict[int, float] = {}
+        for keys in (self._phones, self._names):
+            for block in self._blocks(keys):
+                if len(block) > self.max_block:
+                    self.oversized_blocks += 1
+                    continue
+                self.blocks += 1
+                for i, a in enumerate(block):
+                    for b in block[i + 1 :]:
+                        if (
+                            keys is self._names
+                            and self._phones[a] == self._phones[b] != NO_KEY
+                        ):
+                            continue  # scored with the phone blocks
+                        self.pairs += 1
+                        score = self._score(a, b)
+                        if score >= self.threshold:
+                            found.union(a, b)
+                            best[a] = max(best.get(a, 0.0), score)
+
+        members: dict[int, list[int]] = {}
+        for position in found.items():
+            members.setdefault(found.find(position), []).append(position)
+        clusters = []
+        for positions in members.values():
+            score = max(best.get(position, 0.0) for position in positions)
+            clusters.append((score, sorted(self._ids[p] for p in positions)))
+        clusters.sort(key=lambda cluster: (-len(cluster[1]), -cluster[0]))
+        return clusters
+
+
+class DedupeService:
+    """
+    Runs duplicate scans as background jobs, one at a time, and keeps the
+    clusters of the latest one. Scans read the contact book once; blocking
+    and scoring run in a worker thread. The latest scan and its clusters
+    are shared through the cache, so every worker serves the same ones.
+    """
+
+    def __init__(
+        self,
+        contacts: Optional[ContactService] = None,
+        jobs: Optional[JobService] = None,
+        cache: Optional[Cache] = None,
+        threshold: float = DEDUPE_THRESHOLD,
+        max_block: int = DEDUPE_MAX_BLOCK,
+    ):
+        self._contacts = contacts or get_contact_service()
+        self._jobs = jobs or get_job_service()
+        self._cache = cache or get_cache()
+        self._threshold = threshold
+        self._max_block = max_block
+        self._scan = DuplicateScan(status="idle")
+        self._clusters: List[Tuple[float, List[int]]] = []
+        # Job of the scan self._clusters came from
+        self._clusters_job: Optional[str] = None
+        # Change count when the latest scan started
+        self._changes = 0
+        # Whether this process runs the scan in self._scan
+        self._running_here = False
+
+    async def _publish(self) -> None:
+        if self._scan.status == "done":
+            await self._cache.set(
+                DEDUPE_CLUSTERS_KEY.format(self._scan.job_id),
+                self._clusters,
+                ttl=JOB_TTL_SECONDS,
+            )
+        await self._cache.set(
+            DEDUPE_SCAN_KEY,
+            {"scan": self._scan.model_dump(mode="json"), "changes": self._changes},
+            ttl=JOB_TTL_SECONDS,
+        )
+
+    async def _sync(self) -> None:
+        """Take up the latest scan, wherever it ran, unless this process runs one."""
+        if self._running_here:
+            return
+        shared = await self._cache.get(DEDUPE_SCAN_KEY)
+        if shared is None:
+            return
+        scan = DuplicateScan.model_validate(shared["scan"])
+        if scan.status == "running":
+            # Another worker runs it; its job tells how far it got
+            job = await self._jobs.get(scan.job_id)
+            if job is None or job.status == "failed":
+                scan.status, scan.error = "failed", job.error if job else JOB_LOST
+            else:
+                scan.scanned = job.processed
+        elif scan.status == "done" and scan.job_id != self._clusters_job:
+            clusters = await self._cache.get(DEDUPE_CLUSTERS_KEY.format(scan.job_id))
+            if clusters is None:
+                return
+            self._clusters = [(score, ids) for score, ids in clusters]
+            self._clusters_job = scan.job_id
+        self._scan, self._changes = scan, shared["changes"]
+
+    async def start_scan(self) -> DuplicateScan:
+        """
+        Start a scan unless one is running. Returns its status.
+        Raises JobQueueFullError if the job queue is full.
+        """
+        await self._sync()
+        if self._scan.status != "running":
+            previous, self._scan = (
+                self._scan,
+                DuplicateScan(status="running", startedAt=datetime.now(timezone.utc)),
+            )
+            self._running_here = True
+            try:
+                job = await self._jobs.submit("dedupe", self._run)
+            except BaseException:
+                self._scan, self._running_here = previous, False
+                raise
+            self._scan.job_id = job.id
+            await self._publish()
+        return self._scan
+
+    async def wait(self, timeout: Optional[float] = None) -> DuplicateScan:
+        """Wait up to `timeout` seconds for the running scan, if any, to finish."""
+        if self._scan.status == "running" and self._scan.job_id:
+            await self._jobs.wait(self._scan.job_id, timeout)
+        await self._sync()
+        return self._scan
+
+    async def _run(self, ctx: JobContext) -> dict:
+        scan = self._scan
+        finder = DuplicateFinder(self._threshold, self._max_block)
+        try:
+            async with AsyncSessionLocal() as db:
+                self._changes = await self._contacts.count_changes(db)
+                total = await self._contacts.count_contacts(db)
+                async for rows in self._contacts.stream_contacts(db):
+                    await asyncio.to_thread(finder.add, rows)
+                    scan.scanned = len(finder)
+                    ctx.progress(scan.scanned, total)
+            self._clusters = await asyncio.to_thread(finder.clusters)
+            self._clusters_job = scan.job_id
+            scan.status = "done"
+        except BaseException as e:
+            scan.status, scan.error = "failed", str(e) or type(e).__name__
+            raise
+        finally:
+            scan.blocks = finder.blocks
+            scan.oversized_blocks = finder.oversized_blocks
+            scan.pairs = finder.pairs
+            scan.clusters = len(self._clusters)
+            scan.finishedAt = datetime.now(timezone.utc)
+            try:
+                await self._publish()
+            finally:
+                self._running_here = False
+        return {"scanned": scan.scanned, "clusters": scan.clusters}
+
+    async def status(self, db: AsyncSession) -> DuplicateScan:
+        """The latest scan, with how many writes were made since it started."""
+        await self._sync()
+        scan = self._scan.model_copy()
+        if scan.status == "done":
+            scan.changes_since = await self._contacts.count_changes(db) - self._changes
+        return scan
+
+    async def get_clusters(
+        self, db: AsyncSession, skip: int = 0, limit: int = 20
+    ) -> Tuple[List[DuplicateCluster], Optional[int]]:
+        """
+        A page of the latest scan's clusters with their contacts as they
+        are now, and the skip of the next page (None on the last one).
+        Contacts deleted or merged since the scan are left out, and so are
+        clusters left with a single contact.
+        """
+        await self._sync()
+        page, position = [], skip
+        while len(page) < limit and position < len(self._clusters):
+            chunk = self._clusters[position : position + limit - len(page)]
+            position += len(chunk)
+            contacts = await self._contacts.get_contacts_by_ids(
+                db, [contact_id for _, ids in chunk for contact_id in ids]
+            )
+            by_id = {contact.id: contact for contact in contacts}
+            for index, (score, ids) in enumerate(chunk, position - len(chunk)):
+                members = [by_id[i] for i in ids if i in by_id]
+                if len(members) > 1:
+                    page.append(
+                        DuplicateCluster(index=index, score=score, contacts=members)
+                    )
+        return page, position if position < len(self._clusters) else None
+
+
+_dedupe_service: Optional[DedupeService] = None
+
+
+def get_dedupe_service() -> DedupeService:
+    """Get the dedupe service shared by the whole app, which holds the scans."""
+    global _dedupe_service
+    if _dedupe_service is None:
+        _dedupe_service = DedupeService()
+    return _dedupe_service
@@ -0,0 +1,111 @@
+import asyncio
+import os
+from typing import AsyncIterator, Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.responses import Response
+from src.db.schemas import MAX_NAME_LENGTH, ImportReport, ImportRowError
+from src.services.contact_service import ContactService
+from src.utils.contact_formats import Record
+from src.utils.phone import format_phone_numbers
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Row errors kept in the report; the rest are only counted
+MAX_IMPORT_ERRORS = 1000
+
+
+def _normalize_chunk(chunk: List[Record], default_region: str) -> List[tuple]:
+    """Validate a chunk of records, returning (row, name, phone, error) tuples."""
+    phones = format_phone_numbers(
+        [str(fields.get("phone") or "") for _, fields, _ in chunk], default_region
+    )
+    normalized = []
+    for (row, fields, error), phone in zip(chunk, phones):
+        if error is not None:
+            normalized.append((row, None, None, error))
+            continue
+        name = str(fields.get("name") or "").strip()
+        if not 1 <= len(name) <= MAX_NAME_LENGTH:
+            normalized.append((row, None, None, Response.INVALID_NAME.value))
+            continue
+        if phone is None:
+            normalized.append((row, None, None, Response.INVALID_PHONE_NUMBER.value))
+            continue
+        normalized.append((row, name, phone, None))
+    return normalized
+
+
+class ImportService:
+    def __init__(self, contact_service: Optional[ContactService] = None):
+        self._contacts = contact_service or ContactService()
+
+    async def import_contacts(
+        self,
+        db: AsyncSession,
+        records: AsyncIterator[Record],
+        default_region: str = "PL",
+        update_existing: bool = False,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        progress: Optional[Callable[[ImportReport], None]] = None,
+    ) -> ImportReport:
+        """
+        Import a stream of contact records chunk by chunk.
+        Each chunk is normalized and written in its own transaction, so only
+        one chunk is held in memory and a failure keeps earlier chunks.
+        `progress` is called with the report so far after every chunk.
+        """
+        report = ImportReport()
+        chunk: List[Record] = []
+        async for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                await self._import_chunk(
+                    db, chunk, default_region, update_existing, report
+                )
+                chunk = []
+                if progress:
+                    progress(report)
+        if chunk:
+            await self._import_chunk(db, chunk, default_region, update_existing, report)
+        return report
+
+    async def _import_chunk(
+        self,
+        db: AsyncSession,
+        chunk: List[Record],
+        default_region: str,
+        update_existing: bool,
+        report: ImportReport,
+    ) -> None:
+        report.received += len(chunk)
+        # phonenumbers parsing is CPU-bound; keep it off the event loop
+        normalized = await asyncio.to_thread(_normalize_chunk, chunk, default_region)
+
+        contacts: dict[str, dict] = {}
+        for row, name, phone, error in normalized:
+            if error is not None:
+                report.failed += 1
+                if len(report.errors) < MAX_IMPORT_ERRORS:
+                    report.errors.append(ImportRowError(row=row, error=error))
+                continue
+            # A phone repeated within the chunk is counted as if it were in a
+            # later chunk: skipped, or an update overwriting the earlier row
+            if phone in contacts:
+                if not update_existing:
+                    report.skipped += 1
+                    continue
+                report.updated += 1
+            contacts[phone] = {"name": name, "phone": phone}
+
+        inserted, updated = await self._contacts.upsert_contacts(
+            db, list(contacts.values()), update_existing=update_existing
+        )
+        report.inserted += len(inserted)
+        report.updated += len(updated)
+        report.skipped += len(contacts) - len(inserted) - len(updated)
+
+
+def get_import_service() -> ImportService:
+    """Dependency to get the import service."""
+    return ImportService()
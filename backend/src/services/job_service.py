@@ -0,0 +1,306 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional, Protocol
+
+from sqlalchemy import delete
+
+from src.db.db import AsyncSessionLocal
+from src.db.models.Job import JobModel
+from src.db.schemas import Job
+from src.services.cache import REDIS_URL
+
+# Jobs running at once per process; the rest wait in line
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Jobs queued or running per process before new ones are turned away
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+# How often a process writes the progress of its jobs to the store
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "2"))
+# A queued or running job not written for this long lost its process
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "30"))
+# How long finished jobs, and the files they wrote, are kept
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", str(7 * 24 * 3600)))
+# "database", "redis" or "memory"; defaults to the database
+JOB_STORE = os.getenv("JOB_STORE", "database")
+MAX_MEMORY_JOBS = 1000
+# How often the database store deletes expired jobs
+PRUNE_INTERVAL_SECONDS = 3600
+
+ACTIVE = ("queued", "running")
+JOB_LOST = "The process running the job stopped"
+JOB_INTERRUPTED = "The server shut down while the job was running"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back the stored times without their zone
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class JobQueueFullError(RuntimeError):
+    def __init__(self):
+        super().__init__("Too many jobs are queued")
+
+
+class JobStore(Protocol):
+    """Where the state of jobs is kept, for any process to read."""
+
+    async def save(self, job: Job) -> None:
+        """Insert or overwrite a job."""
+        ...
+
+    async def get(self, job_id: str) -> Optional[Job]: ...
+
+
+class MemoryJobStore:
+    """In-process store for tests; keeps the latest MAX_MEMORY_JOBS jobs."""
+
+    def __init__(self, max_jobs: int = MAX_MEMORY_JOBS):
+        self._max_jobs = max_jobs
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def save(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.id] = job.model_copy(deep=True)
+            self._jobs.move_to_end(job.id)
+            while len(self._jobs) > self._max_jobs:
+                self._jobs.popitem(last=False)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy(deep=True) if job is not None else None
+
+
+class DatabaseJobStore:
+    """Jobs in the `jobs` table, so they outlive the process that ran them."""
+
+    def __init__(self, session_factory=AsyncSessionLocal, ttl: int = JOB_TTL_SECONDS):
+        self._session_factory = session_factory
+        self._ttl = ttl
+        self._pruned_at: Optional[float] = None
+
+    async def save(self, job: Job) -> None:
+        async with self._session_factory() as db:
+            now = time.monotonic()
+            if (
+                self._pruned_at is None
+                or now - self._pruned_at > PRUNE_INTERVAL_SECONDS
+            ):
+                self._pruned_at = now
+                await db.execute(
+                    delete(JobModel).where(
+                        JobModel.finishedAt < _now() - timedelta(seconds=self._ttl)
+                    )
+                )
+            await db.merge(JobModel(**job.model_dump()))
+            await db.commit()
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        async with self._session_factory() as db:
+            row = await db.get(JobModel, job_id)
+            if row is None:
+                return None
+            job = Job.model_validate(row)
+        for field in ("createdAt", "startedAt", "finishedAt", "updatedAt"):
+            setattr(job, field, _utc(getattr(job, field)))
+        return job
+
+
+class RedisJobStore:
+    """Jobs in the shared Redis instance, expiring after JOB_TTL_SECONDS."""
+
+    def __init__(self, url: str, ttl: int = JOB_TTL_SECONDS):
+        from redis.asyncio import Redis
+
+        self._redis = Redis.from_url(url)
+        self._ttl = ttl
+
+    async def save(self, job: Job) -> None:
+        await self._redis.set(f"job:{job.id}", job.model_dump_json(), ex=self._ttl)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        raw = await self._redis.get(f"job:{job_id}")
+        return None if raw is None else Job.model_validate_json(raw)
+
+
+def create_job_store(kind: str = JOB_STORE) -> JobStore:
+    """Create the job store named by JOB_STORE."""
+    if kind == "database":
+        return DatabaseJobStore()
+    if kind == "redis":
+        if not REDIS_URL:
+            raise ValueError("JOB_STORE=redis needs REDIS_URL")
+        return RedisJobStore(REDIS_URL)
+    if kind == "memory":
+        return MemoryJobStore()
+    raise ValueError(f"Unsupported job store: {kind}")
+
+
+class JobContext:
+    """Handed to a running job, to report its progress with."""
+
+    def __init__(self, job: Job):
+        self.job = job
+
+    def progress(
+        self,
+        processed: int,
+        total: Optional[int] = None,
+        fraction: Optional[float] = None,
+    ) -> None:
+        """
+        Record `processed` items done, out of `total` if it is known. Pass
+        `fraction` instead when the total is measured otherwise, such as in bytes.
+        """
+        self.job.processed = processed
+        if fraction is None and total:
+            fraction = processed / total
+        self.job.progress = min(fraction, 1.0) if fraction is not None else None
+
+
+JobRunner = Callable[[JobContext], Awaitable[Optional[dict[str, Any]]]]
+
+
+class JobService:
+    """
+    Runs work in the background of this process, JOB_WORKERS jobs at a
+    time, and keeps their state in a JobStore so any process can report on
+    them. Progress is written on a heartbeat rather than on every report,
+    so a busy job costs the store one write every few seconds.
+    """
+
+    def __init__(
+        self,
+        store: Optional[JobStore] = None,
+        workers: int = JOB_WORKERS,
+        queue_size: int = JOB_QUEUE_SIZE,
+        heartbeat: float = JOB_HEARTBEAT_SECONDS,
+        stale_after: float = JOB_STALE_SECONDS,
+    ):
+        self._store = store or create_job_store()
+        self._slots = asyncio.Semaphore(workers)
+        self._queue_size = queue_size
+        self._heartbeat_interval = heartbeat
+        self._stale_after = stale_after
+        self._active: dict[str, Job] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        # Writes of one job must reach the store in the order they were made
+        self._saving = asyncio.Lock()
+
+    async def _save(self, job: Job) -> None:
+        async with self._saving:
+            job.updatedAt = _now()
+            await self._store.save(job)
+
+    async def submit(self, kind: str, run: JobRunner) -> Job:
+        """
+        Queue `run` and return its job right away. Whatever `run` returns
+        becomes the job's result; if it raises, the job fails with the error.
+        Raises JobQueueFullError if too many jobs are waiting.
+        """
+        if len(self._active) >= self._queue_size:
+            raise JobQueueFullError()
+        now = _now()
+        job = Job(id=uuid.uuid4().hex, kind=kind, createdAt=now, updatedAt=now)
+        await self._save(job)
+        self._active[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run(job, run))
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        return job.model_copy()
+
+    async def _run(self, job: Job, run: JobRunner) -> None:
+        try:
+            async with self._slots:
+                job.status, job.startedAt = "running", _now()
+                try:
+                    await self._save(job)
+                    job.result = await run(JobContext(job))
+                    job.status, job.progress = "succeeded", 1.0
+                except Exception as e:
+                    job.status, job.error = "failed", str(e) or type(e).__name__
+                job.finishedAt = _now()
+                try:
+                    await self._save(job)
+                except Exception:
+                    # Readers elsewhere see it go stale and report it failed
+                    pass
+        finally:
+            self._active.pop(job.id, None)
+            self._tasks.pop(job.id, None)
+
+    async def _heartbeat(self) -> None:
+        while self._active:
+            await asyncio.sleep(self._heartbeat_interval)
+            for job in list(self._active.values()):
+                try:
+                    await self._save(job)
+                except Exception:
+                    # Try again at the next beat
+                    pass
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """The job as it is now, wherever it runs; None if there is no such job."""
+        job = self._active.get(job_id)
+        if job is not None:
+            return job.model_copy()
+        job = await self._store.get(job_id)
+        if (
+            job is not None
+            and job.status in ACTIVE
+            and job.updatedAt < _now() - timedelta(seconds=self._stale_after)
+        ):
+            job.status, job.error = "failed", JOB_LOST
+        return job
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """
+        Wait up to `timeout` seconds for a job of this process to finish.
+        Returns the job as it is then, finished or not.
+        """
+        task = self._tasks.get(job_id)
+        if task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+            except TimeoutError:
+                pass
+        return await self.get(job_id)
+
+    async def shutdown(self) -> None:
+        """Stop this process's jobs, recording them as failed."""
+        tasks = list(self._tasks.values())
+        jobs = list(self._active.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in jobs:
+            job.status, job.error, job.finishedAt = "failed", JOB_INTERRUPTED, _now()
+            try:
+                await self._save(job)
+            except Exception:
+                pass
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+
+
+_job_service: Optional[JobService] = None
+
+
+def get_job_service() -> JobService:
+    """Get the job service shared by the whole process, which runs its jobs."""
+    global _job_service
+    if _job_service is None:
+        _job_service = JobService()
+    return _job_service
@@ -0,0 +1,301 @@
+import os
+import time
+import weakref
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false")
+# Set for several workers (see src/serve.py): each writes its metrics to
+# files there, and a scrape of any worker adds them all up
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RESULT_BUCKETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+MCP_TOOL_SECONDS = Histogram(
+    "mcp_tool_duration_seconds",
+    "MCP tool execution time",
+    ["tool", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+MCP_TOOL_RESULT_BYTES = Histogram(
+    "mcp_tool_result_bytes",
+    "Size of the text a tool call returns",
+    ["tool"],
+    buckets=RESULT_BUCKETS,
+)
+MCP_TOOL_RESULT_TOKENS = Histogram(
+    "mcp_tool_result_tokens",
+    "Estimated model tokens of the text a tool call returns",
+    ["tool"],
+    buckets=tuple(size // 4 for size in RESULT_BUCKETS),
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time by statement type",
+    ["engine", "statement"],
+    buckets=DB_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors", "SQL statements that raised", ["engine", "statement"]
+)
+DB_CONNECT_SECONDS = Histogram(
+    "db_connect_duration_seconds",
+    "Time to open a new database connection for the pool",
+    ["engine"],
+    buckets=DB_BUCKETS,
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts", "Connections checked out of the pool", ["engine"]
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "How far behind the primary a replica was at its last check",
+    ["engine"],
+    multiprocess_mode="max",
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds",
+    "Model call latency, per generate call or streamed round",
+    ["model", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter("llm_tokens", "Tokens reported by the model", ["model", "kind"])
+LLM_SLOTS = Gauge(
+    "llm_slots",
+    "Model calls running and waiting for a slot",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+LLM_SCHEDULER_EVENTS = Counter(
+    "llm_scheduler_events",
+    "Model requests rejected, timed out, retried or coalesced",
+    ["event"],
+)
+CHAT_TOOL_CACHE = Counter(
+    "chat_tool_cache",
+    "Read-only tool calls answered from a conversation's cache",
+    ["outcome"],
+)
+
+STATEMENT_TYPES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT")
+
+
+def statement_type(statement: str) -> str:
+    """Leading SQL keyword, bounded to a few values to keep label cardinality low."""
+    keyword = statement.lstrip()[:6].upper()
+    for kind in STATEMENT_TYPES:
+        if keyword.startswith(kind):
+            return kind
+    return "OTHER"
+
+
+class _PoolCollector:
+    """Reads pool gauges at scrape time, so checkouts pay nothing for them."""
+
+    def __init__(self):
+        self._engines: weakref.WeakValueDictionary[str, Engine] = (
+            weakref.WeakValueDictionary()
+        )
+
+    def add(self, name: str, engine: Engine) -> None:
+        self._engines[name] = engine
+
+    def _states(self):
+        for name, engine in list(self._engines.items()):
+            pool = engine.pool
+            for state, read in (
+                ("size", "size"),
+                ("checked_out", "checkedout"),
+                ("idle", "checkedin"),
+                ("overflow", "overflow"),
+            ):
+                if hasattr(pool, read):
+                    yield name, state, getattr(pool, read)()
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "db_pool_connections",
+            "Connections per pool state",
+            labels=["engine", "state"],
+        )
+        for name, state, value in self._states():
+            gauge.add_metric([name, state], value)
+        yield gauge
+
+    def sample(self) -> None:
+        """Write the pools' state to DB_POOL_CONNECTIONS, in multiprocess mode."""
+        for name, state, value in self._states():
+            DB_POOL_CONNECTIONS.labels(name, state).set(value)
+
+
+_pool_collector = _PoolCollector()
+if PROMETHEUS_MULTIPROC_DIR:
+    # A scrape reads the other workers' files, not their pools, so each
+    # worker writes its pools' state there after every request
+    DB_POOL_CONNECTIONS = Gauge(
+        "db_pool_connections",
+        "Connections per pool state",
+        ["engine", "state"],
+        multiprocess_mode="livesum",
+    )
+else:
+    REGISTRY.register(_pool_collector)
+
+
+def collect_metrics() -> bytes:
+    """Every metric in the Prometheus text format, added up over the workers."""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def shutdown_metrics() -> None:
+    """Drop this worker's live gauges from the totals, in multiprocess mode."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def instrument_engine(engine: Engine, name: str = "primary") -> None:
+    """
+    Time every statement and new connection of an engine (the sync_engine of
+    an AsyncEngine) and expose its pool gauges. Safe to call more than once.
+    """
+    if getattr(engine, "_metrics_instrumented", False):
+        return
+    engine._metrics_instrumented = True
+    _pool_collector.add(name, engine)
+    statements = {
+        kind: DB_QUERY_SECONDS.labels(name, kind)
+        for kind in (*STATEMENT_TYPES, "OTHER")
+    }
+    checkouts = DB_POOL_CHECKOUTS.labels(name)
+    connects = DB_CONNECT_SECONDS.labels(name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, params, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, params, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        statements[statement_type(statement)].observe(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        conn = context.connection
+        starts = conn.info.get("query_start") if conn is not None else None
+        if starts:
+            starts.pop()
+        DB_QUERY_ERRORS.labels(name, statement_type(context.statement or "")).inc()
+
+    @event.listens_for(engine, "do_connect")
+    def do_connect(dialect, conn_rec, cargs, cparams):
+        conn_rec.info["connect_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, conn_rec):
+        start = conn_rec.info.pop("connect_start", None)
+        if start is not None:
+            connects.observe(time.perf_counter() - start)
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, conn_rec, conn_proxy):
+        checkouts.inc()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request under its route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; templates
+            # keep IDs out of the labels
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - start)
+            if PROMETHEUS_MULTIPROC_DIR:
+                _pool_collector.sample()
+
+
+class ToolMetricsMiddleware(Middleware):
+    """FastMCP middleware timing each tool call and sizing its result."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await call_next(context)
+            outcome = "ok"
+        finally:
+            MCP_TOOL_SECONDS.labels(context.message.name, outcome).observe(
+                time.perf_counter() - start
+            )
+        size = sum(
+            len(block.text.encode())
+            for block in result.content
+            if getattr(block, "text", None)
+        )
+        MCP_TOOL_RESULT_BYTES.labels(context.message.name).observe(size)
+        # About four bytes per token for JSON, as chat history is budgeted
+        MCP_TOOL_RESULT_TOKENS.labels(context.message.name).observe(size / 4)
+        return result
+
+
+def record_replica_lag(name: str, lag: float) -> None:
+    """Record a replica's lag; +Inf while it cannot be read from at all."""
+    DB_REPLICA_LAG.labels(name).set(lag)
+
+
+def record_llm_call(model: str, started: float, outcome: str, usage=None) -> None:
+    """Record one model call started at `started` (perf_counter) and its token usage."""
+    LLM_REQUEST_SECONDS.labels(model, outcome).observe(time.perf_counter() - started)
+    if usage is None:
+        return
+    for kind, count in (
+        ("prompt", usage.prompt_token_count),
+        ("completion", usage.candidates_token_count),
+        ("thoughts", usage.thoughts_token_count),
+        ("tool_use_prompt", usage.tool_use_prompt_token_count),
+    ):
+        if count:
+            LLM_TOKENS.labels(model, kind).inc(count)
@@ -1,5 +1,46 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastmcp import Client
 
+from src.mcp.server import get_mcp_server
+
+# "memory" talks to the FastMCP instance in this process, "http" goes through
+# the mounted streamable HTTP app like any external MCP client would.
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "memory")
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:8000/api/llm/mcp")
+
+_mcp_client: Client | None = None
+
+
+def create_mcp_client(transport: str = MCP_TRANSPORT) -> Client:
+    """Create a new MCP client for the given transport"""
+    if transport == "memory":
+        return Client(get_mcp_server())
+    if transport == "http":
+        return Client(MCP_SERVER_URL)
+    raise ValueError(f"Unsupported MCP transport: {transport}")
+
 
 def get_mcp_client() -> Client:
-    return Client("http://localhost:8000/api/llm/mcp")
+    """Get the MCP client shared by all chat requests"""
+    global _mcp_client
+    if _mcp_client is None:
+        _mcp_client = create_mcp_client()
+    return _mcp_client
+
+
+@asynccontextmanager
+async def mcp_client_lifespan():
+    """Keep the shared MCP session open for the lifetime of the app.
+
+    Chat requests re-enter the client, which only bumps its nesting counter
+    while this session is open. The HTTP transport is left to connect per
+    request, since the server is not accepting connections during startup.
+    """
+    if MCP_TRANSPORT != "memory":
+        yield
+        return
+
+    async with get_mcp_client():
+        yield
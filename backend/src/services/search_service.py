@@ -0,0 +1,382 @@
+import asyncio
+import math
+import os
+import re
+import threading
+from array import array
+from collections import defaultdict
+from typing import Callable, List, Optional, Protocol
+
+from sqlalchemy import case, func, literal, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.db import get_async_engine
+from src.db.models.Contact import ContactChangeModel, ContactModel, ContactStatsModel
+
+# Only queries with at least this many digits are matched against phones,
+# otherwise "Jan 2" would match every number containing a 2.
+MIN_PHONE_DIGITS = 3
+# Rows read at a time when loading the n-gram index
+INDEX_BATCH_SIZE = 10_000
+# Indexes serving TrigramSearchBackend, see the add_contact_search migration
+TRIGRAM_INDEXES = ("ix_contacts_name_trgm", "ix_contacts_phone_trgm")
+
+Progress = Callable[[int, Optional[int]], None]
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase and collapse whitespace for name matching."""
+    return " ".join(text.lower().split())
+
+
+def normalize_digits(text: str) -> str:
+    """Keep only the digits, so '+48 601-234-567' matches '+48601234567'."""
+    return re.sub(r"\D", "", text)
+
+
+class SearchBackend(Protocol):
+    async def search(
+        self, db: AsyncSession, query: str, skip: int = 0, limit: int = 20
+    ) -> List[ContactModel]:
+        """Ranked contacts matching the query by name or phone number."""
+        ...
+
+    async def count(self, db: AsyncSession, query: str) -> int:
+        """How many contacts `search` would find for the query in all."""
+        ...
+
+    def index(self, contact: ContactModel) -> None:
+        """Add or refresh a contact after it was written."""
+        ...
+
+    def remove(self, contact_id: int) -> None:
+        """Forget a deleted contact."""
+        ...
+
+    async def rebuild(
+        self, db: AsyncSession, progress: Optional[Progress] = None
+    ) -> int:
+        """
+        Build the index again from the table without holding up searches
+        or writes, reporting (done, total) as it goes. Returns how many
+        items it rebuilt.
+        """
+        ...
+
+
+class TrigramSearchBackend:
+    """
+    Search on Postgres using pg_trgm.
+    Both the substring (ILIKE/LIKE) and the similarity filters are served by
+    the GIN trigram indexes on name and phone.
+    """
+
+    def _match(self, query: str):
+        """The filter matching the query, and the rank to order matches by."""
+        name_query = normalize_name(query)
+        digits = normalize_digits(query)
+
+        substring = ContactModel.name.icontains(name_query, autoescape=True)
+        conditions = [
+            substring,
+            ContactModel.name.op("%")(name_query),
+            literal(name_query).op("<%")(ContactModel.name),
+        ]
+        rank = func.greatest(
+            func.similarity(ContactModel.name, name_query),
+            func.word_similarity(name_query, ContactModel.name),
+        ) + case((substring, 1.0), else_=0.0)
+
+        if len(digits) >= MIN_PHONE_DIGITS:
+            phone_match = ContactModel.phone.contains(digits)
+            conditions.append(phone_match)
+            rank = rank + case((phone_match, 1.0), else_=0.0)
+        return or_(*conditions), rank
+
+    async def search(
+        self, db: AsyncSession, query: str, skip: int = 0, limit: int = 20
+    ) -> List[ContactModel]:
+        condition, rank = self._match(query)
+        contacts = await db.scalars(
+            select(ContactModel)
+            .where(condition)
+            .order_by(rank.desc(), ContactModel.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return contacts.all()
+
+    async def count(self, db: AsyncSession, query: str) -> int:
+        condition, _ = self._match(query)
+        return await db.scalar(
+            select(func.count()).select_from(ContactModel).where(condition)
+        )
+
+    def index(self, contact: ContactModel) -> None:
+        pass
+
+    def remove(self, contact_id: int) -> None:
+        pass
+
+    async def rebuild(
+        self, db: AsyncSession, progress: Optional[Progress] = None
+    ) -> int:
+        # GIN indexes bloat under churn. REINDEX CONCURRENTLY builds a fresh
+        # copy while writes go on, and cannot run inside a transaction.
+        async with get_async_engine().connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for done, name in enumerate(TRIGRAM_INDEXES):
+                if progress:
+                    progress(done, len(TRIGRAM_INDEXES))
+                await conn.execute(text(f"REINDEX INDEX CONCURRENTLY {name}"))
+        return len(TRIGRAM_INDEXES)
+
+
+class NgramSearchBackend:
+    """
+    In-process n-gram index for SQLite and tests.
+
+    The index is loaded from the database on first use and kept up to date
+    by ContactService writes. Writes made by other processes are read from
+    the change log before each search. Postings are append-only; deleted or
+    changed contacts are filtered out when candidates are scored against
+    the current document.
+    """
+
+    def __init__(self, n: int = 3, min_coverage: float = 0.6):
+        self._n = n
+        self._min_coverage = min_coverage
+        self._lock = threading.RLock()
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+        self._docs: dict[int, tuple[str, str]] = {}
+        self._postings: defaultdict[str, array] = defaultdict(lambda: array("q"))
+        # While rebuilding: the index being built, and the contacts written
+        # since it started, whose rows as the rebuild reads them are stale
+        self._next: Optional[NgramSearchBackend] = None
+        self._touched: set[int] = set()
+        # Last change log seq the index has seen
+        self._seq = 0
+
+    def _grams(self, text: str) -> set[str]:
+        if len(text) < self._n:
+            return set()
+        return {text[i : i + self._n] for i in range(len(text) - self._n + 1)}
+
+    def _add(self, contact_id: int, name: str, phone: str) -> None:
+        doc = (normalize_name(name), normalize_digits(phone))
+        self._docs[contact_id] = doc
+        for gram in self._grams(doc[0]):
+            self._postings["n:" + gram].append(contact_id)
+        for gram in self._grams(doc[1]):
+            self._postings["p:" + gram].append(contact_id)
+
+    async def _ensure_loaded(self, db: AsyncSession) -> None:
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            await self._load(db)
+            self._loaded = True
+
+    async def _load(self, db: AsyncSession, progress: Optional[Progress] = None) -> int:
+        """Read every contact into the index, or into the one being rebuilt."""
+        # Read first: changes made while loading are applied again afterwards
+        seq = await db.scalar(select(func.max(ContactChangeModel.seq))) or 0
+        with self._lock:
+            (self._next or self)._seq = seq
+        total = None
+        if progress:
+            # The maintained count, which is cheaper than counting the table
+            total = await db.scalar(select(func.sum(ContactStatsModel.contacts)))
+        done = 0
+        rows = await db.stream(
+            select(
+                ContactModel.id, ContactModel.name, ContactModel.phone
+            ).execution_options(yield_per=INDEX_BATCH_SIZE)
+        )
+        async for partition in rows.partitions():
+            with self._lock:
+                target = self._next or self
+                for contact_id, name, phone in partition:
+                    if self._next is None or contact_id not in self._touched:
+                        target._add(contact_id, name, phone)
+            done += len(partition)
+            if progress:
+                progress(done, total)
+        return done
+
+    async def _catch_up(self, db: AsyncSession) -> None:
+        """Apply the changes logged since the index last looked."""
+        while True:
+            rows = (
+                await db.execute(
+                    select(
+                        ContactChangeModel.seq,
+                        ContactChangeModel.contactId,
+                        ContactChangeModel.op,
+                        ContactChangeModel.name,
+                        ContactChangeModel.phone,
+                    )
+                    .where(ContactChangeModel.seq > self._seq)
+                    .order_by(ContactChangeModel.seq)
+                    .limit(INDEX_BATCH_SIZE)
+                )
+            ).all()
+            with self._lock:
+                for seq, contact_id, op, name, phone in rows:
+                    if op == "delete":
+                        self._docs.pop(contact_id, None)
+                    elif self._docs.get(contact_id) != (
+                        normalize_name(name),
+                        normalize_digits(phone),
+                    ):
+                        # Not this process's own write, already indexed
+                        self._add(contact_id, name, phone)
+                    self._seq = max(self._seq, seq)
+            if len(rows) < INDEX_BATCH_SIZE:
+                return
+
+    def _candidates(self, prefix: str, grams: set[str], min_shared: int) -> set[int]:
+        # A document sharing at least min_shared of the query grams must appear
+        # in one of the (len(grams) - min_shared + 1) rarest postings, so only
+        # those are read; scoring against the document does the exact check.
+        postings = sorted(
+            (self._postings.get(prefix + gram, ()) for gram in grams), key=len
+        )
+        candidates: set[int] = set()
+        for posting in postings[: len(grams) - min_shared + 1]:
+            candidates.update(posting)
+        return candidates
+
+    def _score(
+        self, doc: tuple[str, str], name_query: str, name_grams: set[str], digits: str
+    ) -> float:
+        name, phone = doc
+        score = 0.0
+        if name_query and name_query in name:
+            # A substring match covers every query gram as well
+            score += 2.0 if name_grams else 1.0
+        elif name_grams:
+            coverage = len(name_grams & self._grams(name)) / len(name_grams)
+            if coverage >= self._min_coverage:
+                score += coverage
+        if len(digits) >= MIN_PHONE_DIGITS and digits in phone:
+            score += 1.0
+        return score
+
+    def _scored(self, query: str) -> list[tuple[float, int, int]]:
+        """(-score, name length, id) of every match; sorting puts the best first."""
+        name_query = normalize_name(query)
+        name_grams = self._grams(name_query)
+        digits = normalize_digits(query)
+
+        with self._lock:
+            if not name_grams and len(digits) < MIN_PHONE_DIGITS:
+                # Too short to use the index
+                candidates = set(self._docs)
+            else:
+                candidates = self._candidates(
+                    "n:",
+                    name_grams,
+                    math.ceil(len(name_grams) * self._min_coverage),
+                )
+                if len(digits) >= MIN_PHONE_DIGITS:
+                    phone_grams = self._grams(digits)
+                    candidates |= self._candidates("p:", phone_grams, len(phone_grams))
+
+            scored = []
+            for contact_id in candidates:
+                doc = self._docs.get(contact_id)
+                if doc is None:
+                    continue
+                score = self._score(doc, name_query, name_grams, digits)
+                if score > 0:
+                    scored.append((-score, len(doc[0]), contact_id))
+        return scored
+
+    async def search(
+        self, db: AsyncSession, query: str, skip: int = 0, limit: int = 20
+    ) -> List[ContactModel]:
+        await self._ensure_loaded(db)
+        await self._catch_up(db)
+        scored = sorted(self._scored(query))
+        page_ids = [contact_id for _, _, contact_id in scored[skip : skip + limit]]
+        if not page_ids:
+            return []
+
+        rows = await db.scalars(
+            select(ContactModel).where(ContactModel.id.in_(page_ids))
+        )
+        by_id = {contact.id: contact for contact in rows}
+        return [by_id[contact_id] for contact_id in page_ids if contact_id in by_id]
+
+    async def count(self, db: AsyncSession, query: str) -> int:
+        await self._ensure_loaded(db)
+        await self._catch_up(db)
+        return len(self._scored(query))
+
+    def index(self, contact: ContactModel) -> None:
+        with self._lock:
+            if self._loaded:
+                self._add(contact.id, contact.name, contact.phone)
+            if self._next is not None:
+                self._next._add(contact.id, contact.name, contact.phone)
+                self._touched.add(contact.id)
+
+    def remove(self, contact_id: int) -> None:
+        with self._lock:
+            self._docs.pop(contact_id, None)
+            if self._next is not None:
+                self._next._docs.pop(contact_id, None)
+                self._touched.add(contact_id)
+
+    async def rebuild(
+        self, db: AsyncSession, progress: Optional[Progress] = None
+    ) -> int:
+        # Postings are append-only, so churn leaves stale entries behind; a
+        # fresh index drops them. Searches use the old one until it is done.
+        async with self._load_lock:
+            with self._lock:
+                self._next = NgramSearchBackend(self._n, self._min_coverage)
+                self._touched = set()
+            try:
+                indexed = await self._load(db, progress)
+                with self._lock:
+                    self._docs, self._postings = self._next._docs, self._next._postings
+                    # Changes other processes made during the rebuild are
+                    # applied again from where it started reading
+                    self._seq = self._next._seq
+                    self._loaded = True
+            finally:
+                with self._lock:
+                    self._next, self._touched = None, set()
+        return indexed
+
+
+_search_backend: Optional[SearchBackend] = None
+
+
+def create_search_backend(kind: Optional[str] = None) -> SearchBackend:
+    """
+    Create the search backend named by SEARCH_BACKEND ("trigram" or "ngram").
+    Defaults to trigram on Postgres and the in-process index elsewhere.
+    """
+    kind = kind or os.getenv("SEARCH_BACKEND")
+    if kind is None:
+        dialect = get_async_engine().dialect.name
+        kind = "trigram" if dialect == "postgresql" else "ngram"
+    if kind == "trigram":
+        return TrigramSearchBackend()
+    if kind == "ngram":
+        return NgramSearchBackend()
+    raise ValueError(f"Unsupported search backend: {kind}")
+
+
+def get_search_backend() -> SearchBackend:
+    """Get the search backend shared by all ContactService instances."""
+    global _search_backend
+    if _search_backend is None:
+        _search_backend = create_search_backend()
+    return _search_backend
@@ -0,0 +1,181 @@
+import codecs
+import csv
+import io
+import json
+import re
+from typing import AsyncIterator, Iterable, Literal
+
+ContactFormat = Literal["csv", "ndjson", "vcf"]
+
+CONTENT_TYPES: dict[str, ContactFormat] = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/vcard": "vcf",
+    "text/x-vcard": "vcf",
+}
+
+MEDIA_TYPES: dict[ContactFormat, str] = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "vcf": "text/vcard",
+}
+
+# A parsed record: its 1-based position in the file, the raw fields, and a
+# parse error if the record could not be read at all.
+Record = tuple[int, dict, str | None]
+
+
+def format_from_content_type(content_type: str | None) -> ContactFormat | None:
+    """Guess the contact file format from a Content-Type header."""
+    if not content_type:
+        return None
+    return CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a UTF-8 byte stream into lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def read_csv(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    """
+    Read contacts from CSV with a header row containing `name` and `phone`.
+    Records must fit on one line.
+    """
+    header: list[str] | None = None
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [column.strip().lower() for column in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, {}, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, dict(zip(header, values)), None
+
+
+async def read_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    """Read contacts from newline-delimited JSON objects."""
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, {}, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, {}, "Expected a JSON object"
+            continue
+        yield row_number, record, None
+
+
+def _escape_vcard(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(",", "\\,")
+        .replace(";", "\\;")
+        .replace("\n", "\\n")
+    )
+
+
+def _unescape_vcard(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+async def read_vcard(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    """Read the FN (or N) and first TEL property of each vCard."""
+    row_number = 0
+    card: dict | None = None
+    previous: str | None = None
+
+    def apply(card: dict, line: str):
+        name, _, value = line.partition(":")
+        prop = name.split(";")[0].upper()
+        if prop == "FN":
+            card["name"] = _unescape_vcard(value.strip())
+        elif prop == "N" and "name" not in card:
+            family, _, rest = value.partition(";")
+            given = rest.split(";")[0]
+            name = " ".join(part for part in (given, family) if part)
+            card["name"] = _unescape_vcard(name)
+        elif prop == "TEL" and "phone" not in card:
+            card["phone"] = value.strip().removeprefix("tel:")
+
+    async for line in lines:
+        # Folded lines continue the previous property
+        if line[:1] in (" ", "\t") and previous is not None:
+            previous += line[1:]
+            continue
+        if card is not None and previous is not None:
+            apply(card, previous)
+        previous = None
+
+        upper = line.strip().upper()
+        if upper == "BEGIN:VCARD":
+            card = {}
+        elif upper == "END:VCARD" and card is not None:
+            row_number += 1
+            yield row_number, card, None
+            card = None
+        elif card is not None:
+            previous = line
+
+    if card is not None:
+        row_number += 1
+        yield row_number, {}, "Unterminated vCard"
+
+
+READERS = {
+    "csv": read_csv,
+    "ndjson": read_ndjson,
+    "vcf": read_vcard,
+}
+
+
+def parse_contacts(
+    chunks: AsyncIterator[bytes], format: ContactFormat
+) -> AsyncIterator[Record]:
+    """Stream contact records out of a request body in the given format."""
+    return READERS[format](iter_lines(chunks))
+
+
+def format_header(format: ContactFormat) -> str:
+    """Text written once before the exported contacts."""
+    return "id,name,phone\r\n" if format == "csv" else ""
+
+
+def format_contacts(rows: Iterable[tuple[int, str, str]], format: ContactFormat) -> str:
+    """Serialize a batch of (id, name, phone) rows in the given format."""
+    if format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    if format == "ndjson":
+        return "".join(
+            json.dumps({"id": id, "name": name, "phone": phone}, ensure_ascii=False)
+            + "\n"
+            for id, name, phone in rows
+        )
+    return "".join(
+        "BEGIN:VCARD\r\nVERSION:4.0\r\n"
+        f"UID:contact-{id}\r\nFN:{_escape_vcard(name)}\r\nTEL:{phone}\r\n"
+        "END:VCARD\r\n"
+        for id, name, phone in rows
+    )
@@ -0,0 +1,45 @@
+import base64
+import binascii
+import json
+
+
+def _encode(payload: dict) -> str:
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _decode(token: str, key: str, error: str) -> int:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded))[key]
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValueError(error)
+    if not isinstance(value, int):
+        raise ValueError(error)
+    return value
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last seen contact ID as an opaque pagination cursor."""
+    return _encode({"id": last_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a pagination cursor back to the last seen contact ID.
+    Raises ValueError if the cursor is malformed.
+    """
+    return _decode(cursor, "id", "Invalid pagination cursor")
+
+
+def encode_change_token(seq: int) -> str:
+    """Encode the sequence number of the last seen contact change."""
+    return _encode({"seq": seq})
+
+
+def decode_change_token(token: str) -> int:
+    """
+    Decode a change token back to its sequence number.
+    Raises ValueError if the token is malformed.
+    """
+    return _decode(token, "seq", "Invalid change token")
@@ -0,0 +1,19 @@
+def weak_etag(*parts) -> str:
+    """Weak ETag from the parts identifying a representation's version."""
+    return 'W/"' + "-".join(map(str, parts)) + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches the ETag, using the weak
+    comparison that conditional GETs call for.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == tag
+        for candidate in if_none_match.split(",")
+    )
@@ -1,12 +1,21 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Sequence
+
 import phonenumbers
 from phonenumbers import NumberParseException, PhoneNumberFormat
 
+PHONE_CACHE_SIZE = int(os.getenv("PHONE_CACHE_SIZE", "100000"))
+PHONE_POOL_WORKERS = int(os.getenv("PHONE_POOL_WORKERS", "0")) or os.cpu_count() or 1
+# Smaller batches are normalized in-process: shipping them to the pool costs
+# more than parsing them.
+PARALLEL_BATCH_SIZE = int(os.getenv("PHONE_PARALLEL_BATCH_SIZE", "50000"))
 
-def format_phone_number(phone: str, default_region: str = "PL") -> str | None:
-    """
-    Format phone number to E.164.
-    Returns None if invalid or cannot be parsed.
-    """
+
+def _format_phone_number(phone: str, default_region: Optional[str]) -> str | None:
     try:
         stripped_phone = phone.strip()
         num = phonenumbers.parse(stripped_phone, default_region)
@@ -15,3 +24,73 @@ def format_phone_number(phone: str, default_region: str = "PL") -> str | None:
         return phonenumbers.format_number(num, PhoneNumberFormat.E164)
     except NumberParseException:
         return None
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def _format_phone_number_cached(
+    phone: str, default_region: Optional[str]
+) -> str | None:
+    return _format_phone_number(phone, default_region)
+
+
+def format_phone_number(phone: str, default_region: Optional[str] = "PL") -> str | None:
+    """
+    Format phone number to E.164.
+    Returns None if invalid or cannot be parsed.
+    Results are memoized per (phone, default_region).
+    """
+    return _format_phone_number_cached(phone, default_region)
+
+
+def _format_chunk(phones: Sequence[str], default_region: Optional[str]) -> list:
+    return [_format_phone_number(phone, default_region) for phone in phones]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs the event loop and DB pool
+            # threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=PHONE_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_phone_pool() -> None:
+    """Stop the worker processes used by format_phone_numbers, if started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def format_phone_numbers(
+    phones: Sequence[str], default_region: Optional[str] = "PL"
+) -> list[str | None]:
+    """
+    Format many phone numbers to E.164, in the same order.
+    Repeated numbers are parsed once. Batches of PARALLEL_BATCH_SIZE or more
+    unique numbers are split across a process pool; smaller ones go through
+    the format_phone_number cache.
+    """
+    unique = list(dict.fromkeys(phones))
+    if len(unique) < PARALLEL_BATCH_SIZE or PHONE_POOL_WORKERS < 2:
+        formatted = {
+            phone: format_phone_number(phone, default_region) for phone in unique
+        }
+    else:
+        chunk_size = -(-len(unique) // (PHONE_POOL_WORKERS * 4))
+        chunks = [unique[i : i + chunk_size] for i in range(0, len(unique), chunk_size)]
+        results = _get_pool().map(_format_chunk, chunks, [default_region] * len(chunks))
+        formatted = {}
+        for chunk, chunk_result in zip(chunks, results):
+            formatted.update(zip(chunk, chunk_result))
+    return [formatted[phone] for phone in phones]
@@ -0,0 +1,11 @@
+import json
+from typing import Any, Optional
+
+
+def format_sse(event: str, data: Any, id: Optional[str] = None) -> str:
+    """
+    Encode one server-sent event with a JSON payload. An `id` is what the
+    browser sends back as Last-Event-ID when it reconnects.
+    """
+    prefix = f"id: {id}\n" if id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"